@@ -2,7 +2,111 @@
 llm-feat: Automated feature engineering using LLMs
 """
 
-from .core import generate_features, set_api_key
+import importlib
+from typing import TYPE_CHECKING
+
 from .version import __version__
 
-__all__ = ["set_api_key", "generate_features", "__version__"]
+if TYPE_CHECKING:
+    from .background import GenerationHandle, generate_features_background
+    from .core import (
+        generate_feature_set,
+        generate_features,
+        generate_incremental_features,
+        get_llm_stats,
+        set_api_key,
+        set_cassette,
+        set_hedging,
+    )
+    from .feature_cache import FeatureCache
+    from .fingerprint import Fingerprint, fingerprint_dataframe
+    from .fitted import FittedCode
+    from .instrumentation import MetricsCollector, Span, set_instrumentation
+    from .memory_budget import MemoryBudget
+    from .registry import FeatureRegistry, RegistryEntry
+    from .sandbox import SandboxPool
+    from .schema import MetadataSchema
+    from .service import FeatureService
+    from .shm import SharedFrame
+    from .sparse import split_sparse, to_csr
+    from .structured import Feature, FeatureSet
+    from .transformer import LLMFeatTransformer
+
+# Public names and the submodule defining them. Submodules pull in pandas,
+# openai etc., so they are imported on first attribute access rather than
+# on `import llm_feat`.
+_LAZY_ATTRS = {
+    "set_api_key": ".core",
+    "set_cassette": ".core",
+    "set_hedging": ".core",
+    "get_llm_stats": ".core",
+    "generate_features": ".core",
+    "generate_feature_set": ".core",
+    "generate_incremental_features": ".core",
+    "generate_features_background": ".background",
+    "GenerationHandle": ".background",
+    "Feature": ".structured",
+    "FeatureSet": ".structured",
+    "set_instrumentation": ".instrumentation",
+    "MetricsCollector": ".instrumentation",
+    "Span": ".instrumentation",
+    "FeatureRegistry": ".registry",
+    "FeatureCache": ".feature_cache",
+    "Fingerprint": ".fingerprint",
+    "fingerprint_dataframe": ".fingerprint",
+    "MemoryBudget": ".memory_budget",
+    "RegistryEntry": ".registry",
+    "SandboxPool": ".sandbox",
+    "MetadataSchema": ".schema",
+    "FeatureService": ".service",
+    "SharedFrame": ".shm",
+    "split_sparse": ".sparse",
+    "to_csr": ".sparse",
+    "FittedCode": ".fitted",
+    "LLMFeatTransformer": ".transformer",
+}
+
+__all__ = [
+    "set_api_key",
+    "set_cassette",
+    "set_hedging",
+    "get_llm_stats",
+    "generate_features",
+    "generate_feature_set",
+    "generate_incremental_features",
+    "generate_features_background",
+    "GenerationHandle",
+    "Feature",
+    "FeatureSet",
+    "set_instrumentation",
+    "MetricsCollector",
+    "Span",
+    "FeatureRegistry",
+    "RegistryEntry",
+    "FeatureCache",
+    "Fingerprint",
+    "fingerprint_dataframe",
+    "MemoryBudget",
+    "SandboxPool",
+    "MetadataSchema",
+    "FeatureService",
+    "SharedFrame",
+    "split_sparse",
+    "to_csr",
+    "FittedCode",
+    "LLMFeatTransformer",
+    "__version__",
+]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Cache so __getattr__ is not hit again
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
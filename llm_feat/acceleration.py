@@ -0,0 +1,234 @@
+"""Accelerated execution of element-wise arithmetic feature statements"""
+
+import ast
+import warnings
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .code_analysis import DF_NAME, Statement, split_statements
+
+try:
+    import numexpr
+except ImportError:  # Optional dependency
+    numexpr = None
+
+_BINARY_OPS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.Div: "/",
+    ast.Pow: "**",
+    ast.BitAnd: "&",
+    ast.BitOr: "|",
+}
+_UNARY_OPS = {ast.USub: "-", ast.UAdd: "+", ast.Invert: "~"}
+_COMPARE_OPS = {
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+}
+# NumPy functions with a numexpr equivalent of the same name
+_FUNCTIONS = {
+    "sqrt",
+    "sin",
+    "cos",
+    "tan",
+    "arcsin",
+    "arccos",
+    "arctan",
+    "arctan2",
+    "sinh",
+    "cosh",
+    "tanh",
+    "log",
+    "log10",
+    "log1p",
+    "exp",
+    "expm1",
+    "abs",
+    "where",
+}
+_FUNCTION_ALIASES = {"absolute": "abs"}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+@dataclass
+class NumexprStatement:
+    """A statement df['target'] = <arithmetic expression> translated to numexpr"""
+
+    target: str
+    expression: str
+    columns: dict  # df column -> numexpr variable name
+
+
+def _translate(node: ast.AST, columns: dict) -> str:
+    """Translate a pandas/NumPy expression into a numexpr expression string"""
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return repr(node.value)
+    elif isinstance(node, ast.Subscript):
+        if (
+            isinstance(node.value, ast.Name)
+            and node.value.id == DF_NAME
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        ):
+            return columns.setdefault(node.slice.value, f"c{len(columns)}")
+    elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left = _translate(node.left, columns)
+        right = _translate(node.right, columns)
+        return f"({left} {_BINARY_OPS[type(node.op)]} {right})"
+    elif isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return f"({_UNARY_OPS[type(node.op)]}{_translate(node.operand, columns)})"
+    elif isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARE_OPS:
+        left = _translate(node.left, columns)
+        right = _translate(node.comparators[0], columns)
+        return f"({left} {_COMPARE_OPS[type(node.ops[0])]} {right})"
+    elif isinstance(node, ast.Call) and not node.keywords:
+        name = None
+        if (
+            isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id in ("np", "numpy")
+        ):
+            name = _FUNCTION_ALIASES.get(node.func.attr, node.func.attr)
+        elif isinstance(node.func, ast.Name) and node.func.id == "abs":
+            name = "abs"
+        if name in _FUNCTIONS:
+            args = ", ".join(_translate(arg, columns) for arg in node.args)
+            return f"{name}({args})"
+    raise _Unsupported(ast.dump(node))
+
+
+def compile_statement(statement: Statement) -> Optional[NumexprStatement]:
+    """
+    Translate ``df['name'] = <expression>`` to numexpr if possible.
+
+    Supported expressions combine df['column'] references and numeric
+    constants with arithmetic (+ - * / **), comparison and bitwise & | ~
+    operators and element-wise NumPy functions (np.log, np.sqrt,
+    np.where, ...).
+
+    Returns:
+        NumexprStatement, or None if the statement is not supported
+    """
+    node = statement.node
+    if not (
+        isinstance(node, ast.Assign)
+        and len(node.targets) == 1
+        and isinstance(node.targets[0], ast.Subscript)
+        and isinstance(node.targets[0].value, ast.Name)
+        and node.targets[0].value.id == DF_NAME
+        and statement.writes is not None
+        and len(statement.writes) == 1
+    ):
+        return None
+    columns: dict = {}
+    try:
+        expression = _translate(node.value, columns)
+    except _Unsupported:
+        return None
+    if not columns:
+        return None  # Constant expression
+    return NumexprStatement(statement.writes[0], expression, columns)
+
+
+def _evaluate(compiled: NumexprStatement, node: ast.stmt, exec_globals: dict):
+    """
+    Evaluate a compiled statement on exec_globals['df'].
+
+    Returns:
+        The new column as an array, or None to fall back to normal
+        execution (unsupported dtype, missing column, error)
+    """
+    df = exec_globals[DF_NAME]
+    if not isinstance(df, pd.DataFrame) or not df.columns.is_unique:
+        return None
+    local_dict = {}
+    for column, name in compiled.columns.items():
+        if column not in df.columns:
+            return None  # Normal execution raises the usual KeyError
+        dtype = df[column].dtype
+        if not isinstance(dtype, np.dtype) or dtype.kind not in "biuf":
+            return None
+        local_dict[name] = df[column].to_numpy()
+
+    # Run the original statement on one row to learn the result dtype
+    # pandas would produce (numexpr upcasts e.g. abs() of integers)
+    probe = df[list(compiled.columns)].iloc[:1].copy()
+    try:
+        exec(_compile_node(node), dict(exec_globals, **{DF_NAME: probe}))
+        expected = probe[compiled.target].dtype
+        result = numexpr.evaluate(compiled.expression, local_dict=local_dict, global_dict={})
+    except Exception:
+        return None
+    if result.dtype != expected:
+        result = result.astype(expected)
+    return result
+
+
+def _compile_node(node: ast.stmt):
+    return compile(ast.Module(body=[node], type_ignores=[]), "<generated>", "exec")
+
+
+def execute_statement(statement: Statement, exec_globals: dict, use_numexpr: bool = True) -> bool:
+    """
+    Execute one statement, with numexpr if it is supported.
+
+    Returns:
+        True if the statement was evaluated with numexpr
+    """
+    if use_numexpr and numexpr is not None:
+        compiled = compile_statement(statement)
+        if compiled is not None:
+            result = _evaluate(compiled, statement.node, exec_globals)
+            if result is not None:
+                exec_globals[DF_NAME][compiled.target] = result
+                return True
+    exec(_compile_node(statement.node), exec_globals)
+    return False
+
+
+def check_numexpr() -> bool:
+    """Return True if numexpr is installed, else warn and return False"""
+    if numexpr is None:
+        warnings.warn(
+            "Accelerated execution requires numexpr (pip install numexpr); "
+            "executing generated code without it",
+            UserWarning,
+        )
+        return False
+    return True
+
+
+def run_accelerated(code: str, exec_globals: dict) -> int:
+    """
+    Execute generated code, evaluating arithmetic statements with numexpr.
+
+    Statements run in order. Each supported df['name'] = <expression>
+    statement is evaluated by numexpr, which is multi-threaded and works
+    in cache-sized blocks without a temporary array per operator; every
+    other statement, and any statement numexpr cannot handle, is executed
+    normally. Without numexpr installed, the whole code is executed
+    normally.
+
+    Args:
+        code: Generated feature code
+        exec_globals: Globals to execute in; exec_globals['df'] is modified
+
+    Returns:
+        Number of statements evaluated with numexpr
+    """
+    if not check_numexpr():
+        exec(code, exec_globals)
+        return 0
+    return sum(execute_statement(statement, exec_globals) for statement in split_statements(code))
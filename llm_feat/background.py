@@ -0,0 +1,161 @@
+"""Non-blocking feature generation for notebooks"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+import pandas as pd
+
+from .core import generate_features
+from .jupyter_utils import is_jupyter
+from .llm_client import stream_progress
+
+# Seconds between refreshes of the live progress display
+PROGRESS_INTERVAL = 0.5
+
+
+class GenerationHandle:
+    """
+    Handle to a feature generation running on a background thread.
+
+    Returned by generate_features_background(). The kernel stays free
+    while the LLM request runs; in Jupyter a live progress line (elapsed
+    time and tokens streamed) is displayed and updated, and in mode='code'
+    the generated code is injected into the next cell when it completes.
+    """
+
+    def __init__(self, target, label: str = "generate_features", show_progress: bool = True):
+        """
+        Args:
+            target: Callable run on the background thread; its return
+                    value becomes the result
+            label: Name shown in the progress display
+            show_progress: Display live progress when running in Jupyter
+        """
+        self.label = label
+        self.tokens = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._future: Future = Future()
+        self._lock = threading.Lock()
+        self._display = None
+        if show_progress and is_jupyter():
+            from IPython.display import Pretty, display
+
+            self._pretty = Pretty
+            self._display = display(Pretty(self._progress_text()), display_id=True)
+
+        # Run in a copy of this context so spans nest under the caller's
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(
+            target=context.run, args=(self._run, target), name="llm-feat-background", daemon=True
+        )
+        self._thread.start()
+        if self._display is not None:
+            threading.Thread(target=self._refresh, name="llm-feat-progress", daemon=True).start()
+
+    def _run(self, target) -> None:
+        try:
+            with stream_progress(self._add_tokens):
+                result = target()
+        except BaseException as e:
+            self.finished = time.perf_counter()
+            self._future.set_exception(e)
+        else:
+            self.finished = time.perf_counter()
+            self._future.set_result(result)
+
+    def _add_tokens(self, n: int) -> None:
+        with self._lock:
+            self.tokens += n
+
+    def _refresh(self) -> None:
+        """Update the progress display until generation finishes"""
+        while True:
+            finished = self.wait(PROGRESS_INTERVAL)
+            try:
+                self._display.update(self._pretty(self._progress_text()))
+            except Exception:
+                return
+            if finished:
+                return
+
+    def _progress_text(self) -> str:
+        if not self.done():
+            state = "running"
+        elif self._future.exception() is not None:
+            state = f"failed: {self._future.exception()}"
+        else:
+            state = "done"
+        return f"{self.label}: {state} ({self.elapsed:.1f}s, {self.tokens} tokens streamed)"
+
+    @property
+    def status(self) -> str:
+        """'running', 'done' or 'failed'"""
+        if not self.done():
+            return "running"
+        return "failed" if self._future.exception() is not None else "done"
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the generation started (until it finished)"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def done(self) -> bool:
+        """True if the generation finished, successfully or not"""
+        return self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the generation finishes; return True if it did"""
+        self._thread.join(timeout)
+        return self.done()
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Return the result of generate_features, waiting if needed.
+
+        Raises:
+            The exception raised by the generation, or TimeoutError
+        """
+        return self._future.result(timeout)
+
+    def exception(self, timeout: Optional[float] = None) -> Optional[BaseException]:
+        """Return the exception raised by the generation, or None"""
+        return self._future.exception(timeout)
+
+    def __repr__(self) -> str:
+        return f"<GenerationHandle {self._progress_text()}>"
+
+
+def generate_features_background(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame,
+    show_progress: bool = True,
+    **kwargs,
+) -> GenerationHandle:
+    """
+    Run generate_features on a background thread and return immediately.
+
+    The completion is streamed so progress can be reported. In Jupyter,
+    elapsed time and tokens streamed are displayed live in the calling
+    cell, and with mode='code' the code is injected into the next cell
+    when generation completes. Several generations can run concurrently.
+
+    Args:
+        df: Input pandas DataFrame
+        metadata_df: Metadata DataFrame (see generate_features)
+        show_progress: Display live progress in Jupyter
+        **kwargs: Other arguments of generate_features (mode, model,
+                  return_report, ...)
+
+    Returns:
+        GenerationHandle; handle.result() returns what generate_features
+        returns
+    """
+    return GenerationHandle(
+        lambda: generate_features(df, metadata_df, **kwargs),
+        label=f"generate_features ({kwargs.get('mode', 'code')})",
+        show_progress=show_progress,
+    )
@@ -0,0 +1,119 @@
+"""Record/replay cassettes for LLM completions"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Literal, Optional
+
+CassetteMode = Literal["record", "replay"]
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response"""
+
+
+def request_key(model: str, messages: list, params: dict) -> str:
+    """Return a stable hash identifying a completion request."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Append-only store of LLM requests and responses.
+
+    Each line of the cassette file is a compact JSON record holding the
+    request (messages, model, params) and the response content. In
+    ``record`` mode responses from the API are appended to the file; in
+    ``replay`` mode responses are served from the file without any network
+    call, and requests that were never recorded raise CassetteMissError.
+    """
+
+    def __init__(self, path: str, mode: CassetteMode = "replay"):
+        """
+        Open a cassette file.
+
+        Args:
+            path: Path to the cassette file (JSON Lines)
+            mode: 'record' to append live responses, 'replay' to serve
+                  recorded responses only
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}. Must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        # Later recordings of the same request win
+                        self._entries[entry["key"]] = entry
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette file not found: {path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, model: str, messages: list, params: dict) -> dict:
+        """
+        Return the recorded response for a request.
+
+        Returns:
+            Dict with 'content' and (if recorded) 'choices' and 'usage' keys
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        key = request_key(model, messages, params)
+        entry = self._entries.get(key)
+        if entry is None:
+            raise CassetteMissError(
+                f"Cassette miss: no recorded response for model={model!r} "
+                f"(key {key[:12]}) in {self.path}. Re-record the cassette with "
+                "mode='record'."
+            )
+        return entry["response"]
+
+    def record(
+        self,
+        model: str,
+        messages: list,
+        params: dict,
+        content: str | list[str],
+        usage: Optional[dict] = None,
+    ) -> None:
+        """
+        Append a request/response pair to the cassette file.
+
+        ``content`` is the response content, or the content of each choice
+        for requests with several choices (the ``n`` parameter).
+        """
+        key = request_key(model, messages, params)
+        if isinstance(content, list):
+            response = {"content": content[0] if content else ""}
+            if len(content) > 1:
+                response["choices"] = content
+        else:
+            response = {"content": content}
+        if usage:
+            response["usage"] = usage
+        entry = {
+            "key": key,
+            "request": {"model": model, "messages": messages, "params": params},
+            "response": response,
+        }
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._entries[key] = entry
@@ -0,0 +1,378 @@
+"""Command-line interface: ``llm-feat batch`` and ``llm-feat serve``"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from .core import generate_features
+from .execution import execute_code
+from .tables import read_table, write_table, write_text
+
+DATA_EXTENSIONS = (".csv", ".parquet")
+
+
+@dataclass
+class BatchJob:
+    """One dataset of a batch run and the files it produces"""
+
+    name: str
+    data_path: str
+    metadata_path: Optional[str]
+    output_path: str
+    code_path: str
+    report_path: str
+    status_path: str
+
+
+def _split_name(path: str) -> tuple[str, str]:
+    """Return (dataset name, extension) of a data file"""
+    base = os.path.basename(path)
+    for extension in DATA_EXTENSIONS:
+        if base.endswith(extension):
+            return base[: -len(extension)], extension
+    return os.path.splitext(base)
+
+
+def find_jobs(
+    inputs: list[str],
+    output_dir: str,
+    metadata_dir: Optional[str] = None,
+    metadata_suffix: str = ".metadata",
+) -> list[BatchJob]:
+    """
+    Expand directories and globs into data files and pair them with metadata.
+
+    The metadata of ``name.csv`` (or ``name.parquet``) is the file
+    ``name<metadata_suffix>.csv`` or ``.parquet`` in metadata_dir, or in
+    the data file's directory if metadata_dir is None. Files that are
+    themselves metadata are skipped.
+    """
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, f"*{extension}") for extension in DATA_EXTENSIONS]
+            paths.extend(path for match in matches for path in sorted(glob.glob(match)))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+
+    jobs = []
+    for path in dict.fromkeys(paths):
+        name, extension = _split_name(path)
+        if extension not in DATA_EXTENSIONS or name.endswith(metadata_suffix):
+            continue
+        directory = metadata_dir or os.path.dirname(path)
+        candidates = [
+            os.path.join(directory, f"{name}{metadata_suffix}{metadata_extension}")
+            for metadata_extension in DATA_EXTENSIONS
+        ]
+        prefix = os.path.join(output_dir, name)
+        jobs.append(
+            BatchJob(
+                name=name,
+                data_path=path,
+                metadata_path=next((c for c in candidates if os.path.exists(c)), None),
+                output_path=f"{prefix}{extension}",
+                code_path=f"{prefix}.py",
+                report_path=f"{prefix}.report.md",
+                status_path=f"{prefix}.status.json",
+            )
+        )
+    return jobs
+
+
+def _first_line(error: BaseException) -> str:
+    return (str(error).splitlines() or [repr(error)])[0]
+
+
+def _is_done(job: BatchJob) -> bool:
+    try:
+        with open(job.status_path, encoding="utf-8") as f:
+            status = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return status.get("status") == "done" and os.path.exists(job.output_path)
+
+
+class BatchRunner:
+    """
+    Generate and execute feature code for many datasets.
+
+    LLM requests run concurrently up to ``llm_concurrency``; generated
+    code is executed in a SandboxPool of ``workers`` processes (or in
+    this process if workers is 0), so generation for one dataset overlaps
+    execution for another. Each dataset's code is saved as soon as it is
+    generated and a status file is written last, so a rerun skips finished
+    datasets and reuses saved code instead of calling the model again.
+    """
+
+    def __init__(
+        self,
+        llm_concurrency: int = 4,
+        workers: int = 2,
+        timeout: Optional[float] = None,
+        force: bool = False,
+        log=None,
+        **generate_kwargs,
+    ):
+        """
+        Args:
+            llm_concurrency: Maximum number of LLM requests in flight
+            workers: Worker processes for executing generated code (0:
+                     execute in this process)
+            timeout: Wall-clock seconds allowed per execution (workers > 0)
+            force: Reprocess datasets that already finished, and regenerate
+                   saved code
+            log: Callable receiving progress lines (default: stderr)
+            **generate_kwargs: Passed to generate_features (model,
+                               problem_description, cascade, return_report,
+                               ...)
+        """
+        if llm_concurrency < 1:
+            raise ValueError(f"llm_concurrency must be at least 1, got {llm_concurrency}")
+        self.llm_concurrency = llm_concurrency
+        self.workers = workers
+        self.timeout = timeout
+        self.force = force
+        self.log = log or (lambda line: print(line, file=sys.stderr))
+        self.generate_kwargs = generate_kwargs
+        self._llm_slots = threading.BoundedSemaphore(llm_concurrency)
+
+    def run(self, jobs: list[BatchJob]) -> dict:
+        """
+        Process all jobs.
+
+        Returns:
+            {dataset name: 'done', 'skipped' or the error message}
+        """
+        pending = [job for job in jobs if self.force or not _is_done(job)]
+        results = {job.name: "skipped" for job in jobs if job not in pending}
+        if not pending:
+            return results
+        for job in pending:
+            os.makedirs(os.path.dirname(job.output_path) or ".", exist_ok=True)
+
+        pool = None
+        if self.workers > 0:
+            from .sandbox import SandboxPool
+
+            pool = SandboxPool(n_workers=self.workers, cpu_time_limit=None, timeout=self.timeout)
+        try:
+            threads = self.llm_concurrency + max(self.workers, 1)
+            with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="llm-feat-batch") as ex:
+                futures = {job.name: ex.submit(self._process, job, pool) for job in pending}
+                for name, future in futures.items():
+                    error = future.exception()
+                    results[name] = "done" if error is None else _first_line(error)
+        finally:
+            if pool is not None:
+                pool.close()
+        return results
+
+    def _process(self, job: BatchJob, pool) -> None:
+        start = time.perf_counter()
+        try:
+            if job.metadata_path is None:
+                raise FileNotFoundError(f"No metadata file found for {job.data_path}")
+            df = read_table(job.data_path)
+            metadata_df = read_table(job.metadata_path)
+
+            if os.path.exists(job.code_path) and not self.force:
+                with open(job.code_path, encoding="utf-8") as f:
+                    code = f.read()
+                generation = "reused"
+            else:
+                with self._llm_slots:
+                    code = generate_features(df, metadata_df, mode="code", **self.generate_kwargs)
+                if isinstance(code, tuple):
+                    code, report = code
+                    write_text(job.report_path, report or "")
+                write_text(job.code_path, code)
+                generation = "generated"
+            generated = time.perf_counter()
+
+            if pool is None:
+                result = execute_code(code, df)
+            else:
+                result = pool.execute(code, df)
+            write_table(result, job.output_path)
+            new_columns = [str(col) for col in result.columns if col not in df.columns]
+            status = {
+                "status": "done",
+                "code": generation,
+                "rows": len(result),
+                "new_columns": new_columns,
+                "generation_seconds": round(generated - start, 3),
+                "execution_seconds": round(time.perf_counter() - generated, 3),
+            }
+        except Exception as e:
+            write_text(job.status_path, json.dumps({"status": "failed", "error": str(e)}, indent=2))
+            self.log(f"FAILED {job.name}: {_first_line(e)}")
+            raise
+        write_text(job.status_path, json.dumps(status, indent=2))
+        self.log(
+            f"done   {job.name}: {len(new_columns)} features, code {generation}, "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+
+def _add_batch_parser(subparsers) -> None:
+    parser = subparsers.add_parser(
+        "batch",
+        help="Generate and add features for many CSV/Parquet files",
+        description=(
+            "Generate feature code for each data file and execute it in direct mode. "
+            "Each file needs a metadata file NAME<metadata-suffix>.csv or .parquet. "
+            "Outputs, code (.py), reports (.report.md) and status files (.status.json) "
+            "are written to the output directory; rerunning resumes where a run stopped."
+        ),
+    )
+    parser.add_argument("inputs", nargs="+", help="Data files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for outputs")
+    parser.add_argument(
+        "--metadata-dir", help="Directory of metadata files (default: next to data)"
+    )
+    parser.add_argument("--metadata-suffix", default=".metadata", help="Default: .metadata")
+    parser.add_argument("--model", default="gpt-4o", help="OpenAI model (default: gpt-4o)")
+    parser.add_argument("--cascade", nargs="+", metavar="MODEL", help="Models to try in order")
+    parser.add_argument("--problem-description", help="Description of the problem/use case")
+    parser.add_argument("--n-candidates", type=int, default=1, help="Candidates per request")
+    parser.add_argument("--structured-output", action="store_true", help="Use structured output")
+    parser.add_argument("--registry", help="FeatureRegistry database to reuse code from")
+    parser.add_argument("--report", action="store_true", help="Also write feature reports")
+    parser.add_argument(
+        "--llm-concurrency", type=int, default=4, help="LLM requests in flight (default: 4)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes executing code; 0 runs in this process (default: CPU count)",
+    )
+    parser.add_argument("--timeout", type=float, help="Seconds allowed per execution")
+    parser.add_argument("--force", action="store_true", help="Reprocess finished datasets")
+
+
+def _run_batch(args) -> int:
+    jobs = find_jobs(args.inputs, args.output_dir, args.metadata_dir, args.metadata_suffix)
+    if not jobs:
+        print("No CSV or Parquet files found", file=sys.stderr)
+        return 2
+
+    registry = None
+    if args.registry:
+        from .registry import FeatureRegistry
+
+        registry = FeatureRegistry(args.registry)
+    runner = BatchRunner(
+        llm_concurrency=args.llm_concurrency,
+        workers=args.workers,
+        timeout=args.timeout,
+        force=args.force,
+        model=args.model,
+        cascade=args.cascade,
+        problem_description=args.problem_description,
+        n_candidates=args.n_candidates,
+        structured_output=args.structured_output,
+        return_report=args.report,
+        registry=registry,
+    )
+    try:
+        results = runner.run(jobs)
+    finally:
+        if registry is not None:
+            registry.close()
+
+    counts = {"done": 0, "skipped": 0}
+    for outcome in results.values():
+        key = outcome if outcome in counts else "failed"
+        counts[key] = counts.get(key, 0) + 1
+    print(
+        f"{counts['done']} done, {counts['skipped']} skipped, {counts.get('failed', 0)} failed",
+        file=sys.stderr,
+    )
+    return 1 if counts.get("failed") else 0
+
+
+def _add_serve_parser(subparsers) -> None:
+    parser = subparsers.add_parser(
+        "serve",
+        help="Run a local feature generation service",
+        description=(
+            "Serve feature generation over HTTP: POST /jobs, GET /jobs/<id>, GET /metrics. "
+            "Jobs are queued and run with bounded LLM concurrency and a worker-process pool."
+        ),
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Default: 8765")
+    parser.add_argument(
+        "--llm-concurrency", type=int, default=4, help="LLM requests in flight (default: 4)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes executing code; 0 runs in the service (default: CPU count)",
+    )
+    parser.add_argument("--max-queue", type=int, default=1000, help="Maximum queued jobs")
+    parser.add_argument("--timeout", type=float, help="Seconds allowed per execution")
+    parser.add_argument(
+        "--cpu-time-limit",
+        type=float,
+        default=60,
+        help="CPU seconds allowed per execution (default: 60)",
+    )
+    parser.add_argument(
+        "--data-root",
+        default=os.getcwd(),
+        help="Directory job file paths are confined to (default: current directory)",
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("LLM_FEAT_SERVICE_TOKEN"),
+        help="Bearer token required on every request (default: $LLM_FEAT_SERVICE_TOKEN)",
+    )
+
+
+def _run_serve(args) -> int:
+    from .service import serve
+
+    print(f"Serving feature generation on http://{args.host}:{args.port}", file=sys.stderr)
+    serve(
+        args.host,
+        args.port,
+        token=args.token,
+        llm_concurrency=args.llm_concurrency,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        timeout=args.timeout,
+        cpu_time_limit=args.cpu_time_limit,
+        data_root=args.data_root,
+    )
+    return 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Entry point of the ``llm-feat`` command"""
+    parser = argparse.ArgumentParser(
+        prog="llm-feat", description="Automated feature engineering using LLMs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _add_batch_parser(subparsers)
+    _add_serve_parser(subparsers)
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        return _run_batch(args)
+    if args.command == "serve":
+        return _run_serve(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Static analysis of generated feature code"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Name of the DataFrame variable in generated code
+DF_NAME = "df"
+
+
+@dataclass
+class Statement:
+    """A top-level statement of generated code and the columns it touches"""
+
+    source: str
+    node: ast.stmt
+    reads: set = field(default_factory=set)  # df columns read
+    writes: Optional[list] = None  # df columns assigned; None if unknown
+    names_used: set = field(default_factory=set)  # Free variable names loaded
+    names_defined: set = field(default_factory=set)  # Variables assigned
+
+
+def _constant_keys(node: ast.AST) -> Optional[list]:
+    """Column names in a subscript key: 'a', ['a', 'b'], or None if not constant"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        keys = []
+        for element in node.elts:
+            if not (isinstance(element, ast.Constant) and isinstance(element.value, str)):
+                return None
+            keys.append(element.value)
+        return keys
+    return None
+
+
+def _is_df(node: ast.AST) -> bool:
+    return isinstance(node, ast.Name) and node.id == DF_NAME
+
+
+def _column_target(node: ast.AST) -> Optional[list]:
+    """Columns assigned by a target like df['a'], df[['a', 'b']] or df.loc[mask, 'a']"""
+    if not isinstance(node, ast.Subscript):
+        return None
+    if _is_df(node.value):
+        return _constant_keys(node.slice)
+    if (
+        isinstance(node.value, ast.Attribute)
+        and node.value.attr == "loc"
+        and _is_df(node.value.value)
+        and isinstance(node.slice, ast.Tuple)
+        and len(node.slice.elts) == 2
+    ):
+        return _constant_keys(node.slice.elts[1])
+    return None
+
+
+def is_get_dummies(node: ast.AST) -> bool:
+    """True if node is a pd.get_dummies(...) call"""
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "get_dummies"
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id in ("pd", "pandas")
+    )
+
+
+def _analyze(node: ast.stmt, source: str) -> Statement:
+    statement = Statement(source=source, node=node)
+
+    # Columns written by the statement
+    targets = []
+    if isinstance(node, ast.Assign):
+        targets = node.targets
+    elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+        targets = [node.target]
+    writes: Optional[list] = []
+    for target in targets:
+        columns = _column_target(target)
+        if columns is not None:
+            writes.extend(columns)
+        elif isinstance(target, ast.Name) and target.id != DF_NAME:
+            statement.names_defined.add(target.id)
+        else:
+            writes = None  # e.g. df = pd.concat([...]) or tuple unpacking
+            break
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        statement.names_defined.update(
+            (alias.asname or alias.name).split(".")[0] for alias in node.names
+        )
+    elif not targets:
+        writes = None  # Expressions (e.g. inplace calls), loops, etc.
+    statement.writes = writes
+
+    # Columns and names read by the statement
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Subscript) and _is_df(sub.value):
+            keys = _constant_keys(sub.slice)
+            if keys is not None and not isinstance(sub.ctx, ast.Store):
+                statement.reads.update(keys)
+        elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load):
+            statement.names_used.add(sub.id)
+        elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Store):
+            if sub.id != DF_NAME:
+                statement.names_defined.add(sub.id)
+    # Augmented assignment also reads its target
+    if isinstance(node, ast.AugAssign) and writes:
+        statement.reads.update(writes)
+    return statement
+
+
+def split_statements(code: str) -> list[Statement]:
+    """
+    Split generated code into top-level statements.
+
+    Raises:
+        SyntaxError: If the code does not parse
+    """
+    tree = ast.parse(code)
+    return [_analyze(node, ast.get_source_segment(code, node) or "") for node in tree.body]
+
+
+def feature_names(code: str) -> list[str]:
+    """Columns assigned by generated code, in order of first assignment"""
+    names: list[str] = []
+    for statement in split_statements(code):
+        for name in statement.writes or []:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def drop_dependents(statements: list[Statement], columns: set) -> tuple[list, list]:
+    """
+    Remove statements that read any of the given columns, transitively.
+
+    A statement is dropped if it reads a dropped column, or uses a
+    variable or reads a feature defined by a dropped statement.
+
+    Returns:
+        (kept statements, dropped statements)
+    """
+    dropped_columns = set(columns)
+    dropped_names: set = set()
+    kept, dropped = [], []
+    for statement in statements:
+        if statement.reads & dropped_columns or statement.names_used & dropped_names:
+            dropped.append(statement)
+            dropped_columns.update(statement.writes or [])
+            dropped_names.update(statement.names_defined)
+        else:
+            kept.append(statement)
+    return kept, dropped
@@ -1,15 +1,48 @@
 """Core functionality for llm-feat"""
 
-from typing import Literal, Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Literal, Optional
 
 import pandas as pd
 
+from .cassette import Cassette, CassetteMode
+from .code_analysis import drop_dependents, feature_names, split_statements
+from .execution import execute_code
+from .fingerprint import fingerprint_dataframe
+from .instrumentation import span
 from .jupyter_utils import get_code_string, inject_code_to_next_cell, is_jupyter
 from .llm_client import LLMClient
+from .primitives import IMPORT_LINE as PRIMITIVES_IMPORT
+from .schema import (
+    MetadataSchema,
+    as_metadata_schema,
+    diff_schema,
+    schema_signature,
+    schema_snapshot,
+)
+from .selection import select_candidate
+from .structured import FeatureSet
+from .validation import run_dry_run, sample_rows, validate_feature_code
+
+if TYPE_CHECKING:
+    from .feature_cache import FeatureCache
+    from .memory_budget import MemoryBudget
+    from .registry import FeatureRegistry
+    from .sandbox import SandboxPool
 
 # Global API key storage
 _API_KEY: Optional[str] = None
 _LLM_CLIENT: Optional[LLMClient] = None
+# Options passed to new LLMClient instances (cassette, hedging)
+_CLIENT_OPTIONS: dict = {}
+# Background generations may create the client concurrently
+_CLIENT_LOCK = threading.Lock()
+# Recent DataFrame profiles keyed by exact data fingerprint, so repeated
+# calls on the same data (e.g. mode='code' then 'direct') profile it once
+_PROFILES: OrderedDict = OrderedDict()
+_MAX_PROFILES = 32
+_PROFILES_LOCK = threading.Lock()
 
 
 def set_api_key(api_key: str) -> None:
@@ -24,17 +57,70 @@ def set_api_key(api_key: str) -> None:
     _LLM_CLIENT = None  # Reset client to use new key
 
 
+def set_cassette(path: Optional[str], mode: CassetteMode = "replay") -> None:
+    """
+    Record LLM responses to, or replay them from, a cassette file.
+
+    In 'record' mode every completion is appended to the file. In 'replay'
+    mode completions are served from the file with no API call, and a
+    request that was never recorded raises an error.
+
+    Args:
+        path: Path to the cassette file, or None to disable cassettes
+        mode: 'record' or 'replay'
+    """
+    global _LLM_CLIENT
+    _CLIENT_OPTIONS["cassette"] = Cassette(path, mode) if path else None
+    _LLM_CLIENT = None  # Reset client to use new cassette
+
+
+def set_hedging(delay: Optional[float], model: Optional[str] = None) -> None:
+    """
+    Hedge slow LLM requests to cut tail latency.
+
+    If a request has not responded within ``delay`` seconds, a second
+    request is sent (to the same model, or to ``model`` if given) and the
+    first response that parses as valid code is used. How often hedges
+    fire and win is reported by get_llm_stats().
+
+    Args:
+        delay: Seconds to wait before hedging, or None to disable hedging
+        model: Optional alternate model for the hedge request
+    """
+    global _LLM_CLIENT
+    _CLIENT_OPTIONS["hedge_delay"] = delay
+    _CLIENT_OPTIONS["hedge_model"] = model
+    _LLM_CLIENT = None  # Reset client to use new settings
+
+
+def get_llm_stats() -> dict:
+    """
+    Return request metrics of the current LLM client.
+
+    Keys include 'requests' (requests sent), 'prompt_tokens',
+    'completion_tokens', 'cached_tokens' (prompt tokens served from the
+    provider's prompt cache), 'hedge_fired', 'hedge_won', 'hedge_wasted'
+    and 'coalesced' (calls that shared an identical request already in
+    flight instead of sending one; requests + coalesced is the number of
+    calls). Metrics are reset when the client is recreated (e.g. by
+    set_api_key()).
+    """
+    if _LLM_CLIENT is None:
+        return {}
+    return dict(_LLM_CLIENT.stats)
+
+
 def _get_client() -> LLMClient:
     """Get or create LLM client instance"""
     global _LLM_CLIENT, _API_KEY
 
-    if _LLM_CLIENT is None:
-        _LLM_CLIENT = LLMClient(api_key=_API_KEY)
-
-    return _LLM_CLIENT
+    with _CLIENT_LOCK:
+        if _LLM_CLIENT is None:
+            _LLM_CLIENT = LLMClient(api_key=_API_KEY, **_CLIENT_OPTIONS)
+        return _LLM_CLIENT
 
 
-def _prepare_df_info(df: pd.DataFrame, metadata_df: Optional[pd.DataFrame] = None) -> str:
+def _prepare_df_info(df: pd.DataFrame, categorical_cols: Optional[list] = None) -> str:
     """Prepare DataFrame information string for LLM"""
     info_lines = [
         f"Shape: {df.shape[0]} rows, {df.shape[1]} columns",
@@ -59,8 +145,7 @@ def _prepare_df_info(df: pd.DataFrame, metadata_df: Optional[pd.DataFrame] = Non
         info_lines.append(stats.to_string())
 
     # Add categorical column information if metadata is provided
-    if metadata_df is not None:
-        categorical_cols = _get_categorical_columns(df, metadata_df)
+    if categorical_cols is not None:
         if categorical_cols:
             info_lines.append("\nCategorical Columns Information:")
             for col in categorical_cols:
@@ -85,140 +170,87 @@ def _prepare_df_info(df: pd.DataFrame, metadata_df: Optional[pd.DataFrame] = Non
     return "\n".join(info_lines)
 
 
-def _prepare_metadata_info(metadata_df: pd.DataFrame) -> str:
-    """Prepare metadata DataFrame information string for LLM"""
-    required_cols = [
-        "column_name",
-        "description",
-        "data_type",
-        "label_definition",
-    ]
-
-    # Validate metadata structure
-    missing_cols = [col for col in required_cols if col not in metadata_df.columns]
-    if missing_cols:
-        raise ValueError(
-            f"Metadata DataFrame missing required columns: "
-            f"{missing_cols}. Required columns: {required_cols}"
-        )
-
-    info_lines = ["Column Metadata:"]
-    for _, row in metadata_df.iterrows():
-        col_name = row["column_name"]
-        description = row["description"] if pd.notna(row["description"]) else "N/A"
-        data_type = row["data_type"] if pd.notna(row["data_type"]) else "N/A"
-        label_def = row["label_definition"] if pd.notna(row["label_definition"]) else "N/A"
-
-        info_lines.append(f"\n  Column: {col_name}")
-        info_lines.append(f"    Description: {description}")
-        info_lines.append(f"    Data Type: {data_type}")
-        if label_def != "N/A":
-            info_lines.append(f"    Label Definition: {label_def}")
-
-    return "\n".join(info_lines)
-
-
-def _extract_target_column(metadata_df: pd.DataFrame) -> Optional[str]:
-    """Extract target/label column name from metadata"""
-    if "label_definition" in metadata_df.columns:
-        label_rows = metadata_df[
-            metadata_df["label_definition"].notna() & (metadata_df["label_definition"] != "")
-        ]
-        if not label_rows.empty:
-            return label_rows.iloc[0]["column_name"]
-    return None
-
-
-def _get_categorical_columns(df: pd.DataFrame, metadata_df: pd.DataFrame) -> list:
-    """Extract list of categorical column names from metadata"""
-    categorical_cols = []
-    if "data_type" in metadata_df.columns and "column_name" in metadata_df.columns:
-        cat_rows = metadata_df[
-            metadata_df["data_type"]
-            .str.lower()
-            .isin(
-                [
-                    "categorical",
-                    "category",
-                    "cat",
-                    "string",
-                    "text",
-                    "object",
-                ]
-            )
-        ]
-        categorical_cols = [
-            row["column_name"] for _, row in cat_rows.iterrows() if row["column_name"] in df.columns
-        ]
-    return categorical_cols
-
-
-def generate_features(
+def _profile_df(df: pd.DataFrame, categorical_cols: list) -> str:
+    """_prepare_df_info, reused for data with the same exact fingerprint"""
+    try:
+        key = (fingerprint_dataframe(df, exact=True).digest, tuple(categorical_cols))
+    except TypeError:  # Unhashable values, e.g. lists in an object column
+        return _prepare_df_info(df, categorical_cols)
+    with _PROFILES_LOCK:
+        if key in _PROFILES:
+            _PROFILES.move_to_end(key)
+            return _PROFILES[key]
+    df_info = _prepare_df_info(df, categorical_cols)
+    with _PROFILES_LOCK:
+        _PROFILES[key] = df_info
+        while len(_PROFILES) > _MAX_PROFILES:
+            _PROFILES.popitem(last=False)
+    return df_info
+
+
+def _prepare_llm_inputs(
+    df: pd.DataFrame, metadata_df: pd.DataFrame | MetadataSchema
+) -> tuple[str, str, Optional[str], list]:
+    """Prepare df_info, metadata_info, target column and categorical columns"""
+    metadata = as_metadata_schema(metadata_df)
+    categorical_cols = metadata.categorical_columns(df.columns)
+    with span("profile", rows=len(df), columns=len(df.columns)):
+        df_info = _profile_df(df, categorical_cols)
+    with span("metadata"):
+        metadata_info = metadata.prompt_text()
+    return df_info, metadata_info, metadata.target, categorical_cols
+
+
+def _generate_code(
     df: pd.DataFrame,
-    metadata_df: pd.DataFrame,
-    mode: Literal["code", "direct"] = "code",
-    api_key: Optional[str] = None,
-    model: str = "gpt-4o",
-    debug: bool = False,
-    problem_description: Optional[str] = None,
-    return_report: bool = False,
-) -> pd.DataFrame | str | tuple[str, str] | tuple[pd.DataFrame, str]:
+    metadata_df: pd.DataFrame | MetadataSchema,
+    model: str,
+    problem_description: Optional[str],
+    return_report: bool,
+    structured_output: bool,
+    n_candidates: int = 1,
+    executor: Optional["SandboxPool"] = None,
+) -> tuple[str, Optional[str]]:
     """
-    Generate feature engineering code or directly add features to DataFrame.
+    Generate feature code (and the report if requested) using the LLM.
 
-    Args:
-        df: Input pandas DataFrame
-        metadata_df: Metadata DataFrame with columns: column_name,
-                    description, data_type, label_definition. Set data_type
-                    to 'categorical' for categorical columns to enable
-                    categorical feature engineering.
-        mode: 'code' to return/suggest code, 'direct' to add features
-              directly
-        api_key: OpenAI API key (optional if already set via
-                set_api_key())
-        model: OpenAI model to use (default: "gpt-4o", alternatives:
-               "gpt-4-turbo", "gpt-3.5-turbo")
-        debug: If True, print the generated code before execution (useful
-               for troubleshooting)
-        problem_description: Optional description of the problem/use case
-                           to provide additional context to the LLM for
-                           generating more relevant features
-        return_report: If True, also return a feature report containing
-                      domain understanding and explanations for each generated
-                      feature
-
-    Note:
-        Generated code uses 'df' as the DataFrame variable name.
-        If your DataFrame has a different name, replace 'df' with your
-        variable name in the generated code.
-
-    Returns:
-        - If mode='code' and return_report=False: Returns code string (and injects to next cell
-          if in Jupyter)
-        - If mode='code' and return_report=True: Returns tuple (code, report) where report
-          contains domain understanding and feature explanations
-        - If mode='direct' and return_report=False: Returns DataFrame with new features added
-        - If mode='direct' and return_report=True: Returns tuple (DataFrame, report)
-
-    Note:
-        Categorical features are automatically detected from metadata_df
-        where data_type is 'categorical', 'category', 'cat', 'string',
-        'text', or 'object'. The LLM will generate appropriate encoding
-        strategies (one-hot, target encoding, frequency encoding, etc.)
-        based on the unique value counts.
+    With n_candidates > 1, the candidates are scored on a sample of df and
+    the best is returned.
     """
-    # Set API key if provided
-    if api_key:
-        set_api_key(api_key)
-
     # Prepare information for LLM
-    df_info = _prepare_df_info(df, metadata_df)
-    metadata_info = _prepare_metadata_info(metadata_df)
-    target_column = _extract_target_column(metadata_df)
-    categorical_cols = _get_categorical_columns(df, metadata_df)
+    df_info, metadata_info, target_column, categorical_cols = _prepare_llm_inputs(df, metadata_df)
 
     # Generate feature code using LLM
     client = _get_client()
+    if n_candidates > 1:
+        candidates = client.generate_feature_candidates(
+            df_info,
+            metadata_info,
+            target_column,
+            categorical_cols,
+            model=model,
+            problem_description=problem_description,
+            return_report=return_report,
+            structured=structured_output,
+            n=n_candidates,
+        )
+        with span("select_candidate", candidates=len(candidates)):
+            best, _ = select_candidate(
+                [code for code, _ in candidates], sample_rows(df), target_column, executor
+            )
+        return candidates[best]
+
+    if structured_output:
+        feature_set = client.generate_feature_set(
+            df_info,
+            metadata_info,
+            target_column,
+            categorical_cols,
+            model=model,
+            problem_description=problem_description,
+        )
+        return feature_set.code, feature_set.report if return_report else None
+
     result = client.generate_feature_code(
         df_info,
         metadata_info,
@@ -228,12 +260,44 @@ def generate_features(
         problem_description=problem_description,
         return_report=return_report,
     )
-
     if return_report:
-        generated_code, feature_report = result
-    else:
-        generated_code = result
-        feature_report = None
+        return result
+    return result, None
+
+
+def _with_primitives_import(code: str) -> str:
+    """Prepend the import of the primitives module if code calls fe.<name>"""
+    try:
+        statements = split_statements(code)
+    except SyntaxError:
+        return code
+    uses = any("fe" in statement.names_used for statement in statements)
+    defines = any("fe" in statement.names_defined for statement in statements)
+    if uses and not defines:
+        return f"{PRIMITIVES_IMPORT}\n{code}"
+    return code
+
+
+def _deliver(
+    df: pd.DataFrame,
+    generated_code: str,
+    feature_report: Optional[str],
+    mode: str,
+    return_report: bool,
+    debug: bool,
+    executor: Optional["SandboxPool"],
+    dry_run: bool = False,
+    target_column: Optional[str] = None,
+    accelerate: bool = False,
+    cache: Optional["FeatureCache"] = None,
+    memory_budget: Optional["MemoryBudget"] = None,
+    sparse: bool = False,
+) -> pd.DataFrame | str | tuple[str, str] | tuple[pd.DataFrame, str]:
+    """Return generated code, or execute it on df, according to mode"""
+    if sparse:
+        from .sparse import sparsify_dummies
+
+        generated_code = sparsify_dummies(generated_code)
 
     # Validate that generated code contains DataFrame assignments
     if mode == "direct":
@@ -263,6 +327,7 @@ def generate_features(
 
     if mode == "code":
         # Code generation mode
+        generated_code = _with_primitives_import(generated_code)
         if is_jupyter():
             # Try to inject into next cell
             inject_code_to_next_cell(generated_code)
@@ -275,42 +340,31 @@ def generate_features(
 
     elif mode == "direct":
         # Direct feature addition mode
-        # Create a copy to avoid modifying original
-        df_result = df.copy()
+        if dry_run:
+            _check_dry_run(generated_code, df, target_column, debug, executor)
 
         # Store original column count for validation
-        original_cols = set(df_result.columns)
-        original_col_count = len(df_result.columns)
-
-        # Execute the generated code in a safe context
-        # We'll use exec with restricted globals
-        import numpy as np
-
-        safe_globals = {
-            "df": df_result,
-            "pd": pd,
-            "np": np,
-        }
+        original_cols = set(df.columns)
+        original_col_count = len(df.columns)
 
         try:
-            # Execute the generated code
+            # Execute the generated code on a copy of df, either in this
+            # process or in the given execution backend
             # Note: The code should modify 'df' in place
             # (e.g., df['new_col'] = ...)
-            exec(generated_code, safe_globals)
-
-            # After execution, get the DataFrame from safe_globals
-            # This ensures we get the modified version even if code
-            # reassigned df
-            if "df" in safe_globals:
-                df_result = safe_globals["df"]
-
-            # Verify we still have a DataFrame
-            if not isinstance(df_result, pd.DataFrame):
-                raise RuntimeError(
-                    "After code execution, 'df' is not a DataFrame. "
-                    f"Type: {type(df_result)}. "
-                    f"Generated code:\n{generated_code}"
-                )
+            with span("execute", rows=len(df)):
+                if executor is None:
+                    df_result = execute_code(
+                        generated_code,
+                        df,
+                        accelerate=accelerate,
+                        cache=cache,
+                        memory_budget=memory_budget,
+                    )
+                else:
+                    df_result = executor.execute(generated_code, df)
+            if memory_budget is not None and executor is None:
+                _report_budget_decisions(memory_budget, debug)
 
             # Check if new columns were actually added
             new_cols = set(df_result.columns) - original_cols
@@ -349,3 +403,456 @@ def generate_features(
 
     else:
         raise ValueError(f"Invalid mode: {mode}. Must be 'code' or 'direct'")
+
+
+def _report_budget_decisions(memory_budget: "MemoryBudget", debug: bool) -> None:
+    """Warn about statements the memory budget did not execute as generated"""
+    import warnings
+
+    for decision in memory_budget.decisions:
+        if decision.action != "execute":
+            warnings.warn(f"Memory budget: {decision}", UserWarning)
+    if debug:
+        print(f"MEMORY BUDGET ({memory_budget.limit / 2**20:.1f} MB):")
+        for decision in memory_budget.decisions:
+            print(f"  {decision}")
+
+
+def _check_dry_run(
+    generated_code: str,
+    df: pd.DataFrame,
+    target_column: Optional[str],
+    debug: bool,
+    executor: Optional["SandboxPool"],
+) -> None:
+    """Execute code on a sample of df and raise before the full run if it fails"""
+    import warnings
+
+    with span("dry_run", rows=len(df)):
+        report = run_dry_run(generated_code, df, target_column, executor)
+    if debug:
+        print(
+            f"Dry run on {report.sample_size} of {report.total_rows} rows: "
+            f"{report.elapsed:.3f}s, estimated full run "
+            f"{report.estimated_runtime:.1f}s and "
+            f"{report.estimated_memory / 2**20:.1f} MB"
+        )
+    if not report.ok:
+        raise RuntimeError(
+            f"Generated feature code failed a dry run on {report.sample_size} "
+            f"sample rows: {'; '.join(report.problems)}\n"
+            f"Generated code:\n{generated_code}"
+        )
+    for message in report.warnings:
+        warnings.warn(f"Dry run: {message}", UserWarning)
+
+
+def _generate_with_cascade(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame | MetadataSchema,
+    models: list,
+    executor: Optional["SandboxPool"],
+    **kwargs,
+) -> tuple[str, Optional[str], str]:
+    """
+    Generate code with each model in turn until one passes validation.
+
+    The code of each tier is validated on a sample of df; only on failure
+    is the request escalated to the next model. The serving tier is
+    recorded in the client stats as 'cascade_served:<model>'.
+
+    Returns:
+        (code, report, model that served the request)
+    """
+    client = _get_client()
+    sample_df = sample_rows(df)
+    for tier, tier_model in enumerate(models):
+        is_last = tier == len(models) - 1
+        try:
+            generated_code, feature_report = _generate_code(
+                df, metadata_df, model=tier_model, executor=executor, **kwargs
+            )
+        except RuntimeError:
+            if is_last:
+                raise
+            problems = ["Generation failed"]
+        else:
+            problems = validate_feature_code(generated_code, sample_df, executor)
+            if not problems or is_last:
+                client._count(f"cascade_served:{tier_model}")
+                return generated_code, feature_report, tier_model
+        client._count("cascade_escalations")
+        client._count(f"cascade_rejected:{tier_model}")
+    raise ValueError("cascade must contain at least one model")
+
+
+def generate_feature_set(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame | MetadataSchema,
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o",
+    problem_description: Optional[str] = None,
+) -> FeatureSet:
+    """
+    Generate features as a structured FeatureSet.
+
+    The model returns JSON constrained to a schema, so each feature's name,
+    code, input columns and rationale are available without re-parsing,
+    e.g. to execute only a subset via ``feature_set.select([...]).code``.
+
+    Args:
+        df: Input pandas DataFrame
+        metadata_df: Metadata DataFrame (see generate_features)
+        api_key: OpenAI API key (optional if already set via
+                set_api_key())
+        model: OpenAI model to use. Must support structured outputs
+               (default: "gpt-4o")
+        problem_description: Optional description of the problem/use case
+
+    Returns:
+        FeatureSet with the domain summary and the generated features
+    """
+    if api_key:
+        set_api_key(api_key)
+
+    df_info, metadata_info, target_column, categorical_cols = _prepare_llm_inputs(df, metadata_df)
+    client = _get_client()
+    return client.generate_feature_set(
+        df_info,
+        metadata_info,
+        target_column,
+        categorical_cols,
+        model=model,
+        problem_description=problem_description,
+    )
+
+
+def _obtain_code(
+    df: pd.DataFrame,
+    metadata_df: MetadataSchema,
+    model: str,
+    problem_description: Optional[str],
+    return_report: bool,
+    structured_output: bool,
+    executor: Optional["SandboxPool"] = None,
+    registry: Optional["FeatureRegistry"] = None,
+    cascade: Optional[list] = None,
+    n_candidates: int = 1,
+) -> tuple[str, Optional[str]]:
+    """Code (and report) from the registry, the model cascade or a single model"""
+    # Reuse stored code for a matching schema if a registry is given
+    entry = None
+    if registry is not None:
+        snapshot = schema_snapshot(df, metadata_df, problem_description)
+        signature = schema_signature(snapshot)
+        entry = registry.lookup(signature)
+        if entry is not None and return_report and entry.report is None:
+            entry = None  # Stored without a report; generate a new one
+
+    generate_kwargs = dict(
+        problem_description=problem_description,
+        return_report=return_report,
+        structured_output=structured_output,
+        n_candidates=n_candidates,
+    )
+    if entry is not None:
+        return entry.code, entry.report if return_report else None
+    if cascade:
+        generated_code, feature_report, model = _generate_with_cascade(
+            df, metadata_df, cascade, executor, **generate_kwargs
+        )
+    else:
+        generated_code, feature_report = _generate_code(
+            df, metadata_df, model=model, executor=executor, **generate_kwargs
+        )
+    if registry is not None:
+        registry.save(signature, generated_code, snapshot, feature_report, model)
+    return generated_code, feature_report
+
+
+def generate_features(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame | MetadataSchema,
+    mode: Literal["code", "direct"] = "code",
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o",
+    debug: bool = False,
+    problem_description: Optional[str] = None,
+    return_report: bool = False,
+    structured_output: bool = False,
+    executor: Optional["SandboxPool"] = None,
+    registry: Optional["FeatureRegistry"] = None,
+    cascade: Optional[list] = None,
+    n_candidates: int = 1,
+    dry_run: bool = False,
+    accelerate: bool = False,
+    cache: Optional["FeatureCache"] = None,
+    memory_budget: Optional["int | str | MemoryBudget"] = None,
+    sparse: bool = False,
+) -> pd.DataFrame | str | tuple[str, str] | tuple[pd.DataFrame, str]:
+    """
+    Generate feature engineering code or directly add features to DataFrame.
+
+    Args:
+        df: Input pandas DataFrame
+        metadata_df: Metadata DataFrame with columns: column_name,
+                    description, data_type, label_definition. Set data_type
+                    to 'categorical' for categorical columns to enable
+                    categorical feature engineering. A MetadataSchema built
+                    once with MetadataSchema.from_dataframe can be passed
+                    instead to skip validating and indexing the metadata
+                    on every call.
+        mode: 'code' to return/suggest code, 'direct' to add features
+              directly
+        api_key: OpenAI API key (optional if already set via
+                set_api_key())
+        model: OpenAI model to use (default: "gpt-4o", alternatives:
+               "gpt-4-turbo", "gpt-3.5-turbo")
+        debug: If True, print the generated code before execution (useful
+               for troubleshooting)
+        problem_description: Optional description of the problem/use case
+                           to provide additional context to the LLM for
+                           generating more relevant features
+        return_report: If True, also return a feature report containing
+                      domain understanding and explanations for each generated
+                      feature
+        structured_output: If True, request JSON-schema structured output
+                          (one entry per feature) instead of parsing free
+                          text. The report is built from the structured
+                          domain summary and per-feature rationales.
+        executor: Optional execution backend for mode='direct', e.g. a
+                 SandboxPool that runs the generated code in isolated worker
+                 processes with CPU-time, memory and wall-clock limits. If
+                 None, the code is executed in the current process.
+        registry: Optional FeatureRegistry. If it holds code generated for
+                 the same schema (column names, dtypes, metadata, target
+                 and problem description), that code is reused without
+                 calling the model; otherwise the new code is saved to it.
+        cascade: Optional list of models to try in order, cheapest first,
+                e.g. ["gpt-4o-mini", "gpt-4o"]. Each model's code is
+                validated on a sample of df (parses, executes, adds columns,
+                is vectorized) and only on failure is the request escalated
+                to the next model. Overrides `model`. The serving tier is
+                reported by get_llm_stats() as 'cascade_served:<model>'.
+        n_candidates: Number of alternative feature sets to sample in one
+                     request. Each candidate is executed on a sample of
+                     df in parallel and scored by the cross-validated
+                     gain of a ridge regression on the target (or, without
+                     a target, by its number of usable features); the
+                     best candidate is used. 1 (default) makes a single
+                     request as before.
+        dry_run: If True and mode='direct', first execute the code on a
+                small sample stratified by the target that includes rows
+                with missing values and zeros. Errors (e.g. a KeyError or
+                no new columns) are raised before the full data is
+                processed; object-dtype, all-missing or infinite new
+                columns produce warnings. With debug=True, the runtime
+                and memory extrapolated to the full data are printed.
+        accelerate: If True and mode='direct', statements of the form
+                   df['name'] = <element-wise arithmetic of columns> are
+                   evaluated with numexpr (multi-threaded, without a
+                   temporary array per operator); other statements run
+                   normally. Requires the optional numexpr package and
+                   applies to in-process execution (executor=None).
+        cache: Optional FeatureCache for mode='direct'. Feature columns are
+              stored per statement, keyed by the statement's code and the
+              data it reads; on later runs unchanged features are loaded
+              (memory-mapped) instead of recomputed, and only statements
+              whose code or input columns changed are executed. Applies to
+              in-process execution (executor=None).
+        memory_budget: Optional memory limit for mode='direct', in bytes, as
+                      a string such as '2GB', or a MemoryBudget. Each
+                      statement is first run on a sample to estimate the
+                      memory its new columns and its peak need on the full
+                      data; statements that would not fit are executed in
+                      row chunks, rewritten (one-hot encoding only the most
+                      frequent categories) or skipped, with a warning for
+                      each. Applies to in-process execution (executor=None)
+                      and cannot be combined with cache.
+        sparse: If True, one-hot/dummy columns created with pd.get_dummies
+               use pandas sparse dtypes (sparse=True is added to the calls
+               in the generated code), so their memory scales with the
+               number of non-zeros. llm_feat.split_sparse converts them to
+               a SciPy CSR matrix alongside the dense features.
+
+    Note:
+        Generated code uses 'df' as the DataFrame variable name.
+        If your DataFrame has a different name, replace 'df' with your
+        variable name in the generated code.
+
+    Returns:
+        - If mode='code' and return_report=False: Returns code string (and injects to next cell
+          if in Jupyter)
+        - If mode='code' and return_report=True: Returns tuple (code, report) where report
+          contains domain understanding and feature explanations
+        - If mode='direct' and return_report=False: Returns DataFrame with new features added
+        - If mode='direct' and return_report=True: Returns tuple (DataFrame, report)
+
+    Note:
+        Categorical features are automatically detected from metadata_df
+        where data_type is 'categorical', 'category', 'cat', 'string',
+        'text', or 'object'. The LLM will generate appropriate encoding
+        strategies (one-hot, target encoding, frequency encoding, etc.)
+        based on the unique value counts.
+    """
+    with span("generate_features", mode=mode):
+        # Set API key if provided
+        if api_key:
+            set_api_key(api_key)
+        # Validate and index the metadata once for all steps below
+        metadata_df = as_metadata_schema(metadata_df)
+        if memory_budget is not None:
+            from .memory_budget import MemoryBudget
+
+            if not isinstance(memory_budget, MemoryBudget):
+                memory_budget = MemoryBudget(memory_budget)
+            if cache is not None:
+                raise ValueError("cache and memory_budget cannot be combined")
+            if executor is not None:
+                import warnings
+
+                warnings.warn(
+                    "memory_budget applies to in-process execution and is ignored "
+                    "when an executor is given; use the executor's memory limit instead",
+                    UserWarning,
+                )
+
+        generated_code, feature_report = _obtain_code(
+            df,
+            metadata_df,
+            model=model,
+            problem_description=problem_description,
+            return_report=return_report,
+            structured_output=structured_output,
+            executor=executor,
+            registry=registry,
+            cascade=cascade,
+            n_candidates=n_candidates,
+        )
+
+        return _deliver(
+            df,
+            generated_code,
+            feature_report,
+            mode=mode,
+            return_report=return_report,
+            debug=debug,
+            executor=executor,
+            dry_run=dry_run,
+            target_column=metadata_df.target if dry_run else None,
+            accelerate=accelerate,
+            cache=cache,
+            memory_budget=memory_budget,
+            sparse=sparse,
+        )
+
+
+def generate_incremental_features(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame | MetadataSchema,
+    previous_code: str,
+    previous_schema: dict,
+    mode: Literal["code", "direct"] = "code",
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o",
+    debug: bool = False,
+    problem_description: Optional[str] = None,
+    executor: Optional["SandboxPool"] = None,
+    registry: Optional["FeatureRegistry"] = None,
+) -> pd.DataFrame | str:
+    """
+    Extend a previously generated pipeline after the table schema changed.
+
+    The schema of df/metadata_df is compared with previous_schema. Only the
+    added and changed columns (plus the names of existing features) are
+    sent to the model, and the new statements are appended to the
+    previous code. Statements reading removed or changed columns are
+    dropped, along with statements depending on them, so features of a
+    changed column (e.g. casts or encodings for its old type) are
+    generated again. If the target changed, target encodings anywhere in
+    the pipeline may be stale, so the whole pipeline is regenerated with
+    generate_features. If the schema is unchanged the previous code is
+    returned without calling the model.
+
+    Args:
+        df: Input pandas DataFrame with the new schema
+        metadata_df: Metadata DataFrame for the new schema
+        previous_code: Previously generated feature code
+        previous_schema: Schema snapshot the previous code was generated for
+                        (e.g. RegistryEntry.schema, or
+                        llm_feat.schema.schema_snapshot of the old data)
+        mode: 'code' to return the merged code, 'direct' to execute it
+        api_key: OpenAI API key (optional if already set via
+                set_api_key())
+        model: OpenAI model to use (default: "gpt-4o")
+        debug: If True, print the merged code
+        problem_description: Optional description of the problem/use case
+        executor: Optional execution backend for mode='direct'
+        registry: Optional FeatureRegistry to save the merged code to
+
+    Returns:
+        Merged code string (mode='code') or DataFrame with features
+        (mode='direct')
+    """
+    if api_key:
+        set_api_key(api_key)
+
+    metadata = as_metadata_schema(metadata_df)
+    snapshot = schema_snapshot(df, metadata, problem_description)
+    diff = diff_schema(previous_schema, snapshot)
+    if diff.target_changed:
+        return generate_features(
+            df,
+            metadata,
+            mode=mode,
+            model=model,
+            debug=debug,
+            problem_description=problem_description,
+            executor=executor,
+            registry=registry,
+        )
+
+    kept, _ = drop_dependents(
+        split_statements(previous_code), set(diff.removed) | set(diff.changed)
+    )
+    code_parts = [statement.source for statement in kept]
+    existing = feature_names("\n".join(code_parts))
+
+    columns = [col for col in df.columns if str(col) in set(diff.added + diff.changed)]
+    if columns:
+        df_info, metadata_info, _, categorical_cols = _prepare_llm_inputs(
+            df[columns], metadata.subset(columns)
+        )
+        client = _get_client()
+        new_code = client.generate_incremental_code(
+            df_info,
+            metadata_info,
+            existing,
+            target_column=metadata.target,
+            categorical_cols=categorical_cols,
+            model=model,
+            problem_description=problem_description,
+        )
+        # Never overwrite features the pipeline already creates
+        new_statements = [
+            statement.source
+            for statement in split_statements(new_code)
+            if not set(statement.writes or []) & set(existing)
+        ]
+        if new_statements:
+            code_parts.append(f"# Features for new or changed columns: {', '.join(columns)}")
+            code_parts.extend(new_statements)
+
+    merged_code = "\n".join(code_parts)
+    if registry is not None:
+        registry.save(schema_signature(snapshot), merged_code, snapshot, model=model)
+
+    return _deliver(
+        df,
+        merged_code,
+        None,
+        mode=mode,
+        return_report=False,
+        debug=debug,
+        executor=executor,
+    )
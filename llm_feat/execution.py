@@ -0,0 +1,86 @@
+"""Execution of generated feature engineering code"""
+
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import primitives
+
+if TYPE_CHECKING:
+    from .feature_cache import FeatureCache
+    from .memory_budget import MemoryBudget
+
+
+def build_exec_globals(df: pd.DataFrame) -> dict:
+    """Return the globals generated code is executed with"""
+    return {
+        "df": df,
+        "pd": pd,
+        "np": np,
+        "fe": primitives,
+    }
+
+
+def execute_code(
+    code: str,
+    df: pd.DataFrame,
+    copy: bool = True,
+    accelerate: bool = False,
+    cache: Optional["FeatureCache"] = None,
+    memory_budget: Optional["MemoryBudget"] = None,
+) -> pd.DataFrame:
+    """
+    Execute generated feature code on a copy of a DataFrame.
+
+    Args:
+        code: Generated code that modifies 'df' in place
+              (e.g., df['new_col'] = ...)
+        df: Input DataFrame. It is not modified unless copy=False.
+        copy: If False, execute on df itself instead of a copy
+        accelerate: If True, evaluate element-wise arithmetic statements
+                    with numexpr (see llm_feat.acceleration)
+        cache: Optional FeatureCache; feature columns of unchanged
+               statements are loaded from it instead of being recomputed
+        memory_budget: Optional MemoryBudget; statements whose output would
+                       not fit are chunked, rewritten or skipped (see
+                       llm_feat.memory_budget). Cannot be combined with cache.
+
+    Returns:
+        The DataFrame after executing the code
+
+    Raises:
+        ValueError: If both cache and memory_budget are given
+        RuntimeError: If 'df' is no longer a DataFrame after execution.
+                      Errors raised by the generated code propagate as is.
+    """
+    if cache is not None and memory_budget is not None:
+        raise ValueError("cache and memory_budget cannot be combined")
+
+    # Create a copy to avoid modifying original
+    df_result = df.copy() if copy else df
+    exec_globals = build_exec_globals(df_result)
+
+    if cache is not None:
+        cache.run(code, exec_globals, accelerate=accelerate)
+    elif memory_budget is not None:
+        memory_budget.run(code, exec_globals, accelerate=accelerate)
+    elif accelerate:
+        from .acceleration import run_accelerated
+
+        run_accelerated(code, exec_globals)
+    else:
+        exec(code, exec_globals)
+
+    # Get the DataFrame from the globals. This ensures we get the modified
+    # version even if code reassigned df
+    df_result = exec_globals.get("df", df_result)
+
+    # Verify we still have a DataFrame
+    if not isinstance(df_result, pd.DataFrame):
+        raise RuntimeError(
+            "After code execution, 'df' is not a DataFrame. "
+            f"Type: {type(df_result)}. "
+            f"Generated code:\n{code}"
+        )
+    return df_result
@@ -0,0 +1,218 @@
+"""Materialized cache of computed feature columns"""
+
+import ast
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .acceleration import check_numexpr, execute_statement
+from .code_analysis import DF_NAME, Statement, split_statements
+from .fingerprint import fingerprint_column
+
+# Names provided by the execution globals rather than by generated code
+_GLOBAL_NAMES = {DF_NAME, "pd", "np", "fe"}
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _reads_whole_frame(statement: Statement) -> bool:
+    """
+    True unless the statement only reads df through df['col'] subscripts.
+
+    Method calls such as df.groupby('a')['b'] or df.select_dtypes() read
+    columns that static analysis cannot attribute.
+    """
+    direct = set()
+    for node in ast.walk(statement.node):
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name):
+            if node.value.id == DF_NAME and (
+                isinstance(node.slice, ast.Constant)
+                or (
+                    isinstance(node.slice, (ast.List, ast.Tuple))
+                    and all(isinstance(element, ast.Constant) for element in node.slice.elts)
+                )
+            ):
+                direct.add(id(node.value))
+    return any(
+        isinstance(node, ast.Name) and node.id == DF_NAME and id(node) not in direct
+        for node in ast.walk(statement.node)
+        if not (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store))
+    )
+
+
+class FeatureCache:
+    """
+    On-disk cache of feature columns computed by generated code.
+
+    Each statement that assigns df columns is keyed by a hash of its code
+    and the fingerprints of the inputs it reads: the input columns, the
+    row index, and the keys of earlier statements that produced the
+    columns or variables it uses. When a statement's key is found, its
+    columns are loaded instead of executing it, so after a change to the
+    data or the code only the affected statements are re-executed.
+
+    Input columns are fingerprinted exactly (every value is hashed): an
+    approximate fingerprint could miss a change and return stale columns.
+
+    Columns with NumPy dtypes are stored as .npy files and loaded
+    memory-mapped (copy-on-write); other columns are pickled.
+
+    Use as the ``cache`` argument of generate_features:
+
+        cache = FeatureCache("feature_cache")
+        df_new = generate_features(df, metadata_df, mode="direct", cache=cache)
+    """
+
+    def __init__(self, path: str = "llm_feat_cache"):
+        """
+        Args:
+            path: Directory for cached columns (created if missing)
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Cache metrics: 'hits', 'misses' and 'uncacheable' statements
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def load(self, key: str) -> Optional[dict]:
+        """Return {column name: values} stored under key, or None"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(os.path.join(entry_path, "columns.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        columns = {}
+        for position, (name, stored_as) in enumerate(manifest):
+            file_path = os.path.join(entry_path, f"{position}.{stored_as}")
+            if stored_as == "npy":
+                columns[name] = np.load(file_path, mmap_mode="c")
+            else:
+                columns[name] = pd.read_pickle(file_path)
+        return columns
+
+    def store(self, key: str, columns: dict) -> None:
+        """Store {column name: Series} under key."""
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            return
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Write to a temporary directory and rename, so readers never see
+        # a partially written entry
+        tmp_path = tempfile.mkdtemp(dir=os.path.dirname(entry_path))
+        try:
+            manifest = []
+            for position, (name, series) in enumerate(columns.items()):
+                if isinstance(series.dtype, np.dtype) and series.dtype != object:
+                    np.save(os.path.join(tmp_path, f"{position}.npy"), series.to_numpy())
+                    manifest.append((name, "npy"))
+                else:
+                    series.to_pickle(os.path.join(tmp_path, f"{position}.pkl"))
+                    manifest.append((name, "pkl"))
+            with open(os.path.join(tmp_path, "columns.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.rename(tmp_path, entry_path)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def clear(self) -> None:
+        """Delete all cached columns."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+
+    def run(self, code: str, exec_globals: dict, accelerate: bool = False) -> None:
+        """
+        Execute generated code, loading unchanged feature columns from the cache.
+
+        Statements that assign df columns are cached. Statements that only
+        define variables always run. After a statement whose effect on df
+        cannot be determined (e.g. a loop or an in-place method call), the
+        remaining statements run without the cache.
+
+        Args:
+            code: Generated feature code
+            exec_globals: Globals to execute in; exec_globals['df'] is modified
+            accelerate: If True, evaluate re-executed arithmetic statements
+                        with numexpr
+        """
+        if accelerate and not check_numexpr():
+            accelerate = False
+
+        df = exec_globals[DF_NAME]
+        index_key = _digest(pd.__version__, fingerprint_column(df.index, exact=True))
+        # Input columns are fingerprinted when a statement first reads them
+        column_keys: dict = {}
+        name_keys: dict = {}
+        cacheable = df.columns.is_unique
+
+        def column_key(col) -> str:
+            if col not in column_keys:
+                column_keys[col] = (
+                    fingerprint_column(df[col], exact=True) if col in df.columns else ""
+                )
+            return column_keys[col]
+
+        for statement in split_statements(code):
+            if not cacheable or statement.writes is None:
+                cacheable = False
+                self._count("uncacheable")
+                execute_statement(statement, exec_globals, accelerate)
+                continue
+
+            if _reads_whole_frame(statement):
+                read = set(df.columns) | set(column_keys)
+            else:
+                # Written columns count as inputs too: a partial assignment
+                # such as df.loc[mask, 'x'] = 0 keeps the other rows
+                read = statement.reads | set(statement.writes)
+            inputs = sorted((repr(col), column_key(col)) for col in read)
+            names = sorted(statement.names_used & set(name_keys))
+            key = _digest(
+                ast.dump(statement.node),
+                index_key,
+                json.dumps(inputs),
+                json.dumps([(name, name_keys[name]) for name in names]),
+            )
+            for name in statement.names_defined - _GLOBAL_NAMES:
+                name_keys[name] = key
+            for col in statement.writes:
+                column_keys[col] = _digest(key, repr(col))
+
+            if not statement.writes or statement.names_defined:
+                # Variables are not materialized; the statement must run
+                execute_statement(statement, exec_globals, accelerate)
+                continue
+
+            cached = self.load(key)
+            if cached is not None:
+                self._count("hits")
+                for col, values in cached.items():
+                    # Same index as when stored, so assign without aligning
+                    exec_globals[DF_NAME][col] = (
+                        values.array if isinstance(values, pd.Series) else values
+                    )
+                continue
+
+            self._count("misses")
+            execute_statement(statement, exec_globals, accelerate)
+            result = exec_globals[DF_NAME]
+            if isinstance(result, pd.DataFrame) and result.columns.is_unique:
+                self.store(key, {col: result[col] for col in dict.fromkeys(statement.writes)})
@@ -0,0 +1,194 @@
+"""Fast DataFrame fingerprints for caching"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Rows processed at once when summarizing or hashing a column
+DEFAULT_CHUNK_ROWS = 1 << 20
+# Rows hashed at evenly spaced positions in approximate mode
+DEFAULT_SAMPLE_ROWS = 4096
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def _words(values: np.ndarray) -> np.ndarray:
+    """Reinterpret fixed-width values as unsigned integers of the same width"""
+    if values.dtype.itemsize in (1, 2, 4, 8):
+        return values.view(f"u{values.dtype.itemsize}")
+    return values.view(np.uint8)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: a bijective, well-mixed map of uint64 values"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _numpy_fingerprint(values: np.ndarray, exact: bool, sample_rows: int, chunk_rows: int) -> str:
+    """
+    Fingerprint a NumPy array with a fixed-width dtype.
+
+    Exact mode hashes every byte. Approximate mode hashes the rows at
+    evenly spaced positions plus a checksum of all values, computed chunk
+    by chunk with vectorized integer arithmetic: each value is mixed with
+    its position through a bijective hash and the results are summed, so
+    changing any single value changes the checksum, and values that move
+    change it with high probability.
+    """
+    h = _hasher()
+    h.update(f"{values.dtype.str}:{len(values)}".encode())
+    values = np.ascontiguousarray(values)
+    if exact:
+        for start in range(0, len(values), chunk_rows):
+            h.update(memoryview(values[start : start + chunk_rows]).cast("B"))
+        return h.hexdigest()
+
+    positions = np.linspace(0, len(values) - 1, min(len(values), sample_rows)).astype(np.int64)
+    h.update(values[positions].tobytes())
+    checksum = np.uint64(0)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(values), chunk_rows):
+            words = _words(values[start : start + chunk_rows]).astype(np.uint64, copy=False)
+            rows = np.arange(start, start + len(words), dtype=np.uint64)
+            mixed = _mix(words + rows * np.uint64(0x9E3779B97F4A7C15))
+            checksum += np.sum(mixed, dtype=np.uint64)
+    h.update(checksum.tobytes())
+    return h.hexdigest()
+
+
+def _object_fingerprint(series: pd.Series, exact: bool, sample_rows: int, chunk_rows: int) -> str:
+    """Fingerprint a column without a fixed-width NumPy dtype (objects, strings, ...)"""
+    h = _hasher()
+    h.update(f"{series.dtype}:{len(series)}:{int(series.isna().sum())}".encode())
+    if exact:
+        for start in range(0, len(series), chunk_rows):
+            chunk = series.iloc[start : start + chunk_rows]
+            h.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+    else:
+        positions = np.linspace(0, len(series) - 1, min(len(series), sample_rows)).astype(np.int64)
+        sample = series.iloc[positions]
+        h.update(pd.util.hash_pandas_object(sample, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def fingerprint_column(
+    series: pd.Series | pd.Index,
+    exact: bool = False,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> str:
+    """
+    Fingerprint the dtype and values of a column (or index).
+
+    Args:
+        series: Column or index
+        exact: If True, hash every value. If False (default), hash evenly
+               spaced sample rows plus a checksum of all values for
+               fixed-width dtypes, or only the sample rows and missing
+               value count for other dtypes such as object or string
+        sample_rows: Rows sampled in approximate mode
+        chunk_rows: Rows processed at a time
+
+    Returns:
+        Hex digest
+    """
+    if isinstance(series, pd.Index):
+        if isinstance(series, pd.RangeIndex):
+            return f"range:{series.start}:{series.stop}:{series.step}"
+        series = series.to_series(index=pd.RangeIndex(len(series)))
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        h = _hasher()
+        h.update(f"category:{dtype.ordered}".encode())
+        h.update(pd.util.hash_pandas_object(dtype.categories, index=False).to_numpy().tobytes())
+        codes = series.cat.codes.to_numpy()
+        h.update(_numpy_fingerprint(codes, exact, sample_rows, chunk_rows).encode())
+        return h.hexdigest()
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        return _numpy_fingerprint(series.to_numpy(), exact, sample_rows, chunk_rows)
+    return _object_fingerprint(series, exact, sample_rows, chunk_rows)
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Identity of a DataFrame, as a whole and per column"""
+
+    digest: str
+    schema: str
+    index: str
+    columns: dict = field(default_factory=dict)  # Column name -> fingerprint
+    exact: bool = False
+
+    def changed_columns(self, other: "Fingerprint") -> list:
+        """Columns that were added, removed or changed relative to other"""
+        names = list(self.columns) + [col for col in other.columns if col not in self.columns]
+        return [col for col in names if self.columns.get(col) != other.columns.get(col)]
+
+
+def fingerprint_dataframe(
+    df: pd.DataFrame,
+    exact: bool = False,
+    n_jobs: Optional[int] = None,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Fingerprint:
+    """
+    Compute a fingerprint of a DataFrame.
+
+    The schema (column names and dtypes), the index and each column are
+    fingerprinted separately, so caches can invalidate single columns.
+    Columns are processed in parallel threads; hashing and the NumPy
+    checksums release the GIL.
+
+    In approximate mode (default), fixed-width columns are summarized by
+    a position-mixed checksum of all values plus a hash of evenly
+    spaced rows, which is much cheaper than pd.util.hash_pandas_object
+    and still changes when any value changes. Object and string columns
+    are only sampled; use exact=True when edits to such columns that keep
+    the sampled rows and missing counts unchanged must be detected.
+
+    Args:
+        df: DataFrame
+        exact: If True, hash every value of every column
+        n_jobs: Number of threads (default: number of CPUs, at most 32)
+        sample_rows: Rows sampled per column in approximate mode
+        chunk_rows: Rows processed at a time
+
+    Returns:
+        Fingerprint
+    """
+    names = list(df.columns)
+    schema = _hasher()
+    for name, dtype in zip(names, df.dtypes):
+        schema.update(f"{name!r}:{dtype}\0".encode())
+
+    def column(position: int) -> str:
+        return fingerprint_column(df.iloc[:, position], exact, sample_rows, chunk_rows)
+
+    n_jobs = n_jobs or min(32, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(n_jobs, len(names) + 1))) as pool:
+        index = pool.submit(fingerprint_column, df.index, exact, sample_rows, chunk_rows)
+        column_fingerprints = list(pool.map(column, range(len(names))))
+
+    digest = _hasher()
+    digest.update(schema.hexdigest().encode())
+    digest.update(index.result().encode())
+    for value in column_fingerprints:
+        digest.update(value.encode())
+    return Fingerprint(
+        digest=digest.hexdigest(),
+        schema=schema.hexdigest(),
+        index=index.result(),
+        columns=dict(zip(names, column_fingerprints)),
+        exact=exact,
+    )
@@ -0,0 +1,573 @@
+"""Generated code with its data-dependent statistics fitted once"""
+
+import ast
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from . import primitives
+from .code_analysis import DF_NAME
+from .execution import build_exec_globals
+
+# Name of the runtime object in the globals of rewritten code
+STATE_NAME = "_llm_feat_state"
+
+# Methods that reduce a column, frame or groupby to values learned from the data
+_REDUCTIONS = {
+    "mean",
+    "median",
+    "std",
+    "var",
+    "sem",
+    "skew",
+    "kurt",
+    "sum",
+    "prod",
+    "min",
+    "max",
+    "idxmin",
+    "idxmax",
+    "count",
+    "size",
+    "nunique",
+    "mode",
+    "unique",
+    "value_counts",
+    "quantile",
+    "first",
+    "last",
+    "agg",
+    "aggregate",
+}
+# Reductions whose positional arguments are not an axis
+_POSITIONAL_OK = {"quantile", "value_counts", "agg", "aggregate"}
+_NUMPY_REDUCTIONS = {
+    "mean",
+    "median",
+    "std",
+    "var",
+    "sum",
+    "min",
+    "max",
+    "amin",
+    "amax",
+    "ptp",
+    "nanmean",
+    "nanmedian",
+    "nanstd",
+    "nanvar",
+    "nansum",
+    "nanmin",
+    "nanmax",
+    "percentile",
+    "nanpercentile",
+    "quantile",
+    "nanquantile",
+}
+_NUMPY_Q_ARG = {"percentile", "nanpercentile", "quantile", "nanquantile"}
+# Receivers on which a reduction gives one value per row
+_ROW_WISE = {"rolling", "expanding", "ewm", "resample", "str", "dt", "cat"}
+# Per-group statistics that groupby(...).transform broadcasts to the rows
+_GROUP_STATS = {
+    "mean",
+    "median",
+    "std",
+    "var",
+    "sem",
+    "skew",
+    "sum",
+    "prod",
+    "min",
+    "max",
+    "count",
+    "size",
+    "nunique",
+    "first",
+    "last",
+}
+_STATEFUL_PRIMITIVES = {
+    "frequency_encode",
+    "target_encode",
+    "group_rare",
+    "group_aggregate",
+    "bin_numeric",
+}
+_STATEFUL_PANDAS = {"get_dummies", "qcut", "cut", "factorize", "Categorical"}
+# Operations whose result for a row depends on the other rows of the frame
+# they run on; they are not fitted, so their results change with chunking
+_ROW_RELATIVE = {
+    "rank",
+    "diff",
+    "shift",
+    "pct_change",
+    "rolling",
+    "expanding",
+    "ewm",
+    "resample",
+    "cumsum",
+    "cumprod",
+    "cummax",
+    "cummin",
+    "cumcount",
+    "ngroup",
+    "ffill",
+    "bfill",
+    "interpolate",
+    "duplicated",
+    "drop_duplicates",
+    "sort_values",
+    "sort_index",
+    "nlargest",
+    "nsmallest",
+    "head",
+    "tail",
+}
+
+
+def _uses_df(node: ast.AST) -> bool:
+    return any(isinstance(sub, ast.Name) and sub.id == DF_NAME for sub in ast.walk(node))
+
+
+def _has_axis(call: ast.Call) -> bool:
+    return any(keyword.arg == "axis" for keyword in call.keywords)
+
+
+def _is_reduction(call: ast.Call) -> bool:
+    """True for df-derived reductions such as df['a'].mean() or np.percentile(df['a'], 99)"""
+    func = call.func
+    if not isinstance(func, ast.Attribute) or _has_axis(call):
+        return False
+    if isinstance(func.value, ast.Name) and func.value.id in ("np", "numpy"):
+        if func.attr not in _NUMPY_REDUCTIONS:
+            return False
+        max_args = 2 if func.attr in _NUMPY_Q_ARG else 1
+        return 0 < len(call.args) <= max_args and _uses_df(call.args[0])
+    if func.attr not in _REDUCTIONS or not _uses_df(func.value):
+        return False
+    if call.args and func.attr not in _POSITIONAL_OK:
+        return False  # e.g. df[cols].sum(1)
+    return not any(
+        isinstance(sub, ast.Attribute) and sub.attr in _ROW_WISE for sub in ast.walk(func.value)
+    )
+
+
+def _is_group_transform(call: ast.Call) -> bool:
+    """True for <groupby>.transform('<stat>') with a per-group statistic"""
+    return (
+        isinstance(call.func, ast.Attribute)
+        and call.func.attr == "transform"
+        and bool(call.args)
+        and isinstance(call.args[0], ast.Constant)
+        and call.args[0].value in _GROUP_STATS
+        and any(
+            isinstance(sub, ast.Attribute) and sub.attr == "groupby"
+            for sub in ast.walk(call.func.value)
+        )
+    )
+
+
+def _is_row_relative(call: ast.Call) -> bool:
+    """True for calls such as df['a'].rank() or <groupby>.transform('cumsum')"""
+    func = call.func
+    if not isinstance(func, ast.Attribute):
+        return False
+    if func.attr in _ROW_RELATIVE:
+        return True
+    return func.attr in ("transform", "apply", "agg", "aggregate") and any(
+        isinstance(arg, ast.Constant) and arg.value in _ROW_RELATIVE for arg in call.args
+    )
+
+
+def _site(site_id: int) -> ast.Call:
+    return ast.Call(
+        func=ast.Attribute(ast.Name(STATE_NAME, ast.Load()), "site", ast.Load()),
+        args=[ast.Constant(site_id)],
+        keywords=[],
+    )
+
+
+class _Rewriter(ast.NodeTransformer):
+    """Route every data-dependent call of generated code through a numbered site"""
+
+    def __init__(self):
+        self.sites = 0
+        # Whether a row-relative operation remains outside the fitted values
+        self.row_relative = False
+
+    def _next(self) -> ast.Call:
+        self.sites += 1
+        return _site(self.sites - 1)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        if _is_reduction(node):
+            # The whole expression becomes a fitted value; its parts are
+            # only evaluated during fit
+            return ast.Call(
+                func=ast.Attribute(self._next(), "value", ast.Load()),
+                args=[ast.Lambda(_no_args(), node)],
+                keywords=[],
+            )
+        self.generic_visit(node)
+        self.row_relative = self.row_relative or _is_row_relative(node)
+        func = node.func
+        if _is_group_transform(node):
+            return ast.Call(
+                func=ast.Attribute(self._next(), "group_transform", ast.Load()),
+                args=[func.value, *node.args],
+                keywords=node.keywords,
+            )
+        if (
+            isinstance(func, ast.Attribute)
+            and func.attr == "astype"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and node.args[0].value == "category"
+        ):
+            return ast.Call(
+                func=ast.Attribute(self._next(), "astype_category", ast.Load()),
+                args=[func.value],
+                keywords=[],
+            )
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+            if (func.value.id == "fe" and func.attr in _STATEFUL_PRIMITIVES) or (
+                func.value.id in ("pd", "pandas") and func.attr in _STATEFUL_PANDAS
+            ):
+                if func.attr == "Categorical" and any(
+                    keyword.arg == "categories" for keyword in node.keywords
+                ):
+                    return node  # Categories given explicitly
+                node.func = ast.Attribute(self._next(), func.attr, ast.Load())
+        return node
+
+
+def _no_args() -> ast.arguments:
+    return ast.arguments(
+        posonlyargs=[], args=[], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[]
+    )
+
+
+def _rewrite(code: str) -> tuple[str, _Rewriter]:
+    rewriter = _Rewriter()
+    tree = ast.fix_missing_locations(rewriter.visit(ast.parse(code)))
+    return ast.unparse(tree), rewriter
+
+
+def rewrite_stateful(code: str) -> tuple[str, int]:
+    """
+    Rewrite generated code so its data-dependent statistics can be fitted.
+
+    Returns:
+        (rewritten code, number of stateful sites)
+    """
+    rewritten, rewriter = _rewrite(code)
+    return rewritten, rewriter.sites
+
+
+def _lookup(table: pd.Series | pd.DataFrame, keys) -> np.ndarray:
+    """Values of table at the given keys (NaN for unseen keys)"""
+    positions = table.index.get_indexer(keys)
+    values = table.to_numpy()
+    if values.dtype.kind in "biu":
+        values = values.astype(float)
+    if values.dtype.kind not in "fc":
+        values = values.astype(object)
+    result = values[np.maximum(positions, 0)]
+    result[positions < 0] = np.nan
+    return result
+
+
+def _key_index(df: pd.DataFrame, keys: list) -> pd.Index:
+    if len(keys) == 1:
+        return pd.Index(df[keys[0]])
+    return pd.MultiIndex.from_frame(df[keys])
+
+
+def _categorical(values, dtype: pd.CategoricalDtype) -> pd.Series:
+    """values as a categorical series of dtype; values not in its categories become missing"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    return series.where(series.isin(dtype.categories)).astype(dtype)
+
+
+class _Runtime:
+    """Records (fit) or replays (transform) the values of stateful sites"""
+
+    def __init__(self, state: dict, fitting: bool):
+        self.state = state
+        self.fitting = fitting
+        self.occurrences: dict = {}
+
+    def site(self, site_id: int) -> "_Site":
+        # Sites in loops run once per iteration; each run is fitted separately
+        occurrence = self.occurrences.get(site_id, 0)
+        self.occurrences[site_id] = occurrence + 1
+        return _Site(self, (site_id, occurrence))
+
+
+class _Site:
+    """Fitted replacements of data-dependent operations at one call site"""
+
+    def __init__(self, runtime: _Runtime, key: tuple):
+        self.runtime = runtime
+        self.key = key
+
+    @property
+    def fitting(self) -> bool:
+        return self.runtime.fitting
+
+    def _save(self, state) -> None:
+        self.runtime.state[self.key] = state
+
+    def _load(self):
+        try:
+            return self.runtime.state[self.key]
+        except KeyError:
+            raise RuntimeError(
+                f"Statement at site {self.key[0]} was not executed during fit; "
+                "generated code whose control flow depends on the data cannot be fitted"
+            ) from None
+
+    def value(self, compute):
+        if self.fitting:
+            value = compute()
+            self._save(value)
+            return value
+        value = self._load()
+        return value.copy() if isinstance(value, (pd.Series, pd.DataFrame, np.ndarray)) else value
+
+    def group_transform(self, grouped, stat, *args, **kwargs):
+        if self.fitting:
+            result = grouped.transform(stat, *args, **kwargs)
+            self._save((grouped.agg(stat, *args, **kwargs), getattr(result, "name", None)))
+            return result
+        table, name = self._load()
+        groups = grouped.ngroup()
+        per_group = table.reindex(grouped.size().index)
+        positions = groups.to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(positions)
+        taken = per_group.iloc[np.where(valid, positions, 0).astype(np.int64)]
+        taken = taken.set_axis(groups.index)
+        if isinstance(taken, pd.DataFrame):
+            taken = taken.astype(float) if (~valid).any() else taken
+            taken.loc[~valid] = np.nan
+            return taken
+        values = taken.to_numpy()
+        if (~valid).any():
+            values = values.astype(float) if values.dtype.kind in "biu" else values.copy()
+            values[~valid] = np.nan
+        return pd.Series(values, index=groups.index, name=name)
+
+    def astype_category(self, values):
+        if self.fitting:
+            result = values.astype("category")
+            self._save(result.dtype)
+            return result
+        return _categorical(values, self._load())
+
+    # --- fe primitives ---
+
+    def frequency_encode(self, series: pd.Series, normalize: bool = True) -> pd.Series:
+        if self.fitting:
+            self._save((series.value_counts(dropna=False), len(series)))
+            return primitives.frequency_encode(series, normalize)
+        counts, total = self._load()
+        values = np.nan_to_num(_lookup(counts, series).astype(float), nan=0.0)
+        if normalize:
+            values = values / max(total, 1)
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def target_encode(
+        self,
+        series: pd.Series,
+        target: pd.Series,
+        n_splits: int = 5,
+        smoothing: float = 10.0,
+        random_state: int = 0,
+    ) -> pd.Series:
+        name = f"{series.name}_target_mean"
+        if self.fitting:
+            # Out-of-fold encoding for the fitted rows, full-data means afterwards
+            y = pd.to_numeric(target, errors="coerce")
+            labeled = y.notna()
+            stats = y[labeled].groupby(series[labeled], dropna=False).agg(["sum", "count"])
+            prior = y[labeled].mean() if labeled.any() else np.nan
+            means = (stats["sum"] + smoothing * prior) / (stats["count"] + smoothing)
+            self._save((means, prior))
+            return primitives.target_encode(series, target, n_splits, smoothing, random_state)
+        means, prior = self._load()
+        values = _lookup(means, series).astype(float)
+        values[np.isnan(values)] = prior
+        return pd.Series(values, index=series.index, name=name)
+
+    def group_rare(
+        self,
+        series: pd.Series,
+        min_frequency: float = 0.01,
+        min_count: Optional[int] = None,
+        other: str = "Other",
+        max_categories: Optional[int] = None,
+    ) -> pd.Series:
+        if self.fitting:
+            result = primitives.group_rare(series, min_frequency, min_count, other, max_categories)
+            merged = len(result.cat.categories) < series.nunique() or other in result.cat.categories
+            self._save((result.dtype, merged))
+            return result
+        dtype, merged = self._load()
+        result = _categorical(series, dtype)
+        if merged and other in dtype.categories:
+            result[result.isna() & series.notna()] = other
+        return result.rename(series.name)
+
+    def group_aggregate(
+        self, df: pd.DataFrame, by: str | list[str], column: str, stat: str = "mean"
+    ) -> pd.Series:
+        keys = [by] if isinstance(by, str) else list(by)
+        if self.fitting:
+            result = primitives.group_aggregate(df, by, column, stat)
+            values = pd.to_numeric(df[column], errors="coerce")
+            grouped = values.groupby([df[key] for key in keys], dropna=False)
+            table = grouped.mean() if stat in ("diff", "ratio") else grouped.agg(stat)
+            self._save(table)
+            return result
+        mean_or_stat = _lookup(self._load(), _key_index(df, keys)).astype(float)
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if stat == "diff":
+                result = values - mean_or_stat
+            elif stat == "ratio":
+                result = np.where(mean_or_stat != 0, values / mean_or_stat, np.nan)
+            else:
+                result = mean_or_stat
+        name = f"{column}_{stat}_by_{'_'.join(map(str, keys))}"
+        return pd.Series(result, index=df.index, name=name)
+
+    def bin_numeric(self, series: pd.Series, bins: int = 10, strategy: str = "quantile"):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        if self.fitting:
+            finite = values[np.isfinite(values)]
+            if strategy == "quantile" and len(finite):
+                edges = np.quantile(finite, np.linspace(0, 1, bins + 1))
+            elif len(finite):
+                edges = np.linspace(finite.min(), finite.max(), bins + 1)
+            self._save(np.unique(edges)[1:-1] if len(finite) else None)
+            return primitives.bin_numeric(series, bins, strategy)
+        inner_edges = self._load()
+        if inner_edges is None:
+            return pd.Series(np.full(len(values), -1, dtype=np.int64), index=series.index)
+        codes = np.searchsorted(inner_edges, values, side="right")
+        return pd.Series(
+            np.where(np.isnan(values), -1, codes), index=series.index, name=series.name
+        )
+
+    # --- pandas functions ---
+
+    def get_dummies(self, *args, **kwargs) -> pd.DataFrame:
+        result = pd.get_dummies(*args, **kwargs)
+        if self.fitting:
+            self._save(result.dtypes)
+            return result
+        dtypes = self._load()
+        for col in dtypes.index.difference(result.columns, sort=False):
+            result[col] = pd.Series(0, index=result.index).astype(dtypes[col])
+        return result[list(dtypes.index)]
+
+    def _binned(self, function, x, bins, kwargs: dict):
+        retbins = kwargs.pop("retbins", False)
+        if self.fitting:
+            result, edges = function(x, bins, retbins=True, **kwargs)
+            self._save(edges)
+        else:
+            edges = self._load()
+            if function is pd.qcut:
+                kwargs["include_lowest"] = True
+            # Values outside the fitted range fall into the first or last bin
+            clipped = pd.Series(x).clip(edges[0], edges[-1])
+            result = pd.cut(clipped, edges, **kwargs)
+            if not isinstance(x, pd.Series):
+                result = result.to_numpy() if isinstance(result, pd.Series) else result
+        return (result, edges) if retbins else result
+
+    def qcut(self, x, q, **kwargs):
+        return self._binned(pd.qcut, x, q, kwargs)
+
+    def cut(self, x, bins, **kwargs):
+        return self._binned(pd.cut, x, bins, kwargs)
+
+    def factorize(self, values, **kwargs):
+        if self.fitting:
+            codes, uniques = pd.factorize(values, **kwargs)
+            self._save(uniques)
+            return codes, uniques
+        uniques = self._load()
+        return pd.Index(uniques).get_indexer(values), uniques
+
+    def Categorical(self, values, **kwargs):
+        if self.fitting:
+            result = pd.Categorical(values, **kwargs)
+            self._save(result.dtype)
+            return result
+        return pd.Categorical(_categorical(values, self._load()))
+
+
+class FittedCode:
+    """
+    Generated feature code with its data-dependent statistics fitted once.
+
+    Generated code computes statistics (means, quantiles, frequency maps,
+    group aggregates, bin edges, one-hot categories) on whatever frame it
+    runs on. The code is rewritten so that each such operation records
+    its statistics when fitting and replays them when transforming:
+
+    - reductions of df-derived values (df['a'].mean(), value_counts(),
+      df.groupby(...)['b'].mean(), np.percentile(df['a'], 99), ...)
+      become constants;
+    - groupby(...).transform('<stat>') looks up the fitted group values;
+    - fe primitives, pd.get_dummies, pd.qcut/cut, pd.factorize,
+      pd.Categorical and .astype('category') reuse the fitted categories,
+      maps and edges. fe.target_encode is out-of-fold when fitting and
+      uses the full fitted means when transforming.
+
+    Operations that depend on the other rows of the frame being
+    transformed (rank, diff, shift, rolling windows, cumulative sums) are
+    not fitted; row_relative is True if the code uses any, in which case
+    transforming row chunks separately gives different results than
+    transforming the whole frame. The object is picklable.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.rewritten, rewriter = _rewrite(code)
+        self.n_sites = rewriter.sites
+        self.row_relative = rewriter.row_relative
+        self.state: dict = {}
+        self.fitted = False
+        self._compiled = None
+
+    def _run(self, df: pd.DataFrame, fitting: bool) -> pd.DataFrame:
+        if self._compiled is None:
+            self._compiled = compile(self.rewritten, "<generated>", "exec")
+        exec_globals = build_exec_globals(df.copy())
+        exec_globals[STATE_NAME] = _Runtime(self.state, fitting)
+        exec(self._compiled, exec_globals)
+        result = exec_globals[DF_NAME]
+        if not isinstance(result, pd.DataFrame):
+            raise RuntimeError(f"After code execution, 'df' is not a DataFrame: {type(result)}")
+        return result
+
+    def fit(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Execute the code on df, recording its statistics; return the result"""
+        self.state = {}
+        result = self._run(df, fitting=True)
+        self.fitted = True
+        return result
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Execute the code on df with the fitted statistics"""
+        if not self.fitted:
+            raise RuntimeError("FittedCode.transform called before fit")
+        return self._run(df, fitting=False)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_compiled"] = None  # Code objects cannot be pickled
+        return state
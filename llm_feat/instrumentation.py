@@ -0,0 +1,197 @@
+"""Instrumentation hooks for timing the stages of feature generation"""
+
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Callable, Optional
+
+# Functions called with every finished Span. Empty: instrumentation is off.
+_HOOKS: tuple = ()
+_CURRENT_SPAN: contextvars.ContextVar = contextvars.ContextVar("llm_feat_span", default=None)
+
+
+class Span:
+    """
+    A timed pipeline stage.
+
+    Field names follow OpenTelemetry (name, attributes, start_time_ns,
+    end_time_ns), so a hook can forward spans to a tracer, e.g.
+
+        def to_otel(span):
+            otel_span = tracer.start_span(
+                span.name, start_time=span.start_time_ns, attributes=span.attributes
+            )
+            otel_span.end(end_time=span.end_time_ns)
+    """
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "parent",
+        "start_time_ns",
+        "end_time_ns",
+        "duration",
+        "error",
+        "discarded",
+        "_start",
+        "_token",
+    )
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent  # Enclosing span, if any
+        self.start_time_ns = 0
+        self.end_time_ns = 0
+        self.duration = 0.0  # Seconds
+        self.error: Optional[str] = None
+        self.discarded = False
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def discard(self) -> None:
+        """Do not report this span to the hooks when it ends"""
+        self.discarded = True
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT_SPAN.set(self)
+        self.start_time_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self._start
+        self.end_time_ns = self.start_time_ns + int(self.duration * 1e9)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _CURRENT_SPAN.reset(self._token)
+        if not self.discarded:
+            for hook in _HOOKS:
+                hook(self)
+        return False
+
+
+class _NoopSpan:
+    """Returned by span() while instrumentation is off"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def discard(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes) -> Span | _NoopSpan:
+    """
+    Time a block as a named stage: ``with span("execute") as s: ...``
+
+    While no hook is installed this returns a shared no-op object, so
+    instrumented code costs one tuple check per stage.
+    """
+    if not _HOOKS:
+        return _NOOP_SPAN
+    return Span(name, attributes, _CURRENT_SPAN.get())
+
+
+def set_instrumentation(*hooks: Callable[[Span], None]) -> None:
+    """
+    Install functions to call with every finished pipeline stage.
+
+    Stages are reported as Span objects named 'generate_features',
+    'profile' (DataFrame profiling), 'metadata' (metadata formatting),
+    'prompt_build', 'llm_request' (including hedges; attributes model,
+    attempts, retries), 'llm_completion' (one API call; attributes model,
+    prompt_tokens, completion_tokens, cached_tokens), 'parse' and
+    'execute'. Hooks are called from the thread that ran the stage.
+
+    Args:
+        *hooks: Callables taking a Span, e.g. a MetricsCollector.
+                Call without arguments to turn instrumentation off.
+    """
+    global _HOOKS
+    _HOOKS = tuple(hooks)
+
+
+def _percentile(values: list, q: float) -> float:
+    """Linearly interpolated percentile of sorted values"""
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class MetricsCollector:
+    """
+    In-memory hook that aggregates span durations across calls.
+
+        collector = MetricsCollector()
+        set_instrumentation(collector)
+        ...
+        collector.summary()["llm_request"]["p90"]
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        """
+        Args:
+            max_samples: Durations kept per stage for percentiles; older
+                         samples are discarded
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all collected metrics."""
+        with self._lock:
+            self._durations: dict = defaultdict(lambda: deque(maxlen=self.max_samples))
+            self._counts: Counter = Counter()
+            self._errors: Counter = Counter()
+            self._totals: dict = defaultdict(Counter)
+
+    def __call__(self, span: Span) -> None:
+        with self._lock:
+            self._durations[span.name].append(span.duration)
+            self._counts[span.name] += 1
+            if span.error is not None:
+                self._errors[span.name] += 1
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._totals[span.name][key] += value
+
+    def summary(self, percentiles: tuple = (50, 90, 99)) -> dict:
+        """
+        Aggregate metrics per stage.
+
+        Returns:
+            Dict mapping stage name to a dict with 'count', 'errors',
+            'mean', 'max' and 'p<q>' durations in seconds, plus the sum of
+            each numeric attribute (e.g. 'prompt_tokens')
+        """
+        with self._lock:
+            result = {}
+            for name, durations in self._durations.items():
+                values = sorted(durations)
+                stage = {
+                    "count": self._counts[name],
+                    "errors": self._errors[name],
+                    "mean": sum(values) / len(values),
+                    "max": values[-1],
+                }
+                for q in percentiles:
+                    stage[f"p{q}"] = _percentile(values, q)
+                stage.update(self._totals[name])
+                result[name] = stage
+            return result
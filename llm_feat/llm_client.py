@@ -1,29 +1,259 @@
 """LLM client for OpenAI GPT-4 integration"""
 
+import ast
+import contextvars
+import copy
 import os
-from typing import Optional
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
 
-from openai import OpenAI
+from .cassette import Cassette, request_key
+from .instrumentation import span
+from .structured import RESPONSE_FORMAT, FeatureSet, parse_feature_set
+
+SYSTEM_PROMPT = (
+    "You are an expert data scientist specializing "
+    "in feature engineering for machine learning. "
+    "You understand domain context from metadata "
+    "descriptions and generate contextually relevant "
+    "features that are specifically designed to help "
+    "predict the target variable. Generate clean, "
+    "efficient Python code for creating new features "
+    "from existing numerical and categorical columns "
+    "in pandas DataFrames."
+)
+
+
+# Called with the number of newly streamed tokens while a completion
+# streams; set for a thread or task with stream_progress()
+_STREAM_PROGRESS: contextvars.ContextVar[Optional[Callable[[int], None]]] = contextvars.ContextVar(
+    "llm_feat_stream_progress", default=None
+)
+
+
+# Set in the context of a hedged attempt; once the event is set, the
+# attempt lost and its response is discarded
+_HEDGE_ABANDONED: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "llm_feat_hedge_abandoned", default=None
+)
+
+
+class _HedgeAbandoned(Exception):
+    """Raised in a hedged attempt whose response arrived after it lost"""
+
+
+@contextmanager
+def stream_progress(callback: Callable[[int], None]) -> Iterator[None]:
+    """
+    Stream completions requested in this context and report their progress.
+
+    Args:
+        callback: Called with the number of new tokens as each chunk of a
+                  response arrives (from the request thread)
+    """
+    token = _STREAM_PROGRESS.set(callback)
+    try:
+        yield
+    finally:
+        _STREAM_PROGRESS.reset(token)
+
+
+# Sampling temperature for multi-candidate generation; higher than the
+# single-request default so the candidates differ from each other
+CANDIDATE_TEMPERATURE = 0.8
+
+
+# Static prompt content. It comes before any dataset-specific content so
+# that the long invariant part of the prompt forms a stable prefix which
+# the provider can serve from its prompt-prefix cache.
+FEATURE_INSTRUCTIONS = """CRITICAL INSTRUCTIONS - READ CAREFULLY:
+
+1. UNDERSTAND THE DOMAIN FROM METADATA:
+   - Carefully read the column descriptions in the METADATA INFORMATION
+     section below
+   - Understand what each column represents in the domain context
+   - Use this domain knowledge to generate features that make sense for
+     this specific problem
+
+2. UNDERSTAND THE PREDICTION TASK:
+   - If a target column is specified, carefully read its label_definition
+     in the metadata
+   - Understand what you are trying to predict (e.g., customer churn,
+     house price, disease diagnosis)
+   - Generate features that are specifically relevant to predicting this
+     target
+   - Consider domain-specific relationships that would help predict the
+     target
+
+3. GENERATE CONTEXTUALLY RELEVANT FEATURES:
+   - Base your feature engineering on the column descriptions and target
+     definition
+   - Create features that leverage domain knowledge (e.g., if predicting
+     income, create income-to-expense ratios)
+   - Generate interactions between columns that make sense in the domain
+     context
+   - Consider what a domain expert would create as features for this
+     specific prediction task
+
+4. NUMERICAL FEATURE TECHNIQUES (apply based on domain relevance):
+   - Mathematical transformations (log, sqrt, square, etc.) - use when
+     they make domain sense
+   - Statistical aggregations (mean, std, min, max across columns) - for
+     related numerical columns
+   - Interactions between numerical columns - create ratios, products,
+     differences that are meaningful
+   - Polynomial features - when non-linear relationships are expected
+   - Binning/discretization - for creating categorical-like features from
+     continuous variables
+   - Time-based features if datetime columns exist
+
+5. CATEGORICAL FEATURE TECHNIQUES (apply based on cardinality and domain
+   relevance):
+   - One-hot encoding (pd.get_dummies) for low cardinality categories
+     (<=10 unique values)
+   - Target encoding (mean encoding) if target column is available -
+     especially useful for high cardinality
+   - Frequency encoding (count of each category) - for understanding
+     category prevalence
+   - Label encoding for ordinal categories where order matters
+   - Interaction features between categorical and numerical columns -
+     create group statistics
+   - Group statistics (mean, median, std, etc. of numerical columns
+     grouped by category)
+   - Rare category grouping (group categories with low frequency into
+     'Other' category)
+
+6. USE THE BUILT-IN PRIMITIVES (module 'fe', already imported):
+   - fe.frequency_encode(df['col']) - share of rows with the same value
+   - fe.target_encode(df['col'], df['target']) - out-of-fold smoothed
+     target mean; use this instead of a plain groupby mean of the target,
+     which leaks the label
+   - fe.group_rare(df['col'], min_frequency=0.01) - merge rare
+     categories into 'Other'
+   - fe.group_aggregate(df, 'group_col', 'num_col', stat='mean') - group
+     statistic broadcast to rows; stat is one of 'count', 'sum', 'mean',
+     'std', 'min', 'max', 'median', 'diff' (value minus group mean) or
+     'ratio' (value divided by group mean); group_col may be a list
+   - fe.bin_numeric(df['col'], bins=10, strategy='quantile') - integer
+     bin codes ('quantile' or 'uniform'), -1 for missing values
+   - Prefer these over map(lambda ...), apply or repeated groupby calls
+
+7. CODE REQUIREMENTS (CRITICAL):
+   - Return ONLY the Python code, no explanations, no markdown, no
+     comments outside code
+   - The code MUST use 'df' as the DataFrame variable name (e.g.,
+     df['new_feature'] = ...)
+   - The code MUST create new columns using df['new_feature_name'] = ...
+   - DO NOT use print() statements or any output - only create columns
+   - DO NOT reassign df (e.g., df = ...) - only modify it in place
+   - Use pandas, numpy and fe operations
+   - Handle potential errors gracefully (e.g., division by zero, log of
+     negative numbers, missing values)
+   - For categorical encoding, handle unseen categories appropriately
+     (use fillna or default values)
+   - Use descriptive column names that reflect what the feature
+     represents
+   - Generate at least 3-5 meaningful features based on the domain
+     context
+   - Each line should create a new column: df['feature_name'] = ...
+
+8. PRIORITIZE FEATURES RELEVANT TO THE TARGET:
+   - If a target is specified, prioritize features that directly relate
+     to predicting it
+   - Create features that capture relationships between predictors and
+     the target
+   - Consider what features would be most informative for the specific
+     prediction task
+"""
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+OUTPUT FORMAT: Instead of a code block, respond with JSON matching the provided
+schema:
+- domain_summary: your understanding of the problem domain and prediction task
+- features: one entry per generated feature with
+  - name: the new column name
+  - code: the Python statement(s) creating df['<name>'], following the code
+    requirements above
+  - inputs: the existing df columns the code reads
+  - rationale: why this feature is useful for predicting the target
+"""
+
+REPORT_INSTRUCTIONS = """
+IMPORTANT: After generating the code, provide a FEATURE REPORT with the following structure:
+
+FEATURE REPORT
+==============
+
+1. DOMAIN UNDERSTANDING:
+   - Summarize your understanding of the problem domain based on the metadata and problem description
+   - Explain the business context and what we're trying to predict
+   - Describe key relationships and patterns you identified in the data
+
+2. GENERATED FEATURES EXPLANATION:
+   For each feature you generated, provide:
+   - Feature Name: [name of the feature]
+   - Description: [what this feature represents]
+   - Rationale: [why this feature is useful for predicting the target]
+   - Domain Relevance: [how this feature relates to the business problem]
+
+Format the report clearly with sections and bullet points for readability.
+"""
 
 
 class LLMClient:
     """Client for interacting with OpenAI GPT-4"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cassette: Optional[Cassette] = None,
+        hedge_delay: Optional[float] = None,
+        hedge_model: Optional[str] = None,
+        coalesce: bool = True,
+    ):
         """
         Initialize the LLM client.
 
         Args:
             api_key: OpenAI API key. If None, will try to get from
                      environment or global config.
+            cassette: Optional Cassette to record responses to or replay
+                      responses from. In replay mode no API key is needed.
+            hedge_delay: If set, fire a second (hedge) request when the
+                        first has not responded within this many seconds,
+                        and use whichever valid response arrives first
+            hedge_model: Model for the hedge request (default: same model)
+            coalesce: If True, concurrent identical requests (same model,
+                      messages and parameters) share one in-flight request
+                      and its result
         """
+        self.cassette = cassette
+        self.hedge_delay = hedge_delay
+        self.hedge_model = hedge_model
+        self.coalesce = coalesce
+        # Request metrics, e.g. how often hedges fired and won
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        # Request key -> Future of the identical request in flight
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if cassette is not None and cassette.mode == "replay":
+            # Replay never touches the network
+            self.client = None
+            return
         if not self.api_key:
             raise ValueError(
                 "OpenAI API key not provided. "
                 "Set it using set_api_key() or set OPENAI_API_KEY "
                 "environment variable."
             )
+        # Imported here so that importing llm_feat stays fast
+        from openai import OpenAI
+
         self.client = OpenAI(api_key=self.api_key)
 
     def generate_feature_code(
@@ -56,163 +286,596 @@ class LLMClient:
             If return_report=True: Tuple of (code, report) where report contains
                                   domain understanding and feature explanations
         """
-        prompt = self._build_prompt(
-            df_info,
-            metadata_info,
-            target_column,
-            categorical_cols,
-            problem_description,
-            return_report,
-        )
+        with span("prompt_build"):
+            prompt = self._build_prompt(
+                df_info,
+                metadata_info,
+                target_column,
+                categorical_cols,
+                problem_description,
+                return_report,
+            )
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
 
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert data scientist specializing "
-                            "in feature engineering for machine learning. "
-                            "You understand domain context from metadata "
-                            "descriptions and generate contextually relevant "
-                            "features that are specifically designed to help "
-                            "predict the target variable. Generate clean, "
-                            "efficient Python code for creating new features "
-                            "from existing numerical and categorical columns "
-                            "in pandas DataFrames."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            return self._request(
+                model,
+                messages,
+                parse=lambda content: self._parse_response(content.strip(), return_report),
+                validate=lambda result: self._validate_code(result[0] if return_report else result),
                 temperature=0.3,  # Lower temperature for more consistent code
                 max_tokens=4000 if return_report else 2000,
             )
 
-            full_response = response.choices[0].message.content.strip()
-
-            if return_report:
-                # Extract report and code separately
-                # Report should come first, then code
-                report = ""
-                code = ""
-
-                # Try to find report section
-                if "FEATURE REPORT" in full_response or "DOMAIN UNDERSTANDING" in full_response:
-                    # Split by report markers
-                    if "FEATURE REPORT" in full_response:
-                        parts = full_response.split("FEATURE REPORT", 1)
-                        if len(parts) > 1:
-                            report_section = parts[1]
-                            # Extract report until code section
-                            if "```" in report_section:
-                                report = report_section.split("```")[0].strip()
-                            else:
-                                report = report_section.strip()
-                elif "---" in full_response:
-                    # Try splitting by separator
-                    parts = full_response.split("---", 1)
-                    if len(parts) > 1:
-                        report = parts[0].strip()
-                        full_response = parts[1].strip()
-
-                # Extract code block
-                if "```python" in full_response:
-                    code = full_response.split("```python")[1].split("```")[0].strip()
-                elif "```" in full_response:
-                    parts = full_response.split("```")
-                    if len(parts) >= 3:
-                        code = parts[1].strip()
-                        if code.startswith("python"):
-                            code = code[6:].strip()
-                else:
-                    # No code block, try to extract code lines
-                    lines = full_response.split("\n")
-                    code_lines = []
-                    in_code = False
-                    for line in lines:
-                        if any(
-                            line.strip().startswith(prefix)
-                            for prefix in ["df[", "import ", "from ", "pd.", "np."]
-                        ):
-                            in_code = True
-                        if (
-                            in_code
-                            or line.strip().startswith("df[")
-                            or ("=" in line and "df" in line)
-                        ):
-                            code_lines.append(line)
-                    code = "\n".join(code_lines).strip()
-
-                # If report is empty, try to extract from beginning
-                if not report:
-                    # Take everything before code as report
-                    if "```" in full_response:
-                        report = full_response.split("```")[0].strip()
-                    else:
-                        # Try to find where code starts
-                        code_start_markers = ["df[", "import ", "from "]
-                        for marker in code_start_markers:
-                            if marker in full_response:
-                                idx = full_response.find(marker)
-                                report = full_response[:idx].strip()
-                                break
-
-                # Clean code
-                code = self._clean_code(code)
-
-                # Process report to convert escaped newlines to actual newlines
-                if report:
-                    # Convert literal \n to actual newlines
-                    report = report.replace("\\n", "\n")
-                    # Also handle other common escape sequences
-                    report = report.replace("\\t", "\t")
-                    # Remove any leading/trailing whitespace from each line
-                    report = "\n".join(line.rstrip() for line in report.split("\n"))
-                    report = report.strip()
-
-                # Validate
-                if not code or len(code) < 10:
-                    raw_content = full_response[:200]
-                    raise RuntimeError(
-                        "Generated code appears to be empty or invalid. "
-                        f"Raw response: {raw_content}"
-                    )
-
-                return code, report
-            else:
-                # Original behavior - just extract code
-                code = full_response
-
-                # Extract code block if wrapped in markdown
-                if "```python" in code:
-                    code = code.split("```python")[1].split("```")[0].strip()
-                elif "```" in code:
-                    # Handle generic code blocks
-                    parts = code.split("```")
-                    if len(parts) >= 3:
-                        code = parts[1].strip()
-                        # Remove language identifier if present
-                        # (e.g., "python" at the start)
-                        if code.startswith("python"):
-                            code = code[6:].strip()
-
-                # Clean up any remaining markdown or explanations
-                code = self._clean_code(code)
-
-                # Validate that we have actual code
-                if not code or len(code) < 10:
-                    raw_content = full_response[:200]
-                    raise RuntimeError(
-                        "Generated code appears to be empty or invalid. "
-                        f"Raw response: {raw_content}"
-                    )
-
-                return code
+        except Exception as e:
+            raise RuntimeError(f"Error generating feature code: {str(e)}")
+
+    def generate_feature_set(
+        self,
+        df_info: str,
+        metadata_info: str,
+        target_column: Optional[str] = None,
+        categorical_cols: Optional[list] = None,
+        model: str = "gpt-4o",
+        problem_description: Optional[str] = None,
+    ) -> FeatureSet:
+        """
+        Generate features as structured JSON output.
+
+        The model is constrained to FEATURE_SET_SCHEMA, so the response is
+        parsed with a single json.loads instead of the free-text heuristics
+        used by generate_feature_code.
 
+        Args:
+            df_info: Information about the DataFrame (columns, dtypes,
+                     sample data)
+            metadata_info: Information from metadata DataFrame
+            target_column: Name of the target/label column if available
+            categorical_cols: List of categorical column names
+            model: OpenAI model to use. Must support structured outputs
+                  (e.g. "gpt-4o", "gpt-4o-mini")
+            problem_description: Optional description of the problem/use case
+                                to provide additional context
+
+        Returns:
+            FeatureSet with the domain summary and one entry per feature
+            (name, code, inputs, rationale)
+        """
+        with span("prompt_build"):
+            prompt = self._build_prompt(
+                df_info,
+                metadata_info,
+                target_column,
+                categorical_cols,
+                problem_description,
+                structured=True,
+            )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+        try:
+            return self._request(
+                model,
+                messages,
+                parse=parse_feature_set,
+                validate=lambda feature_set: self._validate_code(feature_set.code),
+                temperature=0.3,
+                max_tokens=4000,
+                response_format=RESPONSE_FORMAT,
+            )
         except Exception as e:
             raise RuntimeError(f"Error generating feature code: {str(e)}")
 
+    def generate_feature_candidates(
+        self,
+        df_info: str,
+        metadata_info: str,
+        target_column: Optional[str] = None,
+        categorical_cols: Optional[list] = None,
+        model: str = "gpt-4o",
+        problem_description: Optional[str] = None,
+        return_report: bool = False,
+        structured: bool = False,
+        n: int = 3,
+    ) -> list[tuple[str, Optional[str]]]:
+        """
+        Generate several alternative feature sets with a single request.
+
+        All candidates are sampled in one completion call (the API's ``n``
+        parameter), so the prompt is sent and billed once. Candidates that
+        do not parse are discarded. Hedging does not apply to this call.
+
+        Args:
+            df_info: Information about the DataFrame
+            metadata_info: Information from metadata DataFrame
+            target_column: Name of the target/label column if available
+            categorical_cols: List of categorical column names
+            model: OpenAI model to use
+            problem_description: Optional description of the problem/use case
+            return_report: If True, also return a report per candidate
+            structured: If True, request JSON-schema structured output
+            n: Number of candidates to sample
+
+        Returns:
+            List of (code, report) tuples; report is None unless
+            return_report is True
+
+        Raises:
+            RuntimeError: If the request fails or no candidate is usable
+        """
+        with span("prompt_build"):
+            prompt = self._build_prompt(
+                df_info,
+                metadata_info,
+                target_column,
+                categorical_cols,
+                problem_description,
+                return_report,
+                structured=structured,
+            )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        params = dict(n=n, temperature=CANDIDATE_TEMPERATURE, max_tokens=4000)
+        if structured:
+            params["response_format"] = RESPONSE_FORMAT
+
+        def parse(content: str) -> tuple[str, Optional[str]]:
+            if structured:
+                feature_set = parse_feature_set(content)
+                return feature_set.code, feature_set.report if return_report else None
+            result = self._parse_response(content.strip(), return_report)
+            return result if return_report else (result, None)
+
+        self._count("candidates", n)
+        errors = []
+        candidates = []
+        try:
+            with span("llm_request", model=model, attempts=1, retries=0) as request_span:
+                contents, coalesced = self._single_flight(
+                    model,
+                    messages,
+                    params,
+                    lambda: self._complete_choices(model, messages, **params),
+                )
+                if coalesced:
+                    request_span.set_attribute("coalesced", True)
+                    request_span.set_attribute("attempts", 0)
+        except Exception as e:
+            raise RuntimeError(f"Error generating feature code: {str(e)}")
+        for content in contents:
+            try:
+                candidate = self._parse(parse, content)
+                self._validate_code(candidate[0])
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            candidates.append(candidate)
+        if not candidates:
+            raise RuntimeError(f"Error generating feature code: no usable candidate: {errors}")
+        return candidates
+
+    def generate_incremental_code(
+        self,
+        df_info: str,
+        metadata_info: str,
+        existing_features: list,
+        target_column: Optional[str] = None,
+        categorical_cols: Optional[list] = None,
+        model: str = "gpt-4o",
+        problem_description: Optional[str] = None,
+    ) -> str:
+        """
+        Generate feature code for new or changed columns only.
+
+        The prompt covers only the given columns and the names of existing
+        features, so its size scales with the schema change rather than
+        with the whole table.
+
+        Args:
+            df_info: Information about the new/changed columns
+            metadata_info: Metadata of the new/changed columns
+            existing_features: Names of features the pipeline already creates
+            target_column: Name of the target/label column if available
+            categorical_cols: Categorical columns among the new/changed ones
+            model: OpenAI model to use
+            problem_description: Optional description of the problem/use case
+
+        Returns:
+            Generated Python code for the new features
+        """
+        with span("prompt_build"):
+            prompt = self._build_incremental_prompt(
+                df_info,
+                metadata_info,
+                existing_features,
+                target_column,
+                categorical_cols,
+                problem_description,
+            )
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+        try:
+            return self._request(
+                model,
+                messages,
+                parse=lambda content: self._parse_response(content.strip(), return_report=False),
+                validate=self._validate_code,
+                temperature=0.3,
+                max_tokens=1000,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error generating feature code: {str(e)}")
+
+    async def agenerate_feature_code(self, *args, **kwargs) -> str | tuple[str, str]:
+        """
+        Async version of generate_feature_code for use in asyncio tasks.
+
+        The request runs in a worker thread, so the event loop is not
+        blocked; concurrent identical requests from tasks and threads
+        are coalesced into one.
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.generate_feature_code, *args, **kwargs)
+
+    async def agenerate_feature_set(self, *args, **kwargs) -> FeatureSet:
+        """Async version of generate_feature_set (see agenerate_feature_code)"""
+        import asyncio
+
+        return await asyncio.to_thread(self.generate_feature_set, *args, **kwargs)
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _request(
+        self,
+        model: str,
+        messages: list,
+        parse: Callable[[str], object],
+        validate: Callable[[object], None],
+        **params,
+    ):
+        """
+        Request a completion and parse it, hedging slow requests if enabled.
+
+        Args:
+            model: Model for the (primary) request
+            messages: Chat messages
+            parse: Turns response content into the result
+            validate: Raises if a parsed result is unusable; a hedged
+                      response only wins if it passes validation
+            **params: Completion parameters
+        """
+        with span("llm_request", model=model) as request_span:
+            (result, attempts), coalesced = self._single_flight(
+                model,
+                messages,
+                params,
+                lambda: self._request_hedged(model, messages, parse, validate, **params),
+            )
+            if coalesced:
+                request_span.set_attribute("coalesced", True)
+                attempts = 0
+            request_span.set_attribute("attempts", attempts)
+            request_span.set_attribute("retries", max(attempts - 1, 0))
+        return result
+
+    def _single_flight(self, model: str, messages: list, params: dict, run: Callable[[], object]):
+        """
+        Call run(), or share the result of an identical request in flight.
+
+        Concurrent callers (threads, or asyncio tasks via the a* methods)
+        with the same request key wait for the first caller's request
+        instead of sending their own; its exception is raised in all of
+        them. Each waiting caller receives a copy of the result and is
+        counted as 'coalesced'; only calls that send their own request are
+        counted as 'requests'.
+
+        Returns:
+            (result, True if the result came from another caller's request)
+        """
+        if not self.coalesce:
+            self._count("requests")
+            return run(), False
+        key = request_key(model, messages, params)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return copy.deepcopy(future.result()), True
+
+        self._count("requests")
+        try:
+            result = run()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _parse(self, parse: Callable[[str], object], content: str):
+        with span("parse"):
+            return parse(content)
+
+    def _request_hedged(
+        self,
+        model: str,
+        messages: list,
+        parse: Callable[[str], object],
+        validate: Callable[[object], None],
+        **params,
+    ) -> tuple:
+        """Return (result, number of requests sent)"""
+        if self.hedge_delay is None:
+            return self._parse(parse, self._complete(model, messages, **params)), 1
+
+        abandoned = threading.Event()
+
+        def attempt(attempt_model: str):
+            _HEDGE_ABANDONED.set(abandoned)
+            result = self._parse(parse, self._complete(attempt_model, messages, **params))
+            validate(result)
+            return result
+
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-feat-hedge")
+        try:
+            # Run attempts in copies of this context so their spans nest
+            # under the request span
+            primary = pool.submit(contextvars.copy_context().run, attempt, model)
+            pending = {primary}
+            done, _ = wait(pending, timeout=self.hedge_delay)
+            if not done:
+                self._count("hedge_fired")
+                pending.add(
+                    pool.submit(contextvars.copy_context().run, attempt, self.hedge_model or model)
+                )
+            attempts = len(pending)
+
+            errors = []
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self._count("hedge_won")
+                        return future.result(), attempts
+                    errors.append(future.exception())
+            raise errors[0]
+        finally:
+            # Do not wait for the losing request. A request already in
+            # flight cannot be interrupted; when its response arrives it
+            # is discarded without recording usage, cassette or spans.
+            abandoned.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _validate_code(code: str) -> None:
+        """Raise ValueError if generated code is empty or does not parse"""
+        if not code or not code.strip():
+            raise ValueError("Generated code is empty")
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            raise ValueError(f"Generated code does not parse: {e}")
+
+    def _complete(self, model: str, messages: list, **params) -> str:
+        """Send a chat completion request and return the response content."""
+        return self._complete_choices(model, messages, **params)[0]
+
+    def _complete_choices(self, model: str, messages: list, **params) -> list[str]:
+        """
+        Send a chat completion request and return the content of each choice.
+
+        In cassette replay mode the response is served from the cassette
+        without calling the API; in record mode the live response is
+        appended to the cassette.
+        """
+        with span("llm_completion", model=model) as completion_span:
+            if self.cassette is not None and self.cassette.mode == "replay":
+                completion_span.set_attribute("replayed", True)
+                recorded = self.cassette.lookup(model, messages, params)
+                return recorded.get("choices") or [recorded["content"]]
+
+            progress = _STREAM_PROGRESS.get()
+            if progress is None:
+                response = self.client.chat.completions.create(
+                    model=model, messages=messages, **params
+                )
+                contents = [choice.message.content or "" for choice in response.choices]
+                usage = response.usage
+            else:
+                completion_span.set_attribute("streamed", True)
+                contents, usage = self._stream_choices(model, messages, progress, **params)
+            abandoned = _HEDGE_ABANDONED.get()
+            if abandoned is not None and abandoned.is_set():
+                self._count("hedge_wasted")
+                completion_span.discard()
+                raise _HedgeAbandoned()
+            self._record_usage(usage, completion_span)
+
+            if self.cassette is not None:
+                usage = usage.model_dump() if usage is not None else None
+                self.cassette.record(model, messages, params, contents, usage)
+
+            return contents
+
+    def _stream_choices(
+        self, model: str, messages: list, progress: Callable[[int], None], **params
+    ) -> tuple[list[str], object]:
+        """Stream a chat completion; return (content of each choice, usage)"""
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params,
+        )
+        parts = defaultdict(list)
+        usage = None
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    parts[choice.index].append(choice.delta.content)
+                    progress(1)  # One chunk carries about one token
+        n = max(params.get("n", 1), len(parts))
+        return ["".join(parts[index]) for index in range(n)], usage
+
+    def _record_usage(self, usage, completion_span) -> None:
+        """
+        Add token usage of a response to the stats and the completion span.
+
+        'cached_tokens' counts prompt tokens served from the provider's
+        prompt-prefix cache.
+        """
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        tokens = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        }
+        with self._stats_lock:
+            self.stats.update(tokens)
+        for key, value in tokens.items():
+            completion_span.set_attribute(key, value)
+
+    def _parse_response(self, full_response: str, return_report: bool) -> str | tuple[str, str]:
+        """Extract code (and optionally the feature report) from a response."""
+        if return_report:
+            # Extract report and code separately
+            # Report should come first, then code
+            report = ""
+            code = ""
+
+            # Try to find report section
+            if "FEATURE REPORT" in full_response or "DOMAIN UNDERSTANDING" in full_response:
+                # Split by report markers
+                if "FEATURE REPORT" in full_response:
+                    parts = full_response.split("FEATURE REPORT", 1)
+                    if len(parts) > 1:
+                        report_section = parts[1]
+                        # Extract report until code section
+                        if "```" in report_section:
+                            report = report_section.split("```")[0].strip()
+                        else:
+                            report = report_section.strip()
+            elif "---" in full_response:
+                # Try splitting by separator
+                parts = full_response.split("---", 1)
+                if len(parts) > 1:
+                    report = parts[0].strip()
+                    full_response = parts[1].strip()
+
+            # Extract code block
+            if "```python" in full_response:
+                code = full_response.split("```python")[1].split("```")[0].strip()
+            elif "```" in full_response:
+                parts = full_response.split("```")
+                if len(parts) >= 3:
+                    code = parts[1].strip()
+                    if code.startswith("python"):
+                        code = code[6:].strip()
+            else:
+                # No code block, try to extract code lines
+                lines = full_response.split("\n")
+                code_lines = []
+                in_code = False
+                for line in lines:
+                    if any(
+                        line.strip().startswith(prefix)
+                        for prefix in ["df[", "import ", "from ", "pd.", "np."]
+                    ):
+                        in_code = True
+                    if in_code or line.strip().startswith("df[") or ("=" in line and "df" in line):
+                        code_lines.append(line)
+                code = "\n".join(code_lines).strip()
+
+            # If report is empty, try to extract from beginning
+            if not report:
+                # Take everything before code as report
+                if "```" in full_response:
+                    report = full_response.split("```")[0].strip()
+                else:
+                    # Try to find where code starts
+                    code_start_markers = ["df[", "import ", "from "]
+                    for marker in code_start_markers:
+                        if marker in full_response:
+                            idx = full_response.find(marker)
+                            report = full_response[:idx].strip()
+                            break
+
+            # Clean code
+            code = self._clean_code(code)
+
+            # Process report to convert escaped newlines to actual newlines
+            if report:
+                # Convert literal \n to actual newlines
+                report = report.replace("\\n", "\n")
+                # Also handle other common escape sequences
+                report = report.replace("\\t", "\t")
+                # Remove any leading/trailing whitespace from each line
+                report = "\n".join(line.rstrip() for line in report.split("\n"))
+                report = report.strip()
+
+            # Validate
+            if not code or len(code) < 10:
+                raw_content = full_response[:200]
+                raise RuntimeError(
+                    "Generated code appears to be empty or invalid. " f"Raw response: {raw_content}"
+                )
+
+            return code, report
+        else:
+            # Original behavior - just extract code
+            code = full_response
+
+            # Extract code block if wrapped in markdown
+            if "```python" in code:
+                code = code.split("```python")[1].split("```")[0].strip()
+            elif "```" in code:
+                # Handle generic code blocks
+                parts = code.split("```")
+                if len(parts) >= 3:
+                    code = parts[1].strip()
+                    # Remove language identifier if present
+                    # (e.g., "python" at the start)
+                    if code.startswith("python"):
+                        code = code[6:].strip()
+
+            # Clean up any remaining markdown or explanations
+            code = self._clean_code(code)
+
+            # Validate that we have actual code
+            if not code or len(code) < 10:
+                raw_content = full_response[:200]
+                raise RuntimeError(
+                    "Generated code appears to be empty or invalid. " f"Raw response: {raw_content}"
+                )
+
+            return code
+
     def _clean_code(self, code: str) -> str:
         """Clean extracted code by removing non-code lines."""
         lines = code.split("\n")
@@ -245,13 +908,28 @@ class LLMClient:
         categorical_cols: Optional[list] = None,
         problem_description: Optional[str] = None,
         return_report: bool = False,
+        structured: bool = False,
     ) -> str:
-        """Build the prompt for feature generation"""
+        """
+        Build the prompt for feature generation.
 
+        Static instructions come first and dataset-specific content last, so
+        the prompt prefix is identical across datasets and can be served
+        from the provider's prompt cache.
+        """
         prompt = (
-            f"""Generate Python code for feature engineering on a pandas """
-            f"""DataFrame.
-
+            "Generate Python code for feature engineering on a pandas DataFrame. "
+            "The DataFrame and its metadata are described at the end of this prompt.\n\n"
+            + FEATURE_INSTRUCTIONS
+        )
+        if structured:
+            prompt += STRUCTURED_OUTPUT_INSTRUCTIONS
+        elif return_report:
+            prompt += REPORT_INSTRUCTIONS
+
+        # Dataset-specific content
+        prompt += (
+            f"""
 DATAFRAME INFORMATION:
 {df_info}
 
@@ -287,116 +965,56 @@ Use this understanding to generate features that are specifically """
             cat_cols_str = ", ".join(categorical_cols)
             prompt += f"\nCATEGORICAL COLUMNS: {cat_cols_str}\n"
 
-        prompt += """
-CRITICAL INSTRUCTIONS - READ CAREFULLY:
-
-1. UNDERSTAND THE DOMAIN FROM METADATA:
-   - Carefully read the column descriptions in the METADATA INFORMATION
-     section above
-   - Understand what each column represents in the domain context
-   - Use this domain knowledge to generate features that make sense for
-     this specific problem
-
-2. UNDERSTAND THE PREDICTION TASK:
-   - If a target column is specified, carefully read its label_definition
-     in the metadata
-   - Understand what you are trying to predict (e.g., customer churn,
-     house price, disease diagnosis)
-   - Generate features that are specifically relevant to predicting this
-     target
-   - Consider domain-specific relationships that would help predict the
-     target
-
-3. GENERATE CONTEXTUALLY RELEVANT FEATURES:
-   - Base your feature engineering on the column descriptions and target
-     definition
-   - Create features that leverage domain knowledge (e.g., if predicting
-     income, create income-to-expense ratios)
-   - Generate interactions between columns that make sense in the domain
-     context
-   - Consider what a domain expert would create as features for this
-     specific prediction task
-
-4. NUMERICAL FEATURE TECHNIQUES (apply based on domain relevance):
-   - Mathematical transformations (log, sqrt, square, etc.) - use when
-     they make domain sense
-   - Statistical aggregations (mean, std, min, max across columns) - for
-     related numerical columns
-   - Interactions between numerical columns - create ratios, products,
-     differences that are meaningful
-   - Polynomial features - when non-linear relationships are expected
-   - Binning/discretization - for creating categorical-like features from
-     continuous variables
-   - Time-based features if datetime columns exist
-
-5. CATEGORICAL FEATURE TECHNIQUES (apply based on cardinality and domain
-   relevance):
-   - One-hot encoding (pd.get_dummies) for low cardinality categories
-     (<=10 unique values)
-   - Target encoding (mean encoding) if target column is available -
-     especially useful for high cardinality
-   - Frequency encoding (count of each category) - for understanding
-     category prevalence
-   - Label encoding for ordinal categories where order matters
-   - Interaction features between categorical and numerical columns -
-     create group statistics
-   - Group statistics (mean, median, std, etc. of numerical columns
-     grouped by category)
-   - Rare category grouping (group categories with low frequency into
-     'Other' category)
-
-6. CODE REQUIREMENTS (CRITICAL):
-   - Return ONLY the Python code, no explanations, no markdown, no
-     comments outside code
-   - The code MUST use 'df' as the DataFrame variable name (e.g.,
-     df['new_feature'] = ...)
-   - The code MUST create new columns using df['new_feature_name'] = ...
-   - DO NOT use print() statements or any output - only create columns
-   - DO NOT reassign df (e.g., df = ...) - only modify it in place
-   - Use pandas and numpy operations
-   - Handle potential errors gracefully (e.g., division by zero, log of
-     negative numbers, missing values)
-   - For categorical encoding, handle unseen categories appropriately
-     (use fillna or default values)
-   - Use descriptive column names that reflect what the feature
-     represents
-   - Generate at least 3-5 meaningful features based on the domain
-     context
-   - Each line should create a new column: df['feature_name'] = ...
-
-7. PRIORITIZE FEATURES RELEVANT TO THE TARGET:
-   - If a target is specified, prioritize features that directly relate
-     to predicting it
-   - Create features that capture relationships between predictors and
-     the target
-   - Consider what features would be most informative for the specific
-     prediction task
-
-Generate the feature engineering code:"""
-
-        if return_report:
-            prompt += """
-
-IMPORTANT: After generating the code, provide a FEATURE REPORT with the following structure:
-
-FEATURE REPORT
-==============
-
-1. DOMAIN UNDERSTANDING:
-   - Summarize your understanding of the problem domain based on the metadata and problem description
-   - Explain the business context and what we're trying to predict
-   - Describe key relationships and patterns you identified in the data
-
-2. GENERATED FEATURES EXPLANATION:
-   For each feature you generated, provide:
-   - Feature Name: [name of the feature]
-   - Description: [what this feature represents]
-   - Rationale: [why this feature is useful for predicting the target]
-   - Domain Relevance: [how this feature relates to the business problem]
+        if structured:
+            prompt += "\nGenerate the features:"
+        else:
+            prompt += "\nGenerate the feature engineering code:"
+        return prompt
 
-Format the report clearly with sections and bullet points for readability.
+    def _build_incremental_prompt(
+        self,
+        df_info: str,
+        metadata_info: str,
+        existing_features: list,
+        target_column: Optional[str],
+        categorical_cols: Optional[list] = None,
+        problem_description: Optional[str] = None,
+    ) -> str:
+        """Build the prompt for generating features for new/changed columns"""
+        # Static instructions first so they form a cacheable prefix
+        prompt = """An existing feature engineering pipeline for a pandas DataFrame 'df' must be
+extended because the table gained new or changed columns. Generate Python code
+that creates new features using these columns (optionally combined with other
+existing columns of df). The columns are described at the end of this prompt.
+
+CODE REQUIREMENTS:
+- Return ONLY the Python code, no explanations or markdown
+- Use 'df' as the DataFrame variable and create columns with df['new_feature_name'] = ...
+- DO NOT reassign df, print, or modify existing columns
+- Use pandas (pd) and numpy (np); handle division by zero, logs of
+  non-positive values and missing values
+- For encodings use the built-in module fe: fe.frequency_encode(s),
+  fe.target_encode(s, target) (out-of-fold), fe.group_rare(s),
+  fe.group_aggregate(df, by, col, stat) and fe.bin_numeric(s, bins)
+- Use descriptive names that do not collide with existing features
 """
+        prompt += f"""
+NEW OR CHANGED COLUMNS:
+{df_info}
 
-        return prompt
-
+METADATA FOR THESE COLUMNS:
+{metadata_info}
+"""
+        if problem_description:
+            prompt += f"\nPROBLEM DESCRIPTION:\n{problem_description}\n"
+        if target_column:
+            prompt += f"\nTARGET/LABEL COLUMN: {target_column}\n"
+        if categorical_cols:
+            prompt += f"\nCATEGORICAL COLUMNS: {', '.join(categorical_cols)}\n"
+        if existing_features:
+            prompt += (
+                "\nEXISTING FEATURES (already created - do not recreate or rename):\n"
+                f"{', '.join(existing_features)}\n"
+            )
+        prompt += "\nGenerate the feature engineering code for the new columns:"
         return prompt
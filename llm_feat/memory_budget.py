@@ -0,0 +1,449 @@
+"""Memory budget for executing generated code on large data"""
+
+import ast
+import re
+import tracemalloc
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from .acceleration import execute_statement
+from .code_analysis import DF_NAME, Statement, is_get_dummies, split_statements
+from .validation import sample_rows
+
+BudgetAction = Literal["execute", "chunk", "rewrite", "skip"]
+
+_UNITS = {"": 1, "B": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_bytes(size: int | float | str) -> int:
+    """Parse a size such as 1_000_000, '512MB', '2GB' or '1.5G' into bytes"""
+    if isinstance(size, (int, float)):
+        return int(size)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)I?B?\s*", str(size).upper())
+    if not match:
+        raise ValueError(f"Invalid memory size: {size!r}. Use bytes or e.g. '512MB', '2GB'")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+@dataclass
+class BudgetDecision:
+    """How one statement of generated code was handled under a memory budget"""
+
+    source: str
+    action: BudgetAction
+    estimated_bytes: int = 0  # New columns on the full data
+    estimated_peak: int = 0  # Peak allocation on the full data
+    detail: str = ""
+
+    def __str__(self) -> str:
+        line = self.source.strip().splitlines()[0] if self.source.strip() else ""
+        if len(line) > 80:
+            line = line[:77] + "..."
+        return (
+            f"{self.action}: {line} (estimated {self.estimated_bytes / 2**20:.1f} MB, "
+            f"peak {self.estimated_peak / 2**20:.1f} MB){' - ' + self.detail if self.detail else ''}"
+        )
+
+
+def _compile(node: ast.stmt):
+    return compile(ast.Module(body=[node], type_ignores=[]), "<generated>", "exec")
+
+
+def _single_column(node: ast.AST) -> Optional[str]:
+    """Column name if node is df['col']"""
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == DF_NAME
+        and isinstance(node.slice, ast.Constant)
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+    return None
+
+
+def _top_k(node: ast.AST) -> Optional[int]:
+    """k if node is fe.group_rare(..., max_categories=k)"""
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        if node.func.attr == "group_rare":
+            for keyword in node.keywords:
+                if keyword.arg == "max_categories" and isinstance(keyword.value, ast.Constant):
+                    return keyword.value.value
+    return None
+
+
+def _dummy_columns(node: ast.AST) -> list:
+    """
+    Columns one-hot encoded by pd.get_dummies calls in a statement, as
+    (column, maximum number of categories or None) pairs
+    """
+    columns = []
+    for call in ast.walk(node):
+        if not is_get_dummies(call):
+            continue
+        if call.args:
+            k = _top_k(call.args[0])
+            columns.extend(
+                (column, None if k is None else k + 1)  # Plus 'Other'
+                for column in map(_single_column, ast.walk(call.args[0]))
+                if column is not None
+            )
+        for keyword in call.keywords:
+            if keyword.arg == "columns" and isinstance(keyword.value, (ast.List, ast.Tuple)):
+                columns.extend(
+                    (element.value, None)
+                    for element in keyword.value.elts
+                    if isinstance(element, ast.Constant) and isinstance(element.value, str)
+                )
+    return columns
+
+
+class _TopKDummies(ast.NodeTransformer):
+    """Rewrite pd.get_dummies(df['col'], ...) to one-hot encode only the top k categories"""
+
+    def __init__(self, k: int):
+        self.k = k
+
+    def visit_Call(self, node: ast.Call) -> ast.Call:
+        self.generic_visit(node)
+        if is_get_dummies(node) and node.args and _single_column(node.args[0]):
+            node.args[0] = ast.Call(
+                func=ast.Attribute(ast.Name("fe", ast.Load()), "group_rare", ast.Load()),
+                args=[node.args[0]],
+                keywords=[
+                    ast.keyword("min_frequency", ast.Constant(0)),
+                    ast.keyword("max_categories", ast.Constant(self.k)),
+                ],
+            )
+        return node
+
+
+def _rewritable_calls(node: ast.AST) -> int:
+    return sum(
+        1
+        for call in ast.walk(node)
+        if is_get_dummies(call) and call.args and _single_column(call.args[0])
+    )
+
+
+def _execute_chunked(statement: Statement, exec_globals: dict, chunk_rows: int) -> None:
+    """Execute a row-local statement on chunks of df and assign the written columns"""
+    df = exec_globals[DF_NAME]
+    compiled = _compile(statement.node)
+    pieces: dict = {col: [] for col in statement.writes}
+    for start in range(0, len(df), chunk_rows):
+        chunk_globals = dict(exec_globals)
+        chunk_globals[DF_NAME] = df.iloc[start : start + chunk_rows].copy()
+        exec(compiled, chunk_globals)
+        for col, parts in pieces.items():
+            parts.append(chunk_globals[DF_NAME][col])
+    for col, parts in pieces.items():
+        df[col] = pd.concat(parts, ignore_index=True).set_axis(df.index)
+
+
+def _nbytes(value) -> tuple[int, int]:
+    """Memory and number of columns of a pandas or NumPy value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False, deep=True).sum()), value.shape[1]
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False, deep=True)), 1
+    if isinstance(value, np.ndarray):
+        return value.nbytes, value.shape[1] if value.ndim == 2 else 1
+    return 0, 0
+
+
+@dataclass
+class _Trial:
+    exec_globals: dict
+    output_bytes: int  # New or written columns and new DataFrames, Series or arrays
+    new_columns: int
+    peak: int
+
+
+@dataclass
+class _Estimate:
+    output: int
+    peak: int
+    column_bytes: float  # Bytes of one new column on the full data
+    width: float  # Full-data output columns per sample output column
+
+
+class MemoryBudget:
+    """
+    Execute generated code within a memory budget.
+
+    Before a statement runs on the full data, it is executed on a sample
+    to estimate the size of the columns it creates and its peak
+    allocation. Both are extrapolated to the full data from two sample
+    sizes; for pd.get_dummies the number of output columns is taken from
+    the cardinality of the encoded columns on the full data. A statement
+    that does not fit into the remaining budget is:
+
+    - chunk-executed if only its peak exceeds the budget and it is
+      row-local (gives the same result on the sample in two chunks);
+    - rewritten if it one-hot encodes df['col'] with pd.get_dummies: only
+      the most frequent categories that fit are encoded, the others are
+      merged into 'Other' (fe.group_rare);
+    - otherwise skipped, together with the statements that depend on it.
+
+    Every decision is recorded in ``decisions``. Use as the
+    ``memory_budget`` argument of generate_features:
+
+        budget = MemoryBudget("2GB")
+        df_new = generate_features(df, metadata_df, mode="direct", memory_budget=budget)
+        for decision in budget.decisions:
+            print(decision)
+    """
+
+    def __init__(self, limit: int | str, sample_size: int = 1000):
+        """
+        Args:
+            limit: Memory the new feature columns plus the transient peak of
+                   the statement being executed may use, in bytes or as a
+                   string such as '512MB' or '2GB'
+            sample_size: Rows of the sample statements are first run on
+        """
+        self.limit = parse_bytes(limit)
+        self.sample_size = sample_size
+        self.decisions: list[BudgetDecision] = []
+
+    def _trial(self, statement: Statement, sample_globals: dict, rows: int) -> _Trial:
+        """Execute a statement on the first rows of the sample and measure it"""
+        sample_df = sample_globals[DF_NAME]
+        trial_globals = dict(sample_globals)
+        trial_globals[DF_NAME] = sample_df.iloc[:rows].copy()
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            exec(_compile(statement.node), trial_globals)
+            peak = max(tracemalloc.get_traced_memory()[1] - before, 0)
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        output_bytes = new_columns = 0
+        for name in statement.names_defined:
+            nbytes, ncolumns = _nbytes(trial_globals.get(name))
+            output_bytes += nbytes
+            new_columns += ncolumns
+        result = trial_globals[DF_NAME]
+        if isinstance(result, pd.DataFrame):
+            written = set(statement.writes or [])
+            outputs = [
+                col for col in result.columns if col not in sample_df.columns or col in written
+            ]
+            output_bytes += _nbytes(result[outputs])[0]
+            new_columns += len(outputs)
+        return _Trial(trial_globals, output_bytes, new_columns, peak)
+
+    def _estimate(
+        self, statement: Statement, sample_globals: dict, full_df: pd.DataFrame, widths: dict
+    ) -> tuple[_Trial, _Estimate]:
+        """
+        Estimate the output and peak memory of a statement on the full data.
+
+        Returns:
+            (trial on the whole sample, estimate)
+        """
+        n_sample = len(sample_globals[DF_NAME])
+        n_small = max(n_sample // 2, 1)
+        n_full = len(full_df)
+        small = self._trial(statement, sample_globals, n_small)
+        trial = self._trial(statement, sample_globals, n_sample)
+
+        scale = n_full / max(n_sample, 1)
+        if n_sample > n_small:
+            slope = max(trial.peak - small.peak, 0) / (n_sample - n_small)
+            peak = trial.peak + slope * max(n_full - n_sample, 0)
+        else:
+            peak = trial.peak * scale
+        column_bytes = trial.output_bytes / max(trial.new_columns, 1) * scale or n_full
+
+        # Categories missing from the sample add one-hot columns on the
+        # full data, here and in statements using the encoded result
+        sample_df = sample_globals[DF_NAME]
+        extra_columns = sum(
+            max(
+                min(full_df[col].nunique(), cap or n_full)
+                - min(sample_df[col].nunique(), cap or n_full),
+                0,
+            )
+            for col, cap in dict.fromkeys(_dummy_columns(statement.node))
+            if col in full_df.columns and col in sample_df.columns
+        )
+        width = max([widths.get(name, 1.0) for name in statement.names_used] + [1.0])
+        if trial.new_columns:
+            width *= (trial.new_columns + extra_columns) / trial.new_columns
+        output = trial.output_bytes * scale * width + (
+            0 if trial.new_columns else extra_columns * column_bytes
+        )
+        peak = max(peak * width, output)
+        return trial, _Estimate(int(output), int(peak), column_bytes, width)
+
+    def _row_local(self, statement: Statement, sample_globals: dict, trial: _Trial) -> bool:
+        """True if the statement gives the same columns when run on two halves of the sample"""
+        sample_df = sample_globals[DF_NAME]
+        if not statement.writes or statement.names_defined or len(sample_df) < 2:
+            return False
+        chunked_globals = dict(sample_globals)
+        chunked_globals[DF_NAME] = sample_df.copy()
+        try:
+            _execute_chunked(statement, chunked_globals, (len(sample_df) + 1) // 2)
+        except Exception:
+            return False
+        columns = list(dict.fromkeys(statement.writes))
+        return chunked_globals[DF_NAME][columns].equals(trial.exec_globals[DF_NAME][columns])
+
+    def run(self, code: str, exec_globals: dict, accelerate: bool = False) -> list[BudgetDecision]:
+        """
+        Execute generated code statement by statement within the budget.
+
+        Args:
+            code: Generated feature code
+            exec_globals: Globals to execute in; exec_globals['df'] is modified
+            accelerate: If True, evaluate executed arithmetic statements
+                        with numexpr
+
+        Returns:
+            The decisions, one per statement (also stored in ``decisions``)
+        """
+        if accelerate:
+            from .acceleration import check_numexpr
+
+            accelerate = check_numexpr()
+        self.decisions = []
+        used = 0
+        altered = False  # Whether an earlier statement was skipped or rewritten
+        skipped_columns: set = set()
+        skipped_names: set = set()
+        widths: dict = {}  # Name -> full-data columns per sample column
+        sample_globals = dict(exec_globals)
+        sample_globals[DF_NAME] = sample_rows(exec_globals[DF_NAME], self.sample_size).copy()
+
+        for statement in split_statements(code):
+            df = exec_globals[DF_NAME]
+            if statement.reads & skipped_columns or statement.names_used & skipped_names:
+                self._skip(
+                    statement, skipped_columns, skipped_names, "depends on a skipped statement"
+                )
+                continue
+            if not isinstance(df, pd.DataFrame):
+                execute_statement(statement, exec_globals, accelerate)
+                self.decisions.append(BudgetDecision(statement.source, "execute"))
+                continue
+
+            try:
+                trial, estimate = self._estimate(statement, sample_globals, df, widths)
+            except Exception as e:
+                if altered:
+                    self._skip(
+                        statement,
+                        skipped_columns,
+                        skipped_names,
+                        f"fails after an earlier statement was skipped or rewritten: {e}",
+                    )
+                    continue
+                # Let the statement raise (or succeed) on the full data as usual
+                execute_statement(statement, exec_globals, accelerate)
+                self.decisions.append(
+                    BudgetDecision(statement.source, "execute", detail=f"not estimated: {e}")
+                )
+                continue
+
+            remaining = self.limit - used
+            decision = BudgetDecision(statement.source, "execute", estimate.output, estimate.peak)
+            if estimate.peak <= remaining:
+                execute_statement(statement, exec_globals, accelerate)
+            elif estimate.output < remaining and self._row_local(statement, sample_globals, trial):
+                per_row = max(estimate.peak - estimate.output, 1) / max(len(df), 1)
+                chunk_rows = max(int((remaining - estimate.output) / per_row), 1)
+                decision.action = "chunk"
+                decision.detail = f"{-(-len(df) // chunk_rows)} chunks of {chunk_rows} rows"
+                _execute_chunked(statement, exec_globals, chunk_rows)
+            else:
+                rewritten = self._rewrite(
+                    statement, sample_globals, df, widths, remaining, estimate
+                )
+                altered = True
+                if rewritten is None:
+                    self._skip(
+                        statement,
+                        skipped_columns,
+                        skipped_names,
+                        f"exceeds the remaining budget of {remaining / 2**20:.1f} MB",
+                        estimate.output,
+                        estimate.peak,
+                    )
+                    continue
+                statement, trial, estimate, decision = rewritten
+                execute_statement(statement, exec_globals, accelerate)
+            self.decisions.append(decision)
+            sample_globals = trial.exec_globals
+            used += estimate.output
+            for name in statement.names_defined:
+                widths[name] = estimate.width
+        return self.decisions
+
+    def _rewrite(
+        self,
+        statement: Statement,
+        sample_globals: dict,
+        full_df: pd.DataFrame,
+        widths: dict,
+        remaining: int,
+        estimate: _Estimate,
+    ) -> Optional[tuple[Statement, _Trial, _Estimate, BudgetDecision]]:
+        """One-hot encode only the top categories that fit, or return None"""
+        calls = _rewritable_calls(statement.node)
+        if not calls:
+            return None
+        # Size the top k by the peak per output column; one column is for 'Other'
+        columns = max(estimate.output / max(estimate.column_bytes, 1), 1)
+        per_column = max(estimate.column_bytes, estimate.peak / columns, 1)
+        k = int(remaining / per_column) // calls - 1
+        cardinality = max(
+            (full_df[col].nunique() for col, _ in _dummy_columns(statement.node) if col in full_df),
+            default=0,
+        )
+        # Shrink k while the estimate of the rewritten statement does not fit
+        for _ in range(3):
+            if k < 1 or cardinality <= k:
+                return None
+            node = _TopKDummies(k).visit(ast.parse(ast.unparse(statement.node)).body[0])
+            rewritten = split_statements(ast.unparse(ast.fix_missing_locations(node)))[0]
+            try:
+                trial, estimate = self._estimate(rewritten, sample_globals, full_df, widths)
+            except Exception:
+                return None
+            if estimate.peak <= remaining:
+                break
+            k = int(k * remaining / estimate.peak)
+        else:
+            return None
+        decision = BudgetDecision(
+            rewritten.source,
+            "rewrite",
+            estimate.output,
+            estimate.peak,
+            f"one-hot encodes the top {k} of {cardinality} categories plus 'Other'",
+        )
+        return rewritten, trial, estimate, decision
+
+    def _skip(
+        self,
+        statement: Statement,
+        skipped_columns: set,
+        skipped_names: set,
+        detail: str,
+        output: int = 0,
+        peak: int = 0,
+    ) -> None:
+        skipped_columns.update(statement.writes or [])
+        skipped_names.update(statement.names_defined)
+        self.decisions.append(BudgetDecision(statement.source, "skip", output, peak, detail))
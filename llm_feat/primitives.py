@@ -0,0 +1,248 @@
+"""
+Vectorized feature engineering primitives for generated code.
+
+Generated code can call these as ``fe.<name>(...)``; ``fe`` is available
+when code is executed by llm-feat. Elsewhere, import it with
+``from llm_feat import primitives as fe``.
+
+All functions work on integer category codes with NumPy (bincount,
+take) instead of Python-level ``map``/``apply`` calls or repeated
+groupby operations. Missing values form their own category.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Import line added to generated code that calls the primitives
+IMPORT_LINE = "from llm_feat import primitives as fe"
+
+
+def _codes(values: pd.Series | list) -> tuple[np.ndarray, int]:
+    """
+    Integer codes of the categories of one or more key columns.
+
+    Returns:
+        (codes, number of categories); missing values get their own code
+    """
+    if isinstance(values, list):
+        # Combine several keys into one code per distinct key tuple
+        codes = np.zeros(len(values[0]), dtype=np.int64)
+        for series in values:
+            series_codes, n_categories = _codes(series)
+            codes = codes * n_categories + series_codes
+        uniques, codes = np.unique(codes, return_inverse=True)
+        return codes.reshape(-1), len(uniques)
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        n_categories = len(values.cat.categories)
+    else:
+        codes, uniques = pd.factorize(values)
+        n_categories = len(uniques)
+    codes = np.where(codes < 0, n_categories, codes)
+    return codes, n_categories + 1
+
+
+def _series(values: np.ndarray, like: pd.Series, name: Optional[str] = None) -> pd.Series:
+    return pd.Series(values, index=like.index, name=name or like.name)
+
+
+def frequency_encode(series: pd.Series, normalize: bool = True) -> pd.Series:
+    """
+    Replace each value by how often it occurs.
+
+    Args:
+        series: Categorical or any hashable-valued column
+        normalize: If True, return the share of rows instead of the count
+    """
+    codes, n_categories = _codes(series)
+    counts = np.bincount(codes, minlength=n_categories)
+    values = counts[codes]
+    if normalize:
+        values = values / max(len(series), 1)
+    return _series(values, series)
+
+
+def target_encode(
+    series: pd.Series,
+    target: pd.Series,
+    n_splits: int = 5,
+    smoothing: float = 10.0,
+    random_state: int = 0,
+) -> pd.Series:
+    """
+    Out-of-fold smoothed target mean per category.
+
+    Each row is encoded with statistics from the other folds only, so the
+    row's own label never leaks into its feature. Category means are
+    shrunk towards the global mean: (sum + smoothing * prior) /
+    (count + smoothing).
+
+    Args:
+        series: Categorical column
+        target: Numeric (or boolean) target aligned with series; rows with
+                a missing target are encoded but not used for statistics
+        n_splits: Number of folds
+        smoothing: Weight of the global mean
+        random_state: Seed for the fold assignment
+    """
+    codes, n_categories = _codes(series)
+    y = pd.to_numeric(target, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    labeled = ~np.isnan(y)
+    y_filled = np.where(labeled, y, 0.0)
+
+    n = len(codes)
+    n_splits = max(1, min(n_splits, n))
+    folds = np.empty(n, dtype=np.int64)
+    folds[np.random.default_rng(random_state).permutation(n)] = np.arange(n) % n_splits
+
+    total_sum = np.bincount(codes, weights=y_filled, minlength=n_categories)
+    total_count = np.bincount(codes, weights=labeled, minlength=n_categories)
+    encoded = np.empty(n, dtype=float)
+    for fold in range(n_splits):
+        in_fold = folds == fold
+        fold_sum = np.bincount(codes[in_fold], weights=y_filled[in_fold], minlength=n_categories)
+        fold_count = np.bincount(codes[in_fold], weights=labeled[in_fold], minlength=n_categories)
+        train_sum, train_count = total_sum - fold_sum, total_count - fold_count
+        prior = train_sum.sum() / train_count.sum() if train_count.sum() else np.nan
+        weight = train_count + smoothing
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Categories not seen outside the fold get the prior
+            means = np.where(weight > 0, (train_sum + smoothing * prior) / weight, prior)
+        encoded[in_fold] = means[codes[in_fold]]
+    return _series(encoded, series, f"{series.name}_target_mean")
+
+
+def group_rare(
+    series: pd.Series,
+    min_frequency: float = 0.01,
+    min_count: Optional[int] = None,
+    other: str = "Other",
+    max_categories: Optional[int] = None,
+) -> pd.Series:
+    """
+    Merge infrequent categories into one.
+
+    Args:
+        series: Categorical column
+        min_frequency: Categories below this share of rows are merged
+        min_count: If given, categories with fewer rows are merged instead
+        other: Label of the merged category
+        max_categories: If given, also merge all but the most frequent
+                        max_categories categories
+
+    Returns:
+        Categorical series; missing values stay missing
+    """
+    categorical = pd.Categorical(series)
+    codes = categorical.codes.astype(np.int64)
+    present = codes >= 0
+    counts = np.bincount(codes[present], minlength=len(categorical.categories))
+    threshold = min_count if min_count is not None else min_frequency * len(series)
+    frequent = counts >= threshold
+    if max_categories is not None:
+        top = np.zeros(len(counts), dtype=bool)
+        top[np.argsort(-counts, kind="stable")[:max_categories]] = True
+        frequent &= top
+    if frequent.all():
+        return _series(categorical, series)
+
+    kept = list(categorical.categories[frequent])
+    categories = pd.Index(kept if other in kept else kept + [other])
+    mapping = categories.get_indexer(categorical.categories)
+    mapping[~frequent] = categories.get_loc(other)
+    new_codes = np.where(present, mapping[np.maximum(codes, 0)], -1)
+    return _series(
+        pd.Categorical.from_codes(new_codes, categories=categories, ordered=categorical.ordered),
+        series,
+    )
+
+
+# Statistics supported by group_aggregate
+GROUP_STATS = ("count", "sum", "mean", "std", "min", "max", "median", "diff", "ratio")
+
+
+def group_aggregate(
+    df: pd.DataFrame,
+    by: str | list[str],
+    column: str,
+    stat: str = "mean",
+) -> pd.Series:
+    """
+    Statistic of a numeric column within each group, broadcast to the rows.
+
+    Args:
+        df: DataFrame
+        by: Grouping column or columns
+        column: Numeric column to aggregate
+        stat: One of 'count', 'sum', 'mean', 'std', 'min', 'max', 'median',
+              or the row-level 'diff' (value minus group mean) and 'ratio'
+              (value divided by group mean)
+
+    Returns:
+        Float series aligned with df
+    """
+    if stat not in GROUP_STATS:
+        raise ValueError(f"Invalid stat: {stat}. Must be one of {GROUP_STATS}")
+    keys = [by] if isinstance(by, str) else list(by)
+    codes, n_groups = _codes([df[key] for key in keys] if len(keys) > 1 else df[keys[0]])
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    count = np.bincount(codes, weights=valid, minlength=n_groups)
+    total = np.bincount(codes, weights=filled, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        if stat == "count":
+            result = count[codes]
+        elif stat == "sum":
+            result = total[codes]
+        elif stat == "mean":
+            result = mean[codes]
+        elif stat == "diff":
+            result = values - mean[codes]
+        elif stat == "ratio":
+            result = np.where(mean[codes] != 0, values / mean[codes], np.nan)
+        elif stat == "std":
+            deviation = np.where(valid, values - mean[codes], 0.0)
+            squares = np.bincount(codes, weights=deviation**2, minlength=n_groups)
+            std = np.sqrt(squares / (count - 1))
+            result = np.where(count > 1, std, np.nan)[codes]
+        else:
+            # Order statistics have no bincount form; one groupby on the codes
+            per_group = pd.Series(values).groupby(codes).agg(stat)
+            result = per_group.reindex(range(n_groups)).to_numpy()[codes]
+    name = f"{column}_{stat}_by_{'_'.join(map(str, keys))}"
+    return pd.Series(result, index=df.index, name=name)
+
+
+def bin_numeric(series: pd.Series, bins: int = 10, strategy: str = "quantile") -> pd.Series:
+    """
+    Discretize a numeric column into integer bin codes.
+
+    Args:
+        series: Numeric column
+        bins: Number of bins (fewer if quantile edges coincide)
+        strategy: 'quantile' for equal-frequency bins, 'uniform' for
+                  equal-width bins
+
+    Returns:
+        Integer series of bin codes starting at 0; -1 for missing values
+    """
+    if strategy not in ("quantile", "uniform"):
+        raise ValueError(f"Invalid strategy: {strategy}. Must be 'quantile' or 'uniform'")
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(values)
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return _series(np.full(len(values), -1, dtype=np.int64), series)
+
+    if strategy == "quantile":
+        edges = np.quantile(finite, np.linspace(0, 1, bins + 1))
+    else:
+        edges = np.linspace(finite.min(), finite.max(), bins + 1)
+    codes = np.searchsorted(np.unique(edges)[1:-1], values, side="right")
+    return _series(np.where(missing, -1, codes), series)
@@ -0,0 +1,225 @@
+"""Persistent registry of generated feature code keyed by schema signature"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    signature TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    report TEXT,
+    schema TEXT NOT NULL,
+    model TEXT,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (signature, version)
+)
+"""
+
+_COLUMNS = "signature, version, code, report, schema, model, pinned, created_at, last_used_at"
+
+
+@dataclass
+class RegistryEntry:
+    """A stored feature pipeline"""
+
+    signature: str
+    version: int
+    code: str
+    report: Optional[str]
+    schema: dict
+    model: Optional[str]
+    pinned: bool
+    created_at: float
+    last_used_at: float
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> "RegistryEntry":
+        signature, version, code, report, schema, model, pinned, created, used = row
+        return cls(
+            signature, version, code, report, json.loads(schema), model, bool(pinned), created, used
+        )
+
+
+class FeatureRegistry:
+    """
+    Local SQLite store of generated feature code and reports.
+
+    Entries are keyed by the schema signature of the dataset they were
+    generated for (see llm_feat.schema). Every save for a signature creates
+    a new version; lookups return the pinned version if there is one, else
+    the latest.
+
+    Pass a registry to generate_features to reuse stored code for matching
+    schemas without calling the model:
+
+        registry = FeatureRegistry("features.db")
+        code = generate_features(df, metadata_df, registry=registry)
+    """
+
+    def __init__(self, path: str = "llm_feat_registry.db"):
+        """
+        Open (or create) a registry.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = path
+        self._connect()
+
+    def _connect(self) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def __getstate__(self) -> dict:
+        # A pickled registry (e.g. inside a fitted LLMFeatTransformer)
+        # reopens its database file when unpickled
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.path = state["path"]
+        self._connect()
+
+    def save(
+        self,
+        signature: str,
+        code: str,
+        schema: dict,
+        report: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> RegistryEntry:
+        """
+        Store code (and optionally its report) as a new version.
+
+        Args:
+            signature: Schema signature (llm_feat.schema.schema_signature)
+            code: Generated feature code
+            schema: Schema snapshot the code was generated for
+            report: Optional feature report
+            model: Model that generated the code
+
+        Returns:
+            The stored entry
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            (latest,) = self._conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM entries WHERE signature = ?",
+                (signature,),
+            ).fetchone()
+            self._conn.execute(
+                f"INSERT INTO entries ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (signature, latest + 1, code, report, json.dumps(schema), model, now, now),
+            )
+        return RegistryEntry(signature, latest + 1, code, report, schema, model, False, now, now)
+
+    def lookup(self, signature: str) -> Optional[RegistryEntry]:
+        """
+        Return the pinned or latest entry for a signature, or None.
+
+        The entry's last-used time is updated so that garbage collection
+        keeps entries that are still in use.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE signature = ? "
+                "ORDER BY pinned DESC, version DESC LIMIT 1",
+                (signature,),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._conn.execute(
+                "UPDATE entries SET last_used_at = ? WHERE signature = ? AND version = ?",
+                (now, row[0], row[1]),
+            )
+        entry = RegistryEntry._from_row(row)
+        entry.last_used_at = now
+        return entry
+
+    def get(self, signature: str, version: int) -> Optional[RegistryEntry]:
+        """Return a specific version, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE signature = ? AND version = ?",
+                (signature, version),
+            ).fetchone()
+        return RegistryEntry._from_row(row) if row else None
+
+    def list(self, signature: Optional[str] = None) -> list[RegistryEntry]:
+        """List entries, optionally only those for one signature"""
+        query = f"SELECT {_COLUMNS} FROM entries"
+        params: tuple = ()
+        if signature is not None:
+            query += " WHERE signature = ?"
+            params = (signature,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY signature, version", params).fetchall()
+        return [RegistryEntry._from_row(row) for row in rows]
+
+    def pin(self, signature: str, version: int) -> None:
+        """
+        Pin a version so lookups return it instead of the latest.
+
+        Raises:
+            KeyError: If the version does not exist
+        """
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM entries WHERE signature = ? AND version = ?",
+                (signature, version),
+            ).fetchone()
+            if not exists:
+                raise KeyError(
+                    f"No registry entry for signature {signature[:12]} version {version}"
+                )
+            self._conn.execute(
+                "UPDATE entries SET pinned = (version = ?) WHERE signature = ?",
+                (version, signature),
+            )
+
+    def unpin(self, signature: str) -> None:
+        """Remove any pin for a signature"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET pinned = 0 WHERE signature = ?", (signature,))
+
+    def gc(self, max_age_days: Optional[float] = None, keep_versions: Optional[int] = None) -> int:
+        """
+        Delete stale entries. Pinned entries are never deleted.
+
+        Args:
+            max_age_days: Delete entries not used within this many days
+            keep_versions: Keep only the newest N versions per signature
+
+        Returns:
+            Number of deleted entries
+        """
+        deleted = 0
+        with self._lock, self._conn:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                deleted += self._conn.execute(
+                    "DELETE FROM entries WHERE pinned = 0 AND last_used_at < ?", (cutoff,)
+                ).rowcount
+            if keep_versions is not None:
+                deleted += self._conn.execute(
+                    "DELETE FROM entries WHERE pinned = 0 AND ("
+                    "  SELECT COUNT(*) FROM entries AS newer"
+                    "  WHERE newer.signature = entries.signature"
+                    "  AND newer.version > entries.version"
+                    ") >= ?",
+                    (keep_versions,),
+                ).rowcount
+        return deleted
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self._conn.close()
@@ -0,0 +1,358 @@
+"""Sandboxed pool of warm worker processes for executing generated code"""
+
+import contextlib
+import gc
+import importlib
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import traceback
+from typing import Literal, Optional
+
+import numpy as np
+import pandas as pd
+
+from .execution import execute_code
+from .shm import SharedFrame
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Modules imported by every worker before it accepts jobs
+DEFAULT_PRELOAD = ("numpy", "pandas", "llm_feat.execution")
+
+
+def _set_cpu_time_limit(seconds: Optional[float]) -> None:
+    """Limit the CPU time the next job may use (SIGXCPU when exceeded)"""
+    if resource is None or seconds is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _set_memory_limit(memory_limit_mb: Optional[int]) -> None:
+    """Limit the address space of the worker process"""
+    if resource is None or memory_limit_mb is None:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+@contextlib.contextmanager
+def _copy_on_write():
+    """Enable pandas copy-on-write so copying a shared frame is lazy"""
+    if pd.__version__.startswith("2."):
+        with pd.option_context("mode.copy_on_write", True):
+            yield
+    else:
+        yield  # Always on from pandas 3
+
+
+def _unchanged(after: pd.Series, before: pd.Series) -> bool:
+    """True if a column still holds the buffer it was created with"""
+    if after.dtype != before.dtype:
+        return False
+    if after.array is before.array:
+        return True
+    if isinstance(after.dtype, pd.CategoricalDtype):
+        return np.shares_memory(after.array.codes, before.array.codes)
+    try:
+        return np.shares_memory(after.to_numpy(), before.to_numpy())
+    except TypeError:
+        return False
+
+
+def _execute_shared(code: str, shared: SharedFrame) -> tuple:
+    """
+    Execute code on a shared frame and share back only the result delta.
+
+    Returns:
+        (delta SharedFrame, result column order, full) where full is True
+        if the delta holds the whole result (e.g. rows were changed)
+    """
+    with _copy_on_write():
+        df = shared.to_dataframe()
+        # A shallow copy shares the read-only buffers; copy-on-write copies
+        # a column only when the generated code writes to it
+        result = execute_code(code, df.copy(deep=False), copy=False)
+        if result.index.equals(df.index) and result.columns.is_unique and df.columns.is_unique:
+            changed = [
+                col
+                for col in result.columns
+                if col not in df.columns or not _unchanged(result[col], df[col])
+            ]
+            delta, full = result[changed], False
+        else:
+            delta, full = result, True
+        delta_shared = SharedFrame.from_dataframe(delta)
+    # The parent process owns the delta segment and unlinks it
+    delta_shared.close()
+    return delta_shared, list(result.columns), full
+
+
+def _merge_delta(base: pd.DataFrame, delta: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Apply new and changed columns from a worker to the input frame"""
+    result = base
+    for col in delta.columns:
+        result[col] = delta[col]
+    if list(result.columns) != columns:
+        result = result[columns]
+    return result
+
+
+def _worker_main(conn, cpu_time_limit, memory_limit_mb, preload) -> None:
+    """Worker loop: import dependencies once, then execute jobs until told to stop"""
+    for module_name in preload:
+        importlib.import_module(module_name)
+    _set_memory_limit(memory_limit_mb)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        transport, code, data = job
+        _set_cpu_time_limit(cpu_time_limit)
+        try:
+            if transport == "shm":
+                reply = ("ok", _execute_shared(code, data))
+            else:
+                reply = ("ok", execute_code(code, data))
+        except BaseException as e:  # Includes MemoryError from the limit
+            reply = ("error", f"{type(e).__name__}: {e}", traceback.format_exc())
+        conn.send(reply)
+
+        if transport == "shm":
+            # Drop views on the input segment so the mapping can be released
+            del reply
+            gc.collect()
+            data.close()
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe"""
+
+    def __init__(self, ctx, cpu_time_limit, memory_limit_mb, preload):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, cpu_time_limit, memory_limit_mb, preload),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self) -> None:
+        """Ask the worker to exit, killing it if it does not"""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pool of pre-started worker processes that execute generated code.
+
+    Each worker imports pandas and numpy once at startup, so executing a job
+    does not pay for interpreter startup. Every job runs with a CPU-time
+    limit, a memory (address space) limit and a wall-clock timeout; a
+    worker that fails or exceeds a limit is replaced with a fresh one.
+    CPU-time and memory limits require the Unix ``resource`` module and are
+    ignored elsewhere.
+
+    With ``transport="shm"`` the input frame's column buffers are placed in
+    shared memory and workers operate on zero-copy views of them, returning
+    only new or changed columns the same way, so a large frame is not
+    pickled to (or duplicated in) every worker. A SharedFrame created once
+    with ``SharedFrame.from_dataframe`` can also be passed to ``execute``
+    directly to share one copy across many jobs.
+
+    Use as the ``executor`` argument of generate_features:
+
+        with SandboxPool(n_workers=2, timeout=60) as pool:
+            df_new = generate_features(df, metadata_df, mode="direct", executor=pool)
+    """
+
+    def __init__(
+        self,
+        n_workers: int = 2,
+        cpu_time_limit: Optional[float] = 60,
+        memory_limit_mb: Optional[int] = None,
+        timeout: Optional[float] = 120,
+        preload: tuple = DEFAULT_PRELOAD,
+        start_method: Optional[str] = None,
+        transport: Literal["pickle", "shm"] = "pickle",
+    ):
+        """
+        Start the worker processes.
+
+        Args:
+            n_workers: Number of worker processes
+            cpu_time_limit: CPU seconds a single job may use (None: no limit)
+            memory_limit_mb: Address space limit per worker in megabytes
+                            (None: no limit)
+            timeout: Wall-clock seconds to wait for a job (None: no limit)
+            preload: Modules each worker imports at startup
+            start_method: multiprocessing start method. Defaults to
+                         'forkserver' where available, else 'spawn'.
+            transport: How DataFrames are sent to workers: 'pickle' or
+                      'shm' (shared memory, zero-copy for numeric columns)
+        """
+        if n_workers < 1:
+            raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+        if transport not in ("pickle", "shm"):
+            raise ValueError(f"Invalid transport: {transport}. Must be 'pickle' or 'shm'")
+        if start_method is None:
+            available = mp.get_all_start_methods()
+            start_method = "forkserver" if "forkserver" in available else "spawn"
+
+        self.n_workers = n_workers
+        self.cpu_time_limit = cpu_time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.timeout = timeout
+        self.preload = tuple(preload)
+        self.transport = transport
+        self._ctx = mp.get_context(start_method)
+        if start_method == "forkserver":
+            self._ctx.set_forkserver_preload(list(self.preload))
+
+        self.stats = {"jobs": 0, "failures": 0, "timeouts": 0, "recycled": 0}
+        self._stats_lock = threading.Lock()
+        self._idle: queue.Queue = queue.Queue()
+        self._closed = False
+        for _ in range(n_workers):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self) -> _Worker:
+        return _Worker(self._ctx, self.cpu_time_limit, self.memory_limit_mb, self.preload)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def execute(self, code: str, df: pd.DataFrame | SharedFrame) -> pd.DataFrame:
+        """
+        Execute generated code on a DataFrame in a worker process.
+
+        Args:
+            code: Generated code that modifies 'df' in place
+            df: Input DataFrame (not modified), or a SharedFrame. The result
+                of a SharedFrame job references its segment, so keep the
+                segment alive while the result is in use.
+
+        Returns:
+            The DataFrame after executing the code
+
+        Raises:
+            TimeoutError: If the job exceeds the wall-clock timeout
+            RuntimeError: If the code raises, or the worker exceeds its
+                          CPU-time or memory limit
+        """
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+
+        if isinstance(df, SharedFrame):
+            delta, columns, full = self._run(("shm", code, df))
+            return self._collect(delta, columns, full, lambda: df.to_dataframe())
+        if self.transport == "pickle":
+            return self._run(("pickle", code, df))
+
+        shared = SharedFrame.from_dataframe(df)
+        try:
+            delta, columns, full = self._run(("shm", code, shared))
+        finally:
+            shared.unlink()
+        return self._collect(delta, columns, full, lambda: df.copy())
+
+    def _collect(self, delta: SharedFrame, columns: list, full: bool, base) -> pd.DataFrame:
+        """Copy a worker's result delta out of shared memory and merge it"""
+        try:
+            values = delta.to_dataframe(copy=True)
+        finally:
+            delta.unlink()
+        if full:
+            return values
+        return _merge_delta(base(), values, columns)
+
+    def _run(self, job: tuple):
+        """Send a job to an idle worker and return its result"""
+        worker = self._idle.get()
+        self._count("jobs")
+        healthy = False
+        try:
+            worker.conn.send(job)
+            if not worker.conn.poll(self.timeout):
+                self._count("timeouts")
+                raise TimeoutError(
+                    f"Generated code exceeded the {self.timeout}s wall-clock timeout"
+                )
+            try:
+                reply = worker.conn.recv()
+            except EOFError:
+                raise RuntimeError(self._describe_exit(worker))
+
+            if reply[0] == "ok":
+                healthy = True
+                return reply[1]
+            _, message, worker_traceback = reply
+            raise RuntimeError(f"{message}\nWorker traceback:\n{worker_traceback}")
+        finally:
+            if not healthy:
+                # Recycle: the worker may be stuck, dead or in a bad state
+                self._count("failures")
+                worker.kill()
+                if not self._closed:
+                    self._count("recycled")
+                    worker = self._start_worker()
+            if self._closed:
+                worker.stop()
+            else:
+                self._idle.put(worker)
+
+    def _describe_exit(self, worker: _Worker) -> str:
+        """Explain why a worker died during a job"""
+        worker.process.join(timeout=1)
+        exitcode = worker.process.exitcode
+        if exitcode == -getattr(signal, "SIGXCPU", 0):
+            return f"Generated code exceeded the {self.cpu_time_limit}s CPU-time limit"
+        if exitcode == -signal.SIGKILL:
+            return "Worker was killed while executing generated code (out of memory?)"
+        return f"Worker exited unexpectedly with code {exitcode}"
+
+    def close(self) -> None:
+        """Stop all idle workers. Busy workers stop when their job ends."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+    def __enter__(self) -> "SandboxPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
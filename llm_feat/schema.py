@@ -0,0 +1,263 @@
+"""Dataset schema snapshots and signatures"""
+
+import hashlib
+import json
+import warnings
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pandas as pd
+
+REQUIRED_METADATA_COLUMNS = [
+    "column_name",
+    "description",
+    "data_type",
+    "label_definition",
+]
+
+
+def validate_metadata(metadata_df: pd.DataFrame) -> None:
+    """Raise ValueError if the metadata DataFrame misses required columns"""
+    missing_cols = [col for col in REQUIRED_METADATA_COLUMNS if col not in metadata_df.columns]
+    if missing_cols:
+        raise ValueError(
+            f"Metadata DataFrame missing required columns: "
+            f"{missing_cols}. Required columns: {REQUIRED_METADATA_COLUMNS}"
+        )
+
+
+# metadata data_type values (case-insensitive) that mark a categorical column
+CATEGORICAL_TYPES = ("categorical", "category", "cat", "string", "text", "object")
+
+
+@dataclass(frozen=True)
+class ColumnMetadata:
+    """Metadata of one column; missing values are None"""
+
+    name: object
+    description: Optional[object] = None
+    data_type: Optional[object] = None
+    label_definition: Optional[object] = None
+    categorical: bool = False
+
+
+class MetadataSchema:
+    """
+    Validated, indexed metadata of a dataset.
+
+    Built once from a metadata DataFrame with vectorized operations, it
+    answers per-column lookups (description, data type, label definition,
+    categorical flag) from a dict. It is immutable, so one instance can be
+    reused across calls: every function that takes a metadata DataFrame
+    also accepts a MetadataSchema.
+
+        schema = MetadataSchema.from_dataframe(metadata_df)
+        schema["age"].description
+        schema.categorical_columns(df.columns)
+    """
+
+    def __init__(self, columns: list[ColumnMetadata]):
+        self._columns = {column.name: column for column in columns}
+        self._target = next(
+            (column.name for column in columns if column.label_definition not in (None, "")),
+            None,
+        )
+
+    @classmethod
+    def from_dataframe(cls, metadata_df: pd.DataFrame) -> "MetadataSchema":
+        """
+        Validate a metadata DataFrame and index it by column name.
+
+        If a column_name appears more than once, the first row is used and
+        a warning is issued.
+
+        Raises:
+            ValueError: If required columns are missing, or column_name
+                        values are missing
+        """
+        validate_metadata(metadata_df)
+        names = metadata_df["column_name"]
+        if names.isna().any():
+            raise ValueError(
+                f"Metadata rows without a column_name: {names.index[names.isna()].tolist()}"
+            )
+        duplicated = names.duplicated()
+        if duplicated.any():
+            warnings.warn(
+                f"Duplicate column_name entries in metadata: "
+                f"{list(names[duplicated].unique())}; using the first row of each",
+                UserWarning,
+            )
+            metadata_df = metadata_df[~duplicated]
+            names = metadata_df["column_name"]
+
+        def values(col: str) -> list:
+            series = metadata_df[col].astype(object)
+            return series.where(series.notna(), None).tolist()
+
+        categorical = metadata_df["data_type"].astype("string").str.lower().isin(CATEGORICAL_TYPES)
+        return cls(
+            [
+                ColumnMetadata(*fields)
+                for fields in zip(
+                    names.tolist(),
+                    values("description"),
+                    values("data_type"),
+                    values("label_definition"),
+                    categorical.fillna(False).tolist(),
+                )
+            ]
+        )
+
+    @property
+    def target(self) -> Optional[str]:
+        """First column with a non-empty label definition, in metadata order"""
+        return self._target
+
+    def __getitem__(self, name) -> ColumnMetadata:
+        return self._columns[name]
+
+    def get(self, name, default=None) -> Optional[ColumnMetadata]:
+        return self._columns.get(name, default)
+
+    def __contains__(self, name) -> bool:
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns.values())
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def categorical_columns(self, columns=None) -> list:
+        """Categorical columns in metadata order, restricted to columns if given"""
+        present = None if columns is None else set(columns)
+        return [
+            column.name
+            for column in self
+            if column.categorical and (present is None or column.name in present)
+        ]
+
+    def subset(self, columns) -> "MetadataSchema":
+        """Schema of the given columns only, in metadata order"""
+        wanted = set(columns)
+        return MetadataSchema([column for column in self if column.name in wanted])
+
+    def prompt_text(self) -> str:
+        """Describe the metadata for the LLM prompt"""
+        info_lines = ["Column Metadata:"]
+        for column in self:
+            description = "N/A" if column.description is None else column.description
+            data_type = "N/A" if column.data_type is None else column.data_type
+            info_lines.append(f"\n  Column: {column.name}")
+            info_lines.append(f"    Description: {description}")
+            info_lines.append(f"    Data Type: {data_type}")
+            if column.label_definition is not None and column.label_definition != "N/A":
+                info_lines.append(f"    Label Definition: {column.label_definition}")
+        return "\n".join(info_lines)
+
+
+def as_metadata_schema(metadata: pd.DataFrame | MetadataSchema) -> MetadataSchema:
+    """Return metadata as a MetadataSchema, building it from a DataFrame if needed"""
+    if isinstance(metadata, MetadataSchema):
+        return metadata
+    return MetadataSchema.from_dataframe(metadata)
+
+
+def _normalize_text(value) -> Optional[str]:
+    """Collapse whitespace and case so cosmetic edits do not change the signature"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    text = " ".join(str(value).split()).lower()
+    return text or None
+
+
+def _normalize_dtype(dtype) -> str:
+    """Reduce a dtype to its kind (int32 and int64 both become 'int')"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return "timedelta"
+    return "string"
+
+
+def schema_snapshot(
+    df: pd.DataFrame,
+    metadata_df: pd.DataFrame | MetadataSchema,
+    problem_description: Optional[str] = None,
+) -> dict:
+    """
+    Return a normalized, JSON-serializable description of a dataset schema.
+
+    The snapshot holds each column's dtype kind and metadata (description,
+    data type, label definition), the target column and the problem
+    description - everything the generated code depends on besides the
+    data values themselves.
+    """
+    metadata = as_metadata_schema(metadata_df)
+    columns = {}
+    target = None
+    for col, dtype in zip(df.columns, df.dtypes):
+        column = metadata.get(col, ColumnMetadata(col))
+        label = _normalize_text(column.label_definition)
+        columns[str(col)] = {
+            "dtype": _normalize_dtype(dtype),
+            "description": _normalize_text(column.description),
+            "data_type": _normalize_text(column.data_type),
+            "label_definition": label,
+        }
+        if label and target is None:
+            target = str(col)
+
+    return {
+        "columns": columns,
+        "target": target,
+        "problem_description": _normalize_text(problem_description),
+    }
+
+
+def schema_signature(snapshot: dict) -> str:
+    """Return a stable hash of a schema snapshot (independent of column order)"""
+    payload = json.dumps(snapshot, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SchemaDiff:
+    """Columns added, removed or changed between two schema snapshots"""
+
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    target_changed: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed or self.target_changed)
+
+
+def diff_schema(old: dict, new: dict) -> SchemaDiff:
+    """
+    Compare two schema snapshots.
+
+    A column is 'changed' if its dtype kind or any of its metadata differs.
+    """
+    old_columns, new_columns = old["columns"], new["columns"]
+    return SchemaDiff(
+        added=[col for col in new_columns if col not in old_columns],
+        removed=[col for col in old_columns if col not in new_columns],
+        changed=[
+            col
+            for col in new_columns
+            if col in old_columns and new_columns[col] != old_columns[col]
+        ],
+        target_changed=old.get("target") != new.get("target"),
+    )
@@ -0,0 +1,140 @@
+"""Scoring of alternative feature code candidates on a sample of the data"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .code_analysis import drop_dependents, split_statements
+from .execution import execute_code
+from .validation import check_vectorized
+
+
+def _design_matrix(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """Standardized numeric columns with NaN/inf replaced by the column mean"""
+    if not columns:
+        return np.empty((len(df), 0))
+    values = df[columns].to_numpy(dtype=float, na_value=np.nan)
+    values = np.where(np.isfinite(values), values, np.nan)
+    means = np.nanmean(np.where(np.isnan(values).all(axis=0), 0.0, values), axis=0)
+    values = np.where(np.isnan(values), means, values)
+    std = values.std(axis=0)
+    keep = std > 0
+    return (values[:, keep] - means[keep]) / std[keep]
+
+
+def _target_matrix(target: pd.Series) -> np.ndarray:
+    """Numeric targets as a column, other targets one-hot encoded"""
+    if pd.api.types.is_numeric_dtype(target) and target.nunique() > 2:
+        return target.to_numpy(dtype=float, na_value=np.nan).reshape(-1, 1)
+    codes, _ = pd.factorize(target)
+    return np.eye(codes.max() + 1)[codes] if len(codes) else np.empty((0, 1))
+
+
+def cv_r2(X: np.ndarray, Y: np.ndarray, folds: int = 3, alpha: float = 1.0) -> float:
+    """
+    Cross-validated R^2 of a ridge regression, pooled over target columns.
+
+    A quick proxy for how much predictive signal the features hold: a
+    closed-form least-squares fit per fold, with no model dependency.
+    """
+    n = len(X)
+    order = np.random.default_rng(0).permutation(n)
+    fold_of = np.empty(n, dtype=int)
+    fold_of[order] = np.arange(n) % folds
+    X = np.column_stack([np.ones(n), X])
+    penalty = alpha * np.eye(X.shape[1])
+    penalty[0, 0] = 0  # Do not shrink the intercept
+
+    residual, total = 0.0, 0.0
+    for fold in range(folds):
+        train, test = fold_of != fold, fold_of == fold
+        if not train.any() or not test.any():
+            continue
+        coef = np.linalg.solve(X[train].T @ X[train] + penalty, X[train].T @ Y[train])
+        residual += ((Y[test] - X[test] @ coef) ** 2).sum()
+        total += ((Y[test] - Y[train].mean(axis=0)) ** 2).sum()
+    return 1 - residual / total if total > 0 else 0.0
+
+
+def score_candidate(
+    code: str,
+    sample_df: pd.DataFrame,
+    target_column: Optional[str] = None,
+    executor: Optional[object] = None,
+    folds: int = 3,
+) -> float:
+    """
+    Score feature code by the predictive signal of the features it adds.
+
+    The code is executed on the sample. With a target column, the score
+    is the cross-validated R^2 gain of a ridge regression on the numeric
+    input columns plus the new features over the input columns alone.
+    Features derived from the target (e.g. target encoding computed on the
+    whole sample) would leak and are excluded. Without a target, the score
+    is the number of new non-constant numeric features. Row-wise
+    (non-vectorized) code is penalized.
+
+    Args:
+        code: Generated feature code
+        sample_df: Small sample of the input DataFrame
+        target_column: Target column in sample_df, if any
+        executor: Optional execution backend (e.g. SandboxPool)
+        folds: Number of cross-validation folds
+
+    Returns:
+        Score (higher is better); -inf if the code fails on the sample
+    """
+    try:
+        statements = split_statements(code)
+        if executor is None:
+            result = execute_code(code, sample_df)
+        else:
+            result = executor.execute(code, sample_df)
+    except Exception:
+        return float("-inf")
+
+    new_columns = [col for col in result.columns if col not in sample_df.columns]
+    numeric = set(result.select_dtypes(include=["number", "bool"]).columns)
+    features = [col for col in new_columns if col in numeric]
+    penalty = 0.1 * len(check_vectorized(code))
+
+    if target_column is None or target_column not in sample_df.columns:
+        return _design_matrix(result, features).shape[1] - penalty
+
+    _, leaking = drop_dependents(statements, {target_column})
+    leaked = {col for statement in leaking for col in statement.writes or []}
+    features = [col for col in features if col not in leaked]
+
+    target = sample_df[target_column]
+    labeled = target.notna().to_numpy()
+    if labeled.sum() < 2 * folds:
+        return len(features) - penalty
+    Y = _target_matrix(target[labeled])
+    base = [col for col in sample_df.columns if col in numeric and col != target_column]
+    X_base = _design_matrix(result.loc[labeled, base], base)
+    X_all = _design_matrix(result.loc[labeled, base + features], base + features)
+    return cv_r2(X_all, Y, folds) - cv_r2(X_base, Y, folds) - penalty
+
+
+def select_candidate(
+    codes: list[str],
+    sample_df: pd.DataFrame,
+    target_column: Optional[str] = None,
+    executor: Optional[object] = None,
+) -> tuple[int, list[float]]:
+    """
+    Score candidates in parallel and pick the best.
+
+    Candidates are scored concurrently; with a SandboxPool executor each
+    runs in its own worker process.
+
+    Returns:
+        (index of the best candidate, scores of all candidates)
+    """
+    with ThreadPoolExecutor(max_workers=len(codes), thread_name_prefix="llm-feat-score") as pool:
+        scores = list(
+            pool.map(lambda code: score_candidate(code, sample_df, target_column, executor), codes)
+        )
+    return int(np.argmax(scores)), scores
@@ -0,0 +1,457 @@
+"""Local HTTP service running feature generation jobs from a queue"""
+
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import pandas as pd
+
+from .core import generate_features, get_llm_stats
+from .execution import execute_code
+from .instrumentation import MetricsCollector, Span
+from .tables import read_table, write_table
+
+# Request fields passed on to generate_features
+GENERATE_OPTIONS = (
+    "model",
+    "problem_description",
+    "return_report",
+    "structured_output",
+    "n_candidates",
+    "cascade",
+)
+
+
+@dataclass
+class Job:
+    """A queued feature generation request and its outcome"""
+
+    id: str
+    request: dict
+    status: str = "queued"  # queued, generating, executing, done or failed
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    # Set between the generation and execution stages
+    df: Optional[pd.DataFrame] = field(default=None, repr=False)
+    code: Optional[str] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _validate_request(request: dict) -> None:
+    """Raise ValueError if a job request is malformed"""
+    if not isinstance(request, dict):
+        raise ValueError("Request body must be a JSON object")
+    if ("data" in request) == ("data_path" in request):
+        raise ValueError("Provide exactly one of 'data' (rows) or 'data_path'")
+    if ("metadata" in request) == ("metadata_path" in request):
+        raise ValueError("Provide exactly one of 'metadata' (rows) or 'metadata_path'")
+    mode = request.get("mode", "code")
+    if mode not in ("code", "direct"):
+        raise ValueError(f"Invalid mode: {mode}. Must be 'code' or 'direct'")
+    unknown = set(request) - {
+        "data",
+        "data_path",
+        "metadata",
+        "metadata_path",
+        "mode",
+        "output_path",
+        *GENERATE_OPTIONS,
+    }
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}")
+
+
+class FeatureService:
+    """
+    Queue of feature generation jobs served by two worker stages.
+
+    Generation threads (at most ``llm_concurrency`` LLM requests in
+    flight) load each job's data and generate its code. Direct-mode jobs
+    are then passed to execution threads that run the code in a
+    SandboxPool of ``workers`` processes (or in this process if workers
+    is 0), so slow LLM calls and CPU-bound execution do not hold each
+    other up.
+
+    A job request is a dict with:
+
+    - ``data`` (list of row objects, e.g. a sample profiling the dataset)
+      or ``data_path`` (CSV or Parquet file)
+    - ``metadata`` (list of row objects) or ``metadata_path``
+    - ``mode``: 'code' (default) or 'direct'
+    - ``output_path``: where direct mode writes the enriched data
+    - generate_features options: model, problem_description,
+      return_report, structured_output, n_candidates, cascade
+
+    ``data_path``, ``metadata_path`` and ``output_path`` are resolved
+    relative to ``data_root``; paths outside it (absolute paths, ``..``
+    or symlinks leading elsewhere) are rejected.
+    """
+
+    def __init__(
+        self,
+        llm_concurrency: int = 4,
+        workers: int = 2,
+        max_queue: int = 1000,
+        timeout: Optional[float] = None,
+        cpu_time_limit: Optional[float] = 60,
+        max_finished_jobs: int = 10000,
+        data_root: Optional[str] = None,
+    ):
+        """
+        Start the worker threads (and the SandboxPool if workers > 0).
+
+        Args:
+            llm_concurrency: Number of generation threads
+            workers: Worker processes executing direct-mode code
+            max_queue: Maximum queued jobs; submit() raises queue.Full beyond
+            timeout: Wall-clock seconds allowed per execution (workers > 0)
+            cpu_time_limit: CPU seconds a single execution may use
+                            (workers > 0; None: no limit)
+            max_finished_jobs: Finished jobs kept for status queries; the
+                               oldest are forgotten first
+            data_root: Directory that job file paths are confined to
+                       (default: the current working directory)
+        """
+        if llm_concurrency < 1:
+            raise ValueError(f"llm_concurrency must be at least 1, got {llm_concurrency}")
+        self.llm_concurrency = llm_concurrency
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.data_root = os.path.realpath(data_root if data_root is not None else os.getcwd())
+        self.started = time.time()
+        # Latency per stage: queue_wait, generation, execution and total
+        self.latency = MetricsCollector()
+        self.counts: Counter = Counter()
+        self._jobs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._executions: queue.Queue = queue.Queue()
+
+        self._pool = None
+        if workers > 0:
+            from .sandbox import SandboxPool
+
+            self._pool = SandboxPool(
+                n_workers=workers, cpu_time_limit=cpu_time_limit, timeout=timeout
+            )
+        self._threads = [
+            threading.Thread(target=self._generate_loop, name=f"llm-feat-generate-{i}")
+            for i in range(llm_concurrency)
+        ] + [
+            threading.Thread(target=self._execute_loop, name=f"llm-feat-execute-{i}")
+            for i in range(max(workers, 1))
+        ]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def submit(self, request: dict) -> Job:
+        """
+        Queue a job.
+
+        Raises:
+            ValueError: If the request is malformed
+            queue.Full: If the queue is full
+        """
+        _validate_request(request)
+        request = dict(request)
+        for key in ("data_path", "metadata_path", "output_path"):
+            if key in request:
+                request[key] = self._resolve(key, request[key])
+        job = Job(id=uuid.uuid4().hex, request=request)
+        with self._lock:
+            self._jobs[job.id] = job
+            self.counts["submitted"] += 1
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self.counts["submitted"] -= 1
+                self.counts["rejected"] += 1
+            raise
+        return job
+
+    def _resolve(self, key: str, path) -> str:
+        """Resolve a request path within data_root, or raise ValueError"""
+        if not isinstance(path, str) or not path:
+            raise ValueError(f"'{key}' must be a non-empty string")
+        resolved = os.path.realpath(os.path.join(self.data_root, path))
+        if os.path.commonpath([self.data_root, resolved]) != self.data_root:
+            raise ValueError(f"'{key}' must be inside the data root: {path}")
+        return resolved
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with the given id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """Return all known jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def metrics(self) -> dict:
+        """
+        Return queue, throughput and latency metrics.
+
+        'latency' maps each stage (queue_wait, generation, execution,
+        total) to count, errors, mean, max and p50/p90/p99 seconds.
+        """
+        with self._lock:
+            statuses = Counter(job.status for job in self._jobs.values())
+            counts = dict(self.counts)
+        uptime = time.time() - self.started
+        return {
+            "uptime": uptime,
+            "queued": statuses["queued"],
+            "generating": statuses["generating"],
+            "executing": statuses["executing"],
+            "jobs": counts,
+            "throughput": counts.get("done", 0) / uptime if uptime > 0 else 0.0,
+            "latency": self.latency.summary(),
+            "llm": get_llm_stats(),
+            "sandbox": dict(self._pool.stats) if self._pool is not None else None,
+        }
+
+    def _record(self, name: str, seconds: float, error: Optional[str] = None) -> None:
+        stage = Span(name, {})
+        stage.duration = seconds
+        stage.error = error
+        self.latency(stage)
+
+    def _generate_loop(self) -> None:
+        while True:
+            job = self._pending.get()
+            if job is None:
+                return
+            job.started = time.time()
+            job.status = "generating"
+            self._record("queue_wait", job.started - job.submitted)
+            try:
+                self._generate(job)
+            except Exception as e:
+                self._finish(job, error=f"{type(e).__name__}: {e}")
+                continue
+            if job.request.get("mode", "code") == "direct":
+                job.status = "executing"
+                self._executions.put(job)
+            else:
+                self._finish(job)
+
+    def _generate(self, job: Job) -> None:
+        request = job.request
+        if "data" in request:
+            job.df = pd.DataFrame(request["data"])
+        else:
+            job.df = read_table(request["data_path"])
+        if "metadata" in request:
+            metadata_df = pd.DataFrame(request["metadata"])
+        else:
+            metadata_df = read_table(request["metadata_path"])
+
+        start = time.perf_counter()
+        try:
+            options = {key: request[key] for key in GENERATE_OPTIONS if key in request}
+            result = generate_features(job.df, metadata_df, mode="code", **options)
+        except Exception as e:
+            self._record("generation", time.perf_counter() - start, str(e))
+            raise
+        self._record("generation", time.perf_counter() - start)
+        code, report = result if isinstance(result, tuple) else (result, None)
+        job.code = code
+        job.result = {"code": code, "report": report}
+
+    def _execute_loop(self) -> None:
+        while True:
+            job = self._executions.get()
+            if job is None:
+                return
+            start = time.perf_counter()
+            try:
+                if self._pool is None:
+                    result = execute_code(job.code, job.df)
+                else:
+                    result = self._pool.execute(job.code, job.df)
+                output_path = job.request.get("output_path")
+                if output_path:
+                    write_table(result, output_path)
+            except Exception as e:
+                self._record("execution", time.perf_counter() - start, str(e))
+                self._finish(job, error=f"{type(e).__name__}: {e}")
+                continue
+            self._record("execution", time.perf_counter() - start)
+            job.result.update(
+                rows=len(result),
+                new_columns=[str(col) for col in result.columns if col not in job.df.columns],
+                output_path=output_path,
+            )
+            self._finish(job)
+
+    def _finish(self, job: Job, error: Optional[str] = None) -> None:
+        job.finished = time.time()
+        job.df = None  # Release the data
+        job.error = error
+        job.status = "failed" if error else "done"
+        self._record("total", job.finished - job.submitted, error)
+        with self._lock:
+            self.counts[job.status] += 1
+            finished = [old.id for old in self._jobs.values() if old.finished is not None]
+            for job_id in finished[: max(len(finished) - self.max_finished_jobs, 0)]:
+                del self._jobs[job_id]
+
+    def close(self) -> None:
+        """Stop the workers after the jobs already queued, and the SandboxPool"""
+        for _ in range(self.llm_concurrency):
+            self._pending.put(None)
+        for thread in self._threads[: self.llm_concurrency]:
+            thread.join()
+        for _ in self._threads[self.llm_concurrency :]:
+            self._executions.put(None)
+        for thread in self._threads[self.llm_concurrency :]:
+            thread.join()
+        if self._pool is not None:
+            self._pool.close()
+
+    def __enter__(self) -> "FeatureService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON endpoints of the feature service"""
+
+    service: FeatureService  # Set on the subclass created by make_server
+    token: Optional[str] = None
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self) -> bool:
+        """Check the bearer token (if one is configured); send 401 if wrong"""
+        if self.token is None:
+            return True
+        expected = f"Bearer {self.token}".encode("utf-8")
+        if hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+            return True
+        self._send(401, {"error": "Missing or invalid bearer token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["health"]:
+            self._send(200, {"status": "ok"})
+        elif parts == ["metrics"]:
+            self._send(200, self.service.metrics())
+        elif parts == ["jobs"]:
+            self._send(200, [job.to_dict() for job in self.service.jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                self._send(404, {"error": f"Unknown job: {parts[1]}"})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        if self.path.split("?")[0].rstrip("/") != "/jobs":
+            self._send(404, {"error": f"Not found: {self.path}"})
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = self.service.submit(json.loads(self.rfile.read(length) or b"null"))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send(400, {"error": str(e)})
+        except queue.Full:
+            self._send(503, {"error": "Job queue is full"})
+        else:
+            self._send(202, job.to_dict())
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Keep the service quiet; metrics are available at /metrics
+
+
+def make_server(
+    service: FeatureService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    token: Optional[str] = None,
+):
+    """
+    Create an HTTP server for a FeatureService (call serve_forever() on it).
+
+    If token is given, every request must send ``Authorization: Bearer
+    <token>``; others get 401.
+
+    Endpoints:
+        POST /jobs        Submit a job (JSON request, see FeatureService);
+                          202 with the job, 400 if malformed or a path is
+                          outside the data root, 415 if not JSON, 503 if full
+        GET  /jobs        All jobs
+        GET  /jobs/<id>   Status and result of a job
+        GET  /metrics     Queue, throughput and latency metrics
+        GET  /health      Liveness check
+    """
+    handler = type("FeatureServiceHandler", (_Handler,), {"service": service, "token": token})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(
+    host: str = "127.0.0.1", port: int = 8765, token: Optional[str] = None, **service_options
+) -> None:
+    """
+    Run the feature service until interrupted.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on
+        token: Optional bearer token required on every request
+        **service_options: FeatureService options (llm_concurrency,
+                           workers, max_queue, timeout, cpu_time_limit,
+                           data_root)
+    """
+    with FeatureService(**service_options) as service:
+        server = make_server(service, host, port, token)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
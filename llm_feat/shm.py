@@ -0,0 +1,171 @@
+"""Shared-memory DataFrame transport for worker processes"""
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+# Column buffers start on cache-line boundaries
+_ALIGN = 64
+
+
+@dataclass
+class _Column:
+    """Where and how a column is stored in a SharedFrame"""
+
+    name: Any
+    kind: str  # "buffer", "category" or "inline"
+    dtype: str = ""
+    offset: int = 0
+    length: int = 0
+    payload: Any = None  # Inline values, or the categories of a category column
+    ordered: bool = False
+
+
+def _is_buffer_dtype(dtype) -> bool:
+    """True for NumPy dtypes that can be placed in shared memory as raw bytes"""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+class SharedFrame:
+    """
+    A DataFrame whose column buffers live in a shared memory segment.
+
+    Numeric, boolean and datetime columns (and the codes of categorical
+    columns) are copied once into a single segment; other columns are
+    pickled along with the descriptor. Pickling a SharedFrame only sends
+    the descriptor, and ``to_dataframe`` in another process rebuilds the
+    frame as NumPy views on the segment without copying.
+
+    The process that created the frame owns the segment and must call
+    ``unlink`` once no process needs it any more.
+    """
+
+    def __init__(self, shm_name: Optional[str], columns: list, index: Any, n_rows: int):
+        self.shm_name = shm_name
+        self.columns = columns
+        self.index = index
+        self.n_rows = n_rows
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "SharedFrame":
+        """Copy a DataFrame's column buffers into a new shared memory segment."""
+        columns = []
+        buffers = []
+        size = 0
+        for position, name in enumerate(df.columns):
+            series = df.iloc[:, position]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                column = _Column(
+                    name,
+                    "category",
+                    payload=series.cat.categories,
+                    ordered=series.cat.ordered,
+                )
+            elif _is_buffer_dtype(series.dtype):
+                values = series.to_numpy()
+                column = _Column(name, "buffer")
+            else:
+                columns.append(_Column(name, "inline", payload=series.array))
+                continue
+
+            size = -(-size // _ALIGN) * _ALIGN
+            column.dtype = values.dtype.str
+            column.offset = size
+            column.length = len(values)
+            size += values.nbytes
+            columns.append(column)
+            buffers.append((column, values))
+
+        if isinstance(df.index, pd.RangeIndex):
+            index = ("range", df.index.start, df.index.stop, df.index.step)
+        else:
+            index = ("inline", df.index)
+
+        if not buffers:
+            return cls(None, columns, index, len(df))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        frame = cls(shm.name, columns, index, len(df))
+        frame._shm = shm
+        for column, values in buffers:
+            frame._view(column)[:] = values
+        return frame
+
+    def _attach(self) -> shared_memory.SharedMemory:
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        return self._shm
+
+    def _view(self, column: _Column) -> np.ndarray:
+        return np.ndarray(
+            (column.length,),
+            dtype=np.dtype(column.dtype),
+            buffer=self._attach().buf,
+            offset=column.offset,
+        )
+
+    def to_dataframe(self, copy: bool = False) -> pd.DataFrame:
+        """
+        Rebuild the DataFrame.
+
+        Args:
+            copy: If False, buffer columns are read-only views on the shared
+                  segment, which must stay alive while the DataFrame is used.
+                  If True, the data is copied into process memory.
+        """
+        arrays = {}
+        for position, column in enumerate(self.columns):
+            if column.kind == "inline":
+                values = column.payload
+            else:
+                values = self._view(column)
+                if copy:
+                    values = values.copy()
+                else:
+                    values.flags.writeable = False
+                if column.kind == "category":
+                    dtype = pd.CategoricalDtype(column.payload, ordered=column.ordered)
+                    values = pd.Categorical.from_codes(values, dtype=dtype)
+            arrays[position] = values
+
+        if self.index[0] == "range":
+            index = pd.RangeIndex(*self.index[1:])
+        else:
+            index = self.index[1]
+        df = pd.DataFrame(arrays, index=index, copy=False)
+        df.columns = pd.Index([column.name for column in self.columns])
+        return df
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared segment in bytes"""
+        return self._attach().size if self.shm_name else 0
+
+    def close(self) -> None:
+        """Release this process's handle on the segment."""
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # Views on the segment are still referenced; the mapping is
+                # released when they are garbage collected
+                return
+            self._shm = None
+
+    def unlink(self) -> None:
+        """Free the shared segment. Only the owning process should call this."""
+        if self.shm_name is None:
+            return
+        shm = self._attach()
+        self.close()
+        shm.unlink()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        return state
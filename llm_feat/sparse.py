@@ -0,0 +1,128 @@
+"""Sparse one-hot features"""
+
+import ast
+import io
+import tokenize
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .code_analysis import is_get_dummies
+
+try:
+    from scipy import sparse as sp
+except ImportError:  # Optional dependency
+    sp = None
+
+
+def sparsify_dummies(code: str) -> str:
+    """
+    Make pd.get_dummies calls in generated code return sparse columns.
+
+    sparse=True is inserted into every pd.get_dummies call that does not
+    set sparse itself. The rest of the code, including comments, is left
+    unchanged. Code that does not parse is returned as is.
+    """
+    try:
+        tree = ast.parse(code)
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (SyntaxError, tokenize.TokenError):
+        return code
+    lines = code.splitlines(keepends=True)
+
+    def char_col(lineno: int, col: int) -> int:
+        # AST column offsets count UTF-8 bytes, token columns characters
+        return len(lines[lineno - 1].encode()[:col].decode())
+
+    # Closing parenthesis of each call to change
+    closing = {
+        (call.end_lineno, char_col(call.end_lineno, call.end_col_offset) - 1)
+        for call in ast.walk(tree)
+        if is_get_dummies(call)
+        and (call.args or call.keywords)
+        and not any(keyword.arg in ("sparse", None) for keyword in call.keywords)
+    }
+    # Insert after the last token before each closing parenthesis that is
+    # not a comment or line break: the last argument or a trailing comma
+    inserts = []
+    last = None
+    for token in tokens:
+        if token.type == tokenize.OP and token.string == ")" and token.start in closing:
+            inserts.append((last.end, " sparse=True" if last.string == "," else ", sparse=True"))
+        if token.type not in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE):
+            last = token
+    # Last first, so earlier positions stay valid while inserting
+    for (lineno, col), text in sorted(inserts, reverse=True):
+        line = lines[lineno - 1]
+        lines[lineno - 1] = line[:col] + text + line[col:]
+    return "".join(lines)
+
+
+def sparse_columns(df: pd.DataFrame) -> list:
+    """Names of the columns of df with a pandas sparse dtype"""
+    return [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)]
+
+
+def to_csr(df: pd.DataFrame, columns: Optional[list] = None, dtype=None):
+    """
+    Convert sparse columns to a SciPy CSR matrix without densifying them.
+
+    Memory and time scale with the number of stored (non-fill) values.
+    Requires the optional scipy package.
+
+    Args:
+        df: DataFrame
+        columns: Columns to convert (default: all sparse columns). Each must
+                 have a sparse dtype with a fill value of 0 or False.
+        dtype: dtype of the matrix (default: common dtype of the columns)
+
+    Returns:
+        (scipy.sparse.csr_matrix of shape (len(df), len(columns)), column names)
+
+    Raises:
+        ImportError: If scipy is not installed
+        ValueError: If a column is not sparse or its fill value is not zero
+    """
+    if sp is None:
+        raise ImportError("to_csr requires scipy (pip install scipy)")
+    columns = sparse_columns(df) if columns is None else list(columns)
+    rows, cols, values = [], [], []
+    for position, col in enumerate(columns):
+        array = df[col].array
+        if not isinstance(array, pd.arrays.SparseArray):
+            raise ValueError(f"Column {col!r} is not sparse (dtype {df[col].dtype})")
+        if array.fill_value != 0:
+            raise ValueError(f"Column {col!r} has fill value {array.fill_value!r}; expected 0")
+        rows.append(array.sp_index.indices)
+        cols.append(np.full(len(array.sp_values), position, dtype=np.int64))
+        values.append(array.sp_values)
+    if dtype is None:
+        dtype = np.result_type(*{value.dtype for value in values}) if values else np.float64
+    matrix = sp.csr_matrix(
+        (
+            np.concatenate(values).astype(dtype, copy=False) if values else np.empty(0, dtype),
+            (
+                np.concatenate(rows) if rows else np.empty(0, np.int64),
+                np.concatenate(cols) if cols else np.empty(0, np.int64),
+            ),
+        ),
+        shape=(len(df), len(columns)),
+    )
+    return matrix, columns
+
+
+def split_sparse(df: pd.DataFrame, dtype=None) -> tuple:
+    """
+    Split a DataFrame into its dense columns and a CSR matrix of its sparse ones.
+
+    Args:
+        df: DataFrame, e.g. returned by generate_features(..., sparse=True)
+        dtype: dtype of the matrix (see to_csr)
+
+    Returns:
+        (DataFrame of the dense columns, CSR matrix of the sparse columns,
+        names of the sparse columns)
+    """
+    matrix, columns = to_csr(df, dtype=dtype)
+    return df.drop(columns=columns), matrix, columns
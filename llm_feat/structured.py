@@ -0,0 +1,143 @@
+"""Structured (JSON-schema) feature generation output"""
+
+import json
+from dataclasses import dataclass, field
+
+# JSON schema sent to the API as the response format. Strict mode requires
+# every property to be listed as required and no additional properties.
+FEATURE_SET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "domain_summary": {
+            "type": "string",
+            "description": "Understanding of the problem domain and prediction task",
+        },
+        "features": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Name of the new column created by the code",
+                    },
+                    "code": {
+                        "type": "string",
+                        "description": "Python statements creating df[name] from df",
+                    },
+                    "inputs": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Existing columns of df read by the code",
+                    },
+                    "rationale": {
+                        "type": "string",
+                        "description": "Why the feature helps predict the target",
+                    },
+                },
+                "required": ["name", "code", "inputs", "rationale"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["domain_summary", "features"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "feature_set", "strict": True, "schema": FEATURE_SET_SCHEMA},
+}
+
+
+@dataclass
+class Feature:
+    """A single generated feature"""
+
+    name: str
+    code: str
+    inputs: list[str] = field(default_factory=list)
+    rationale: str = ""
+
+
+@dataclass
+class FeatureSet:
+    """Generated features plus the model's domain summary"""
+
+    domain_summary: str
+    features: list[Feature] = field(default_factory=list)
+
+    @property
+    def names(self) -> list[str]:
+        """Names of the generated features"""
+        return [feature.name for feature in self.features]
+
+    @property
+    def code(self) -> str:
+        """Feature engineering code for all features, in order"""
+        return "\n".join(feature.code.strip() for feature in self.features)
+
+    @property
+    def report(self) -> str:
+        """Feature report in the same layout as the free-text report"""
+        lines = [
+            "FEATURE REPORT",
+            "==============",
+            "",
+            "1. DOMAIN UNDERSTANDING:",
+            f"   {self.domain_summary.strip()}",
+            "",
+            "2. GENERATED FEATURES EXPLANATION:",
+        ]
+        for feature in self.features:
+            lines.append(f"   - Feature Name: {feature.name}")
+            if feature.inputs:
+                lines.append(f"     Inputs: {', '.join(feature.inputs)}")
+            lines.append(f"     Rationale: {feature.rationale.strip()}")
+        return "\n".join(lines)
+
+    def select(self, names: list[str]) -> "FeatureSet":
+        """
+        Return a FeatureSet containing only the named features.
+
+        Args:
+            names: Feature names to keep
+
+        Raises:
+            KeyError: If a name is not in this feature set
+        """
+        by_name = {feature.name: feature for feature in self.features}
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise KeyError(f"Unknown features: {missing}. Available features: {self.names}")
+        return FeatureSet(self.domain_summary, [by_name[name] for name in names])
+
+
+def parse_feature_set(content: str) -> FeatureSet:
+    """
+    Parse a structured JSON response into a FeatureSet.
+
+    Args:
+        content: JSON response content matching FEATURE_SET_SCHEMA
+
+    Raises:
+        ValueError: If the content is not valid JSON or misses required fields
+    """
+    try:
+        data = json.loads(content)
+        features = [
+            Feature(
+                name=item["name"],
+                code=item["code"],
+                inputs=list(item.get("inputs", [])),
+                rationale=item.get("rationale", ""),
+            )
+            for item in data["features"]
+        ]
+        feature_set = FeatureSet(data.get("domain_summary", ""), features)
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid structured response: {e}. Raw response: {content[:200]}")
+
+    if not feature_set.features:
+        raise ValueError(f"Structured response contains no features. Raw response: {content[:200]}")
+    return feature_set
@@ -0,0 +1,49 @@
+"""Reading and writing data files (CSV or Parquet) for the CLI and the service"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """Read a CSV or Parquet file"""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    """Write a CSV or Parquet file atomically"""
+    write_atomic(
+        path,
+        lambda tmp_path: (
+            df.to_parquet(tmp_path)
+            if path.endswith(".parquet")
+            else df.to_csv(tmp_path, index=False)
+        ),
+    )
+
+
+def write_atomic(path: str, write) -> None:
+    """Call write(tmp_path), then rename, so an interrupted run leaves no partial file"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text(path: str, text: str) -> None:
+    """Write a UTF-8 text file atomically"""
+
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    write_atomic(path, write)
@@ -0,0 +1,202 @@
+"""scikit-learn compatible feature transformer"""
+
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import pandas as pd
+
+from .fitted import FittedCode
+
+try:
+    from sklearn.base import BaseEstimator, TransformerMixin
+    from sklearn.exceptions import NotFittedError
+except ImportError:  # Optional dependency
+
+    class BaseEstimator:  # type: ignore[no-redef]
+        pass
+
+    class TransformerMixin:  # type: ignore[no-redef]
+        def fit_transform(self, X, y=None, **fit_params):
+            return self.fit(X, y, **fit_params).transform(X)
+
+    class NotFittedError(ValueError, AttributeError):  # type: ignore[no-redef]
+        pass
+
+
+if TYPE_CHECKING:
+    from .registry import FeatureRegistry
+    from .schema import MetadataSchema
+
+
+class LLMFeatTransformer(TransformerMixin, BaseEstimator):
+    """
+    Generate feature code once on fit and apply it with fitted statistics.
+
+    fit generates the feature code (or uses the given code) and executes
+    it on the training data through FittedCode: every statistic the code
+    computes from the data (means, quantiles, frequency maps, group
+    aggregates, bin edges, one-hot categories) is captured. transform
+    applies the code with these statistics to new data, without calling
+    the LLM and without refitting, so train, validation and live data get
+    identical features. The fitted transformer can be pickled.
+
+    fit_transform returns the features computed during fit, where
+    fe.target_encode is out-of-fold; fit(X, y).transform(X) uses the full
+    fitted target means instead.
+
+    Example:
+        pipeline = make_pipeline(
+            LLMFeatTransformer(metadata_df, keep_input=False, n_jobs=4),
+            HistGradientBoostingClassifier(),
+        )
+        pipeline.fit(X_train, y_train)
+        pipeline.predict(X_test)
+    """
+
+    def __init__(
+        self,
+        metadata: "pd.DataFrame | MetadataSchema | None" = None,
+        code: Optional[str] = None,
+        model: str = "gpt-4o",
+        problem_description: Optional[str] = None,
+        structured_output: bool = False,
+        cascade: Optional[list] = None,
+        n_candidates: int = 1,
+        registry: Optional["FeatureRegistry"] = None,
+        keep_input: bool = True,
+        n_jobs: Optional[int] = None,
+    ):
+        """
+        Args:
+            metadata: Metadata DataFrame or MetadataSchema (see
+                      generate_features). The target column named in it
+                      receives y during fit.
+            code: Feature code to use instead of generating it
+            model: OpenAI model to generate the code with
+            problem_description: Optional description of the use case
+            structured_output: Request JSON-schema structured output
+            cascade: Optional list of models to try in order, cheapest first
+            n_candidates: Number of alternative feature sets to sample and score
+            registry: Optional FeatureRegistry to reuse code for the same schema
+            keep_input: If True, transform returns the input columns and the
+                        new features; if False, only the new features
+            n_jobs: Number of parallel jobs for transform. Rows are split
+                    into n_jobs chunks that are transformed with joblib;
+                    -1 uses all CPUs. None or 1 transforms in one piece.
+                    Code using operations that depend on the other rows
+                    (rank, diff, shift, rolling, cumsum, ...) is always
+                    transformed in one piece, since its results would
+                    otherwise depend on the chunk boundaries.
+        """
+        self.metadata = metadata
+        self.code = code
+        self.model = model
+        self.problem_description = problem_description
+        self.structured_output = structured_output
+        self.cascade = cascade
+        self.n_candidates = n_candidates
+        self.registry = registry
+        self.keep_input = keep_input
+        self.n_jobs = n_jobs
+
+    def _with_target(self, X: pd.DataFrame, y=None) -> pd.DataFrame:
+        """Copy of X with the target column (y, or missing values without y)"""
+        if not isinstance(X, pd.DataFrame):
+            raise TypeError(f"LLMFeatTransformer requires a pandas DataFrame, got {type(X)}")
+        df = X.copy()
+        if self.target_ is not None and self.target_ not in df.columns:
+            df[self.target_] = np.nan if y is None else np.asarray(y)
+        return df
+
+    def _fit(self, X: pd.DataFrame, y=None) -> pd.DataFrame:
+        from .schema import as_metadata_schema
+
+        metadata = as_metadata_schema(self.metadata) if self.metadata is not None else None
+        if metadata is None and self.code is None:
+            raise ValueError("LLMFeatTransformer needs metadata to generate code, or code")
+        self.target_ = metadata.target if metadata is not None else None
+        if self.target_ is None and y is not None:
+            self.target_ = getattr(y, "name", None) or "target"
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        df = self._with_target(X, y)
+
+        if self.code is not None:
+            code = self.code
+        else:
+            from .core import _obtain_code
+
+            code, _ = _obtain_code(
+                df,
+                metadata,
+                model=self.model,
+                problem_description=self.problem_description,
+                return_report=False,
+                structured_output=self.structured_output,
+                registry=self.registry,
+                cascade=self.cascade,
+                n_candidates=self.n_candidates,
+            )
+        self.code_ = code
+        self.fitted_code_ = FittedCode(code)
+        result = self.fitted_code_.fit(df)
+
+        columns = [col for col in result.columns if col != self.target_]
+        self.features_ = [col for col in columns if col not in df.columns]
+        self.feature_names_out_ = columns if self.keep_input else list(self.features_)
+        return result[self.feature_names_out_]
+
+    def fit(self, X: pd.DataFrame, y=None) -> "LLMFeatTransformer":
+        """
+        Generate the feature code and fit its statistics on X.
+
+        Args:
+            X: Training DataFrame
+            y: Optional target; assigned to the metadata's target column
+
+        Returns:
+            self
+        """
+        self._fit(X, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y=None, **fit_params) -> pd.DataFrame:
+        """Fit on X and return the features computed during fit"""
+        return self._fit(X, y)
+
+    def _transform_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fitted_code_.transform(df)[self.feature_names_out_]
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply the fitted feature code to X.
+
+        Raises:
+            NotFittedError: If the transformer was not fitted
+            ValueError: If columns seen during fit are missing from X
+        """
+        if not hasattr(self, "fitted_code_"):
+            raise NotFittedError("This LLMFeatTransformer instance is not fitted yet; call fit")
+        missing = [col for col in self.feature_names_in_ if col not in X.columns]
+        if missing:
+            raise ValueError(f"Columns seen during fit are missing: {missing}")
+        df = self._with_target(X)
+
+        n_jobs = self.n_jobs or 1
+        if n_jobs == 1 or len(df) < 2 or self.fitted_code_.row_relative:
+            return self._transform_chunk(df)
+        from joblib import Parallel, delayed, effective_n_jobs
+
+        n_chunks = min(effective_n_jobs(n_jobs), len(df))
+        bounds = np.linspace(0, len(df), n_chunks + 1).astype(int)
+        chunks = Parallel(n_jobs=n_jobs)(
+            delayed(self._transform_chunk)(df.iloc[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        )
+        return pd.concat(chunks)
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        """Names of the columns returned by transform"""
+        if not hasattr(self, "feature_names_out_"):
+            raise NotFittedError("This LLMFeatTransformer instance is not fitted yet; call fit")
+        return np.asarray(self.feature_names_out_, dtype=object)
@@ -0,0 +1,222 @@
+"""Validation of generated feature code before it is used"""
+
+import ast
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .execution import execute_code
+
+# Calls that run Python per row (or per element) instead of vectorized code
+ROW_WISE_CALLS = {"apply", "applymap", "iterrows", "itertuples"}
+
+
+def sample_rows(df: pd.DataFrame, n: int = 200, random_state: int = 0) -> pd.DataFrame:
+    """Return up to n randomly sampled rows of df, in their original order"""
+    if len(df) <= n:
+        return df
+    return df.sample(n=n, random_state=random_state).sort_index()
+
+
+def check_vectorized(code: str) -> list[str]:
+    """
+    Return problems that indicate non-vectorized code.
+
+    Flags row-wise pandas calls (apply, applymap, iterrows, itertuples)
+    and Python loops over the DataFrame or its rows.
+    """
+    problems = []
+    for node in ast.walk(ast.parse(code)):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in ROW_WISE_CALLS
+        ):
+            problems.append(f"Row-wise call .{node.func.attr}() on line {node.lineno}")
+        elif isinstance(node, (ast.For, ast.comprehension)):
+            iterated = ast.unparse(node.iter)
+            if "df" in iterated or "len(" in iterated:
+                line = getattr(node, "lineno", getattr(node.iter, "lineno", "?"))
+                problems.append(f"Python loop over '{iterated}' on line {line}")
+    return problems
+
+
+def validate_feature_code(
+    code: str,
+    sample_df: pd.DataFrame,
+    executor: Optional[object] = None,
+) -> list[str]:
+    """
+    Check generated code on a sample of the data.
+
+    The code must parse, execute on the sample without errors, add at
+    least one column and pass the vectorization check.
+
+    Args:
+        code: Generated feature code
+        sample_df: Small sample of the input DataFrame
+        executor: Optional execution backend (e.g. SandboxPool) to run
+                 the sample in
+
+    Returns:
+        List of problems; empty if the code is valid
+    """
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return [f"Code does not parse: {e}"]
+
+    problems = check_vectorized(code)
+    try:
+        if executor is None:
+            result = execute_code(code, sample_df)
+        else:
+            result = executor.execute(code, sample_df)
+    except Exception as e:
+        return problems + [f"Execution on sample failed: {type(e).__name__}: {e}"]
+
+    if not set(result.columns) - set(sample_df.columns):
+        problems.append("No new columns were added")
+    return problems
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    n: int = 200,
+    target_column: Optional[str] = None,
+    random_state: int = 0,
+) -> pd.DataFrame:
+    """
+    Return a small sample of df that exercises edge cases.
+
+    Rows are drawn from a random pool of at most 50 * n rows. For every
+    column the pool's first row with a missing value, and for numeric
+    columns the first row with a zero, is included so that divisions,
+    logs and NaN handling are exercised. The remaining rows are sampled
+    per target class if a target column is given (every class is
+    represented), else at random. Rows keep their original order.
+    """
+    if len(df) <= n:
+        return df
+    pool = df.sample(n=min(len(df), 50 * n), random_state=random_state)
+
+    edge_rows = []
+    for position in range(pool.shape[1]):
+        column = pool.iloc[:, position]
+        missing = column.isna().to_numpy()
+        if missing.any():
+            edge_rows.append(pool.index[missing.argmax()])
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            zero = (column == 0).to_numpy(dtype=bool, na_value=False)
+            if zero.any():
+                edge_rows.append(pool.index[zero.argmax()])
+    edge_rows = list(dict.fromkeys(edge_rows))[: n // 2]
+
+    rest = pool.drop(index=edge_rows)
+    k = n - len(edge_rows)
+    if target_column is not None and target_column in df.columns:
+        groups = rest.groupby(target_column, dropna=False, observed=True, group_keys=False)
+        sampled = groups.sample(frac=k / len(rest), random_state=random_state)
+        # Every class is represented, however rare
+        sampled = pd.concat([sampled, groups.head(1)])
+        sampled = sampled[~sampled.index.duplicated()]
+    else:
+        sampled = rest.sample(n=k, random_state=random_state)
+    return pd.concat([pool.loc[edge_rows], sampled]).sort_index()
+
+
+@dataclass
+class DryRunReport:
+    """Result of executing generated code on a sample before the full data"""
+
+    sample_size: int
+    total_rows: int
+    elapsed: float = 0.0  # Seconds on the sample
+    estimated_runtime: float = 0.0  # Seconds, extrapolated to total_rows
+    estimated_memory: int = 0  # Bytes, extrapolated to total_rows
+    new_columns: dict = field(default_factory=dict)  # Column name -> dtype
+    problems: list = field(default_factory=list)  # Errors: do not run on full data
+    warnings: list = field(default_factory=list)  # Suspicious but not fatal
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def run_dry_run(
+    code: str,
+    df: pd.DataFrame,
+    target_column: Optional[str] = None,
+    executor: Optional[object] = None,
+    n: int = 200,
+) -> DryRunReport:
+    """
+    Execute generated code on a stratified sample and check the result.
+
+    The code must execute and add at least one column. New columns of
+    object dtype, columns that are entirely missing and columns with
+    infinite values are reported as warnings. Runtime and memory for the
+    full data are extrapolated linearly from the sample; memory is the
+    peak allocated while executing (or, with an executor, the size of the
+    new columns). For vectorized code the sample runtime is dominated by
+    fixed overhead, so the runtime estimate is an upper bound.
+
+    Args:
+        code: Generated feature code
+        df: Full input DataFrame
+        target_column: Optional target column to stratify the sample by
+        executor: Optional execution backend (e.g. SandboxPool)
+        n: Sample size
+
+    Returns:
+        DryRunReport
+    """
+    sample_df = stratified_sample(df, n, target_column)
+    report = DryRunReport(sample_size=len(sample_df), total_rows=len(df))
+    scale = len(df) / max(len(sample_df), 1)
+
+    tracing = executor is None and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if executor is None:
+            result = execute_code(code, sample_df)
+        else:
+            result = executor.execute(code, sample_df)
+    except Exception as e:
+        report.problems.append(f"Execution on sample failed: {type(e).__name__}: {e}")
+        return report
+    finally:
+        report.elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+        if tracing:
+            tracemalloc.stop()
+    report.estimated_runtime = report.elapsed * scale
+
+    new_columns = [col for col in result.columns if col not in sample_df.columns]
+    if not new_columns:
+        report.problems.append("No new columns were added")
+    added_bytes = int(result[new_columns].memory_usage(index=False, deep=True).sum())
+    report.estimated_memory = int(max(peak, added_bytes) * scale)
+
+    for col in new_columns:
+        column = result[col]
+        if isinstance(column, pd.DataFrame):
+            report.problems.append(f"Column '{col}' was created more than once")
+            continue
+        report.new_columns[col] = str(column.dtype)
+        if column.dtype == object:
+            report.warnings.append(f"Column '{col}' has object dtype")
+        if len(column) and column.isna().all():
+            report.warnings.append(f"Column '{col}' is missing on every sample row")
+        elif (
+            pd.api.types.is_float_dtype(column)
+            and np.isinf(column.to_numpy(dtype=float, na_value=np.nan)).any()
+        ):
+            report.warnings.append(f"Column '{col}' contains infinite values")
+    return report
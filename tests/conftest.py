@@ -0,0 +1,45 @@
+"""
+Shared fixtures - LLM responses are mocked, no API calls are made
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+import llm_feat
+
+
+def fake_completion(*contents, usage=None):
+    """Build an object shaped like an OpenAI chat completion response"""
+    choices = [SimpleNamespace(message=SimpleNamespace(content=c)) for c in contents]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.fixture
+def sample_data():
+    """Small DataFrame and matching metadata"""
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6]})
+    metadata = pd.DataFrame(
+        {
+            "column_name": ["a", "b"],
+            "description": ["col a", "col b"],
+            "data_type": ["numeric", "numeric"],
+            "label_definition": [None, None],
+        }
+    )
+    return df, metadata
+
+
+@pytest.fixture
+def mock_llm():
+    """
+    Patch the global LLM client. Set ``mock_llm.return_value`` (or
+    ``side_effect``) to control chat completion responses.
+    """
+    llm_feat.set_api_key("dummy-key-for-test")
+    client = llm_feat.core._get_client()
+    client.client = MagicMock()
+    yield client.client.chat.completions.create
+    llm_feat.set_api_key("")
@@ -0,0 +1,62 @@
+"""
+Tests for numexpr-accelerated execution of arithmetic statements
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.acceleration import compile_statement, run_accelerated
+from llm_feat.code_analysis import split_statements
+from llm_feat.execution import build_exec_globals, execute_code
+
+from .conftest import fake_completion
+
+pytest.importorskip("numexpr")
+
+CODE = """
+df['ratio'] = df['a'] / (df['b'] + 1)
+df['log_b'] = np.log1p(np.abs(df['b']))
+df['abs_diff'] = abs(df['a'] - df['b'])
+df['is_big'] = (df['a'] > 2) & (df['b'] < 6)
+df['clipped'] = np.where(df['a'] > 1, df['a'] ** 2, 0)
+df['rolling'] = df['a'].rolling(2).mean()
+scale = 2
+df['scaled'] = df['ratio'] * scale
+"""
+
+
+def test_compile_statement():
+    statements = split_statements(CODE)
+    compiled = compile_statement(statements[0])
+    assert compiled.target == "ratio"
+    assert compiled.expression == "(c0 / (c1 + 1))"
+    assert compiled.columns == {"a": "c0", "b": "c1"}
+    assert compile_statement(statements[5]) is None  # Method call
+    assert compile_statement(statements[7]) is None  # Free variable
+
+
+def test_accelerated_matches_normal_execution():
+    df = pd.DataFrame({"a": [1, 2, 3, 4], "b": [4, -5, 6, 0]})
+    expected = execute_code(CODE, df)
+    exec_globals = build_exec_globals(df.copy())
+    assert run_accelerated(CODE, exec_globals) == 5
+    result = exec_globals["df"]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_unsupported_input_falls_back():
+    df = pd.DataFrame({"a": pd.array([1, None, 3], dtype="Int64"), "b": [1.0, 2.0, 3.0]})
+    result = execute_code("df['c'] = df['a'] * df['b']", df, accelerate=True)
+    pd.testing.assert_frame_equal(result, execute_code("df['c'] = df['a'] * df['b']", df))
+    with pytest.raises(KeyError):
+        execute_code("df['c'] = df['missing'] * 2", df, accelerate=True)
+
+
+def test_generate_features_accelerate(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+    result = llm_feat.generate_features(df, metadata, mode="direct", accelerate=True)
+    assert list(result["a_plus_b"]) == [5, 7, 9]
+    assert result["a_plus_b"].dtype == np.int64
@@ -0,0 +1,66 @@
+"""
+Tests for background generation with streamed progress
+"""
+
+import threading
+from types import SimpleNamespace
+
+import llm_feat
+
+from .conftest import fake_completion
+
+
+def _stream(content, release=None):
+    """Chunks shaped like an OpenAI streaming response, one per character group"""
+    if release is not None:
+        release.wait(5)
+    for start in range(0, len(content), 4):
+        delta = SimpleNamespace(content=content[start : start + 4])
+        yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta)], usage=None)
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None)
+    yield SimpleNamespace(choices=[], usage=usage)
+
+
+def test_background_generation_streams_and_returns(mock_llm, sample_data):
+    df, metadata = sample_data
+    code = "df['a_plus_b'] = df['a'] + df['b']"
+    release = threading.Event()
+    mock_llm.side_effect = lambda **kwargs: _stream(code, release)
+
+    handle = llm_feat.generate_features_background(df, metadata, mode="direct")
+    assert handle.status == "running"
+    release.set()
+
+    result = handle.result(timeout=5)
+    assert "a_plus_b" in result.columns
+    assert handle.status == "done"
+    assert handle.tokens == len(range(0, len(code), 4))
+    assert mock_llm.call_args.kwargs["stream"] is True
+    assert llm_feat.get_llm_stats()["completion_tokens"] == 5
+
+
+def test_concurrent_background_generations(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.side_effect = lambda **kwargs: _stream("df['c'] = df['a'] * 2")
+
+    handles = [llm_feat.generate_features_background(df, metadata) for _ in range(3)]
+    assert all("df['c']" in handle.result(timeout=5) for handle in handles)
+    # Identical requests in flight at the same time share one call
+    assert mock_llm.call_count + llm_feat.get_llm_stats().get("coalesced", 0) == 3
+
+
+def test_background_generation_reports_errors(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.side_effect = RuntimeError("boom")
+
+    handle = llm_feat.generate_features_background(df, metadata)
+    assert handle.wait(5)
+    assert handle.status == "failed"
+    assert "boom" in str(handle.exception())
+
+
+def test_completions_do_not_stream_by_default(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['c'] = df['a'] * 2")
+    llm_feat.generate_features(df, metadata)
+    assert "stream" not in mock_llm.call_args.kwargs
@@ -0,0 +1,57 @@
+"""
+Tests for multi-candidate generation and sample-based selection
+"""
+
+import numpy as np
+import pandas as pd
+
+import llm_feat
+from llm_feat.selection import score_candidate, select_candidate
+
+from .conftest import fake_completion
+
+
+def _labeled_data(n=120):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.normal(size=n), "b": rng.normal(size=n)})
+    df["y"] = df["a"] * df["b"] + 0.1 * rng.normal(size=n)
+    return df
+
+
+def test_useful_features_score_higher():
+    df = _labeled_data()
+    useful = "df['a_times_b'] = df['a'] * df['b']"
+    useless = "df['a_plus_1'] = df['a'] + 1"
+    broken = "df['c'] = df['missing']"
+    best, scores = select_candidate([useless, useful, broken], df, target_column="y")
+    assert best == 1
+    assert scores[2] == float("-inf")
+
+
+def test_target_derived_features_are_not_rewarded():
+    df = _labeled_data()
+    leaky = "df['y_copy'] = df['y'] * 2"
+    assert score_candidate(leaky, df, target_column="y") <= 0
+
+
+def test_generate_features_picks_best_candidate(mock_llm):
+    df = _labeled_data()
+    metadata = pd.DataFrame(
+        {
+            "column_name": ["a", "b", "y"],
+            "description": ["col a", "col b", "target"],
+            "data_type": ["numeric", "numeric", "numeric"],
+            "label_definition": [None, None, "Product of a and b"],
+        }
+    )
+    mock_llm.return_value = fake_completion(
+        "df['a_plus_1'] = df['a'] + 1",
+        "not python at all (",
+        "df['a_times_b'] = df['a'] * df['b']",
+    )
+
+    code = llm_feat.generate_features(df, metadata, n_candidates=3)
+    assert "df['a_times_b']" in code
+    assert mock_llm.call_count == 1
+    assert mock_llm.call_args.kwargs["n"] == 3
+    assert llm_feat.get_llm_stats()["candidates"] == 3
@@ -0,0 +1,41 @@
+"""
+Tests for code validation and the model cascade
+"""
+
+import pandas as pd
+
+import llm_feat
+from llm_feat.validation import check_vectorized, validate_feature_code
+
+from .conftest import fake_completion
+
+
+def test_validate_feature_code():
+    """Valid code passes; failing, empty and row-wise code is reported"""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    assert validate_feature_code("df['b'] = df['a'] * 2", df) == []
+    assert "No new columns were added" in validate_feature_code("x = 1", df)
+    assert "KeyError" in validate_feature_code("df['b'] = df['missing']", df)[0]
+    assert check_vectorized("df['b'] = df['a'].apply(lambda v: v * 2)")
+    assert check_vectorized("for i in range(len(df)):\n    pass")
+
+
+def test_cascade_escalates_on_validation_failure(mock_llm, sample_data):
+    """The cheap model serves valid code; invalid code escalates"""
+    df, metadata = sample_data
+    responses = {
+        "cheap": "df['a_plus_b'] = df['a'].apply(lambda v: v) + df['b']",
+        "strong": "df['a_plus_b'] = df['a'] + df['b']",
+    }
+    mock_llm.side_effect = lambda model, **_: fake_completion(responses[model])
+
+    code = llm_feat.generate_features(df, metadata, cascade=["cheap", "strong"])
+    assert "apply" not in code
+    stats = llm_feat.get_llm_stats()
+    assert stats["cascade_served:strong"] == 1
+    assert stats["cascade_rejected:cheap"] == 1
+
+    responses["cheap"] = "df['a_times_b'] = df['a'] * df['b']"
+    result = llm_feat.generate_features(df, metadata, mode="direct", cascade=["cheap", "strong"])
+    assert list(result["a_times_b"]) == [4, 10, 18]
+    assert llm_feat.get_llm_stats()["cascade_served:cheap"] == 1
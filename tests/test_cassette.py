@@ -0,0 +1,59 @@
+"""
+Tests for record/replay cassettes - no API calls are made
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+import llm_feat
+from llm_feat.cassette import Cassette
+from llm_feat.llm_client import LLMClient
+
+from .conftest import fake_completion
+
+RESPONSE = "```python\ndf['a_plus_b'] = df['a'] + df['b']\n```"
+
+
+def test_record_then_replay(tmp_path):
+    """Recorded responses are replayed without an API client"""
+    path = str(tmp_path / "llm.jsonl")
+    recorder = LLMClient(api_key="dummy-key-for-test", cassette=Cassette(path, "record"))
+    recorder.client = MagicMock()
+    recorder.client.chat.completions.create.return_value = fake_completion(RESPONSE)
+
+    code = recorder.generate_feature_code("info", "meta", model="gpt-4o-mini")
+    assert code == "df['a_plus_b'] = df['a'] + df['b']"
+
+    replayer = LLMClient(cassette=Cassette(path, "replay"))
+    assert replayer.client is None
+    assert replayer.generate_feature_code("info", "meta", model="gpt-4o-mini") == code
+
+
+def test_replay_miss_fails_loudly(tmp_path):
+    """Unrecorded requests raise instead of calling the API"""
+    path = tmp_path / "llm.jsonl"
+    path.write_text("")
+    client = LLMClient(cassette=Cassette(str(path), "replay"))
+    with pytest.raises(RuntimeError, match="Cassette miss"):
+        client.generate_feature_code("info", "meta")
+
+
+def test_generate_features_with_cassette(tmp_path, sample_data):
+    """generate_features runs end to end from a cassette in direct mode"""
+    path = str(tmp_path / "llm.jsonl")
+    df, metadata = sample_data
+
+    llm_feat.set_api_key("dummy-key-for-test")
+    llm_feat.set_cassette(path, mode="record")
+    client = llm_feat.core._get_client()
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = fake_completion(RESPONSE)
+    llm_feat.generate_features(df, metadata, mode="direct")
+
+    llm_feat.set_cassette(path, mode="replay")
+    try:
+        result = llm_feat.generate_features(df, metadata, mode="direct")
+    finally:
+        llm_feat.set_cassette(None)
+    assert list(result["a_plus_b"]) == [5, 7, 9]
@@ -0,0 +1,62 @@
+"""
+Tests for the llm-feat batch command
+"""
+
+import json
+
+import pandas as pd
+
+from llm_feat.cli import main
+
+from .conftest import fake_completion
+
+
+def _write_dataset(directory, name, sample_data):
+    df, metadata = sample_data
+    df.to_csv(directory / f"{name}.csv", index=False)
+    metadata.to_csv(directory / f"{name}.metadata.csv", index=False)
+
+
+def test_batch_generates_executes_and_resumes(tmp_path, mock_llm, sample_data):
+    data_dir, out_dir = tmp_path / "data", tmp_path / "out"
+    data_dir.mkdir()
+    for name in ("first", "second"):
+        _write_dataset(data_dir, name, sample_data)
+    pd.DataFrame({"a": [1]}).to_csv(data_dir / "no_metadata.csv", index=False)
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+
+    argv = ["batch", str(data_dir), "-o", str(out_dir), "--workers", "0"]
+    assert main(argv) == 1  # no_metadata.csv fails, the others succeed
+    assert mock_llm.call_count == 2
+    for name in ("first", "second"):
+        assert "a_plus_b" in pd.read_csv(out_dir / f"{name}.csv").columns
+        status = json.loads((out_dir / f"{name}.status.json").read_text())
+        assert status["status"] == "done"
+        assert status["new_columns"] == ["a_plus_b"]
+    assert json.loads((out_dir / "no_metadata.status.json").read_text())["status"] == "failed"
+
+    # Interrupted after generating code: the saved code is reused
+    (out_dir / "second.status.json").unlink()
+    assert main(argv) == 1
+    assert mock_llm.call_count == 2
+    status = json.loads((out_dir / "second.status.json").read_text())
+    assert status["code"] == "reused"
+
+
+def test_batch_with_worker_processes(tmp_path, mock_llm, sample_data):
+    _write_dataset(tmp_path, "data", sample_data)
+    mock_llm.return_value = fake_completion("df['ratio'] = df['a'] / df['b']")
+
+    argv = [
+        "batch",
+        str(tmp_path / "*.csv"),
+        "-o",
+        str(tmp_path / "out"),
+        "--workers",
+        "1",
+        "--llm-concurrency",
+        "2",
+    ]
+    assert main(argv) == 0
+    assert "ratio" in pd.read_csv(tmp_path / "out" / "data.csv").columns
+    assert (tmp_path / "out" / "data.py").read_text().count("df['ratio']") == 1
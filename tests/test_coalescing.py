@@ -0,0 +1,89 @@
+"""
+Tests for coalescing concurrent identical LLM requests
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from llm_feat.llm_client import LLMClient
+
+from .conftest import fake_completion
+
+
+def _client(delay=0.2, **kwargs):
+    def create(model, messages, **_):
+        time.sleep(delay)
+        return fake_completion(f"df['x'] = df['a'] * {len(messages[1]['content']) % 7}")
+
+    client = LLMClient(api_key="dummy-key-for-test", **kwargs)
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = create
+    return client
+
+
+def test_identical_concurrent_requests_share_one_call():
+    client = _client()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: client.generate_feature_code("info", "meta"), range(4)))
+    assert len(set(results)) == 1
+    assert client.client.chat.completions.create.call_count == 1
+    assert client.stats["requests"] == 1
+    assert client.stats["coalesced"] == 3
+
+
+def test_different_requests_are_not_coalesced():
+    client = _client()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda info: client.generate_feature_code(info, "meta"), ["a", "b"]))
+    assert client.client.chat.completions.create.call_count == 2
+    assert client.stats["coalesced"] == 0
+
+
+def test_coalescing_can_be_disabled():
+    client = _client(coalesce=False)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: client.generate_feature_code("info", "meta"), range(3)))
+    assert client.client.chat.completions.create.call_count == 3
+
+
+def test_errors_reach_every_waiting_caller():
+    client = _client()
+    started = threading.Event()
+
+    def create(**_):
+        started.set()
+        time.sleep(0.2)
+        raise ConnectionError("API down")
+
+    client.client.chat.completions.create.side_effect = create
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(client.generate_feature_code, "info", "meta")]
+        started.wait(5)
+        futures += [pool.submit(client.generate_feature_code, "info", "meta") for _ in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="API down"):
+                future.result()
+    assert client.client.chat.completions.create.call_count == 1
+    # The failed request is not cached: a later call sends a new request
+    client.client.chat.completions.create.side_effect = None
+    client.client.chat.completions.create.return_value = fake_completion("df['y'] = 1")
+    assert client.generate_feature_code("info", "meta") == "df['y'] = 1"
+
+
+def test_asyncio_tasks_are_coalesced():
+    client = _client()
+
+    async def main():
+        return await asyncio.gather(
+            *(client.agenerate_feature_code("info", "meta") for _ in range(5))
+        )
+
+    results = asyncio.run(main())
+    assert len(set(results)) == 1
+    assert client.client.chat.completions.create.call_count == 1
+    assert client.stats["requests"] == 1 and client.stats["coalesced"] == 4
@@ -0,0 +1,55 @@
+"""
+Tests for the sample dry run before full-data execution
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.validation import run_dry_run, stratified_sample
+
+from .conftest import fake_completion
+
+
+def _data(n=5000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.integers(1, 100, n).astype(float), "y": np.zeros(n, dtype=int)})
+    df.loc[123, "a"] = np.nan
+    df.loc[4321, "a"] = 0.0
+    df.loc[[7, 2500], "y"] = 1  # Rare class
+    return df
+
+
+def test_stratified_sample_includes_edge_rows_and_classes():
+    sample = stratified_sample(_data(), n=100, target_column="y")
+    assert sample["a"].isna().any()
+    assert (sample["a"] == 0).any()
+    assert (sample["y"] == 1).any()
+    assert len(sample) <= 105
+    assert sample.index.is_monotonic_increasing
+
+
+@pytest.mark.filterwarnings("ignore:divide by zero")
+def test_dry_run_reports_problems_and_estimates():
+    df = _data()
+    report = run_dry_run("df['log_a'] = np.log(df['a'])", df, target_column="y")
+    assert report.ok
+    assert report.new_columns == {"log_a": "float64"}
+    assert any("infinite" in message for message in report.warnings)
+    assert report.estimated_runtime >= report.elapsed
+    assert report.estimated_memory > 0
+
+    report = run_dry_run("df['b'] = df['missing'] * 2", df)
+    assert not report.ok and "KeyError" in report.problems[0]
+
+
+def test_generate_features_dry_run_fails_before_full_run(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['a_plus_c'] = df['a'] + df['c']")
+    with pytest.raises(RuntimeError, match="failed a dry run"):
+        llm_feat.generate_features(df, metadata, mode="direct", dry_run=True)
+
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+    result = llm_feat.generate_features(df, metadata, mode="direct", dry_run=True)
+    assert list(result["a_plus_b"]) == [5, 7, 9]
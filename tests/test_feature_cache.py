@@ -0,0 +1,80 @@
+"""
+Tests for the materialized feature cache
+"""
+
+import numpy as np
+import pandas as pd
+
+import llm_feat
+from llm_feat.execution import execute_code
+from llm_feat.feature_cache import FeatureCache
+
+from .conftest import fake_completion
+
+CODE = """
+df['a_sq'] = df['a'] ** 2
+df['b_log'] = np.log1p(df['b'])
+df['a_sq_plus_b'] = df['a_sq'] + df['b']
+df['b_rank'] = df.groupby('g')['b'].rank()
+df['g_code'] = df['g'].astype('category')
+"""
+
+
+def _frame():
+    return pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [4.0, 5.0, 6.0], "g": ["x", "y", "x"]})
+
+
+def test_cache_reuses_unchanged_statements(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    df = _frame()
+    expected = execute_code(CODE, df)
+
+    first = execute_code(CODE, df, cache=cache)
+    assert cache.stats["misses"] == 5 and cache.stats["hits"] == 0
+    second = execute_code(CODE, df, cache=cache)
+    assert cache.stats["hits"] == 5
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+
+    # Changing column a invalidates a_sq, the feature built on it and the
+    # statement reading the whole frame; b_log and g_code are reused
+    df.loc[0, "a"] = 10.0
+    cache.stats.clear()
+    third = execute_code(CODE, df, cache=cache)
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 3
+    pd.testing.assert_frame_equal(third, execute_code(CODE, df))
+
+
+def test_cache_is_bypassed_after_unknown_statement(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    code = "df['x'] = df['a'] * 2\nfor col in ['a', 'b']:\n    df[col + '_neg'] = -df[col]\ndf['y'] = 1"
+    result = execute_code(code, _frame(), cache=cache)
+    assert cache.stats["uncacheable"] == 2
+    assert list(result["b_neg"]) == [-4.0, -5.0, -6.0]
+
+
+def test_generate_features_with_cache(tmp_path, mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+    cache = FeatureCache(str(tmp_path))
+    for _ in range(2):
+        result = llm_feat.generate_features(df, metadata, mode="direct", cache=cache)
+        assert list(result["a_plus_b"]) == [5, 7, 9]
+    assert cache.stats["hits"] == 1
+    assert result["a_plus_b"].dtype == np.int64
+
+
+def test_cache_detects_edits_outside_the_fingerprint_sample(tmp_path):
+    n = 20_000
+    df = pd.DataFrame({"s": [f"v{i % 7}" for i in range(n)]})
+    code = "df['s_upper'] = df['s'].str.upper()"
+    sampled = set(np.linspace(0, n - 1, 4096).astype(np.int64))
+    row = next(i for i in range(n) if i not in sampled)
+    cache = FeatureCache(str(tmp_path))
+    execute_code(code, df, cache=cache)
+
+    edited = df.copy()
+    edited.loc[row, "s"] = "changed"
+    result = execute_code(code, edited, cache=cache)
+    assert cache.stats["misses"] == 2 and cache.stats["hits"] == 0
+    assert result.loc[row, "s_upper"] == "CHANGED"
@@ -0,0 +1,91 @@
+"""
+Tests for DataFrame fingerprints
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import llm_feat
+from llm_feat import core
+from llm_feat.fingerprint import fingerprint_column, fingerprint_dataframe
+
+from .conftest import fake_completion
+
+
+def _frame(n=50_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "x": rng.normal(size=n),
+            "n": rng.integers(0, 100, n),
+            "c": pd.Categorical(rng.choice(["a", "b", "c"], n)),
+            "s": rng.choice(["u", "v"], n).astype(object),
+            "t": pd.date_range("2024-01-01", periods=n, freq="min"),
+        }
+    )
+
+
+def test_fingerprint_is_stable_and_per_column():
+    df = _frame()
+    df.loc[[10, 11], "n"] = [1, 2]
+    first = fingerprint_dataframe(df, sample_rows=100, chunk_rows=4096)
+    assert first == fingerprint_dataframe(df.copy(), sample_rows=100, chunk_rows=4096)
+    assert set(first.columns) == set(df.columns)
+
+    changed = df.copy()
+    changed.loc[12_345, "x"] += 1e-9  # Not a sampled row
+    changed.loc[[10, 11], "n"] = [2, 1]  # Swapped values
+    second = fingerprint_dataframe(changed, sample_rows=100, chunk_rows=4096)
+    assert second.digest != first.digest
+    assert second.changed_columns(first) == ["x", "n"]
+
+
+def test_sign_flip_of_unsampled_value_changes_fingerprint():
+    x = np.random.default_rng(1).normal(size=100_000)
+    positions = set(np.linspace(0, len(x) - 1, 100).astype(np.int64))
+    base = fingerprint_column(pd.Series(x), sample_rows=100)
+    for row in (12_344, 12_345):
+        assert row not in positions
+        flipped = x.copy()
+        flipped[row] = -flipped[row]
+        assert fingerprint_column(pd.Series(flipped), sample_rows=100) != base
+
+
+def test_schema_and_exact_mode():
+    df = _frame(1000)
+    renamed = df.rename(columns={"x": "y"})
+    assert fingerprint_dataframe(renamed).schema != fingerprint_dataframe(df).schema
+    assert fingerprint_dataframe(df.astype({"n": "float64"})).columns["n"] != (
+        fingerprint_dataframe(df).columns["n"]
+    )
+
+    # Approximate mode only samples object columns; exact mode hashes all rows
+    edited = df.copy()
+    edited.loc[1, "s"] = "w"
+    assert fingerprint_column(edited["s"], exact=True, sample_rows=10) != fingerprint_column(
+        df["s"], exact=True, sample_rows=10
+    )
+    assert fingerprint_column(pd.RangeIndex(5)) == "range:0:5:1"
+
+
+def test_generate_features_profiles_each_dataset_once(mock_llm, sample_data, monkeypatch):
+    df, metadata = sample_data
+    profiled = []
+
+    def prepare_df_info(df, categorical_cols=None):
+        profiled.append(df)
+        return f"Shape: {df.shape}"
+
+    monkeypatch.setattr(core, "_prepare_df_info", prepare_df_info)
+    monkeypatch.setattr(core, "_PROFILES", OrderedDict())
+    mock_llm.return_value = fake_completion("df['c'] = df['a'] * 2")
+    llm_feat.generate_features(df, metadata, mode="code")
+    llm_feat.generate_features(df.copy(), metadata, mode="direct")
+    assert len(profiled) == 1
+
+    edited = df.copy()
+    edited.loc[1, "b"] = -edited.loc[1, "b"]
+    llm_feat.generate_features(edited, metadata, mode="code")
+    assert len(profiled) == 2
@@ -0,0 +1,88 @@
+"""
+Tests for executing generated code with fitted statistics
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from llm_feat.execution import execute_code
+from llm_feat.fitted import FittedCode, rewrite_stateful
+
+CODE = """
+df['a_z'] = (df['a'] - df['a'].mean()) / df['a'].std()
+df['city_share'] = df['city'].map(df['city'].value_counts(normalize=True))
+df['city_freq'] = fe.frequency_encode(df['city'])
+df['city_te'] = fe.target_encode(df['city'], df['target'])
+df['a_by_city'] = df.groupby('city')['a'].transform('mean')
+df['a_diff_city'] = fe.group_aggregate(df, 'city', 'a', 'diff')
+df['a_bin'] = fe.bin_numeric(df['a'], 4)
+df['b_q'] = pd.qcut(df['b'], 4, labels=False)
+df = pd.concat([df, pd.get_dummies(df['city'], prefix='city')], axis=1)
+for col in ['a', 'b']:
+    df[col + '_cap'] = df[col].clip(upper=df[col].quantile(0.9))
+df['code_city'] = df['city'].astype('category').cat.codes
+df['a_rank'] = df['a'].rank()
+"""
+
+
+def _frame(n, cities, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "a": rng.normal(size=n),
+            "b": rng.exponential(size=n),
+            "city": rng.choice([f"c{i}" for i in range(cities)], n),
+            "target": rng.integers(0, 2, n).astype(float),
+        }
+    )
+
+
+def test_rewrite_routes_stateful_operations_through_sites():
+    rewritten, sites = rewrite_stateful(CODE)
+    assert sites == 12
+    assert "site(0).value(lambda: df['a'].mean())" in rewritten
+    assert ".group_transform(df.groupby('city')['a'], 'mean')" in rewritten
+    assert "df['a'].rank()" in rewritten  # Depends on the transformed rows only
+    assert FittedCode(CODE).row_relative
+    assert not FittedCode("df['a_z'] = df['a'] / df['a'].diff().abs().mean()").row_relative
+    assert FittedCode("df['n'] = df.groupby('city')['a'].transform('cumsum')").row_relative
+
+
+def test_fit_matches_normal_execution():
+    train = _frame(500, 6, 0)
+    fitted = FittedCode(CODE)
+    pd.testing.assert_frame_equal(fitted.fit(train), execute_code(CODE, train))
+
+
+def test_transform_applies_fitted_statistics():
+    train, test = _frame(500, 6, 0), _frame(40, 8, 1)
+    fitted = pickle.loads(pickle.dumps(FittedCode(CODE)))
+    fitted.fit(train)
+    fitted = pickle.loads(pickle.dumps(fitted))
+    result = fitted.transform(test)
+
+    assert np.allclose(result["a_z"], (test["a"] - train["a"].mean()) / train["a"].std())
+    counts = train["city"].value_counts()
+    assert np.allclose(result["city_freq"], test["city"].map(counts).fillna(0) / len(train))
+    means = train.groupby("city")["a"].mean()
+    assert np.allclose(result["a_by_city"], test["city"].map(means), equal_nan=True)
+    # Unseen categories: no one-hot column, code -1, prior target mean
+    assert [col for col in result.columns if col.startswith("city_c")] == [
+        f"city_c{i}" for i in range(6)
+    ]
+    unseen = ~test["city"].isin(train["city"])
+    assert unseen.any()
+    assert (result.loc[unseen, "code_city"] == -1).all()
+    assert np.allclose(result.loc[unseen, "city_te"], train["target"].mean())
+    assert result["b_q"].between(0, 3).all()
+    cap = train["b"].quantile(0.9)
+    assert np.allclose(result["b_cap"], test["b"].clip(upper=cap))
+
+    # Row-chunked transforms agree because nothing is refitted, except for
+    # the row-relative rank
+    halves = pd.concat([fitted.transform(test.iloc[:20]), fitted.transform(test.iloc[20:])])
+    pd.testing.assert_frame_equal(
+        halves.drop(columns="a_rank"), result.drop(columns="a_rank"), check_dtype=False
+    )
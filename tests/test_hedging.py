@@ -0,0 +1,89 @@
+"""
+Tests for hedged LLM requests
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from llm_feat.instrumentation import MetricsCollector, set_instrumentation
+from llm_feat.llm_client import LLMClient
+
+from .conftest import fake_completion
+
+
+def _client(responses, **kwargs):
+    """Client whose completions sleep and answer per model: {model: (delay, content)}"""
+
+    def create(model, **_):
+        delay, content = responses[model]
+        time.sleep(delay)
+        return fake_completion(content)
+
+    client = LLMClient(api_key="dummy-key-for-test", **kwargs)
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = create
+    return client
+
+
+def test_hedge_wins_when_primary_is_slow():
+    client = _client(
+        {"slow": (1.0, "df['x'] = df['a'] * 2"), "fast": (0.0, "df['y'] = df['a'] + 1")},
+        hedge_delay=0.05,
+        hedge_model="fast",
+    )
+    start = time.perf_counter()
+    code = client.generate_feature_code("info", "meta", model="slow")
+    assert time.perf_counter() - start < 0.5
+    assert code == "df['y'] = df['a'] + 1"
+    assert client.stats["hedge_fired"] == 1
+    assert client.stats["hedge_won"] == 1
+
+
+def test_no_hedge_when_primary_is_fast():
+    client = _client({"fast": (0.0, "df['y'] = df['a'] + 1")}, hedge_delay=0.5)
+    assert client.generate_feature_code("info", "meta", model="fast") == "df['y'] = df['a'] + 1"
+    assert client.stats["hedge_fired"] == 0
+    assert client.client.chat.completions.create.call_count == 1
+
+
+def test_invalid_hedge_response_loses():
+    client = _client(
+        {"slow": (0.3, "df['x'] = df['a'] * 2"), "broken": (0.0, "df['y'] = (df['a'] +")},
+        hedge_delay=0.05,
+        hedge_model="broken",
+    )
+    assert client.generate_feature_code("info", "meta", model="slow") == "df['x'] = df['a'] * 2"
+    assert client.stats["hedge_fired"] == 1
+    assert client.stats["hedge_won"] == 0
+
+
+def test_losing_response_is_discarded():
+    release = threading.Event()
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10)
+
+    def create(model, **_):
+        if model == "slow":
+            release.wait(5)
+        return fake_completion("df['y'] = df['a'] + 1", usage=usage)
+
+    client = LLMClient(api_key="dummy-key-for-test", hedge_delay=0.05, hedge_model="fast")
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = create
+    collector = MetricsCollector()
+    set_instrumentation(collector)
+    try:
+        client.generate_feature_code("info", "meta", model="slow")
+        release.set()
+        for thread in threading.enumerate():
+            if thread.name.startswith("llm-feat-hedge"):
+                thread.join()
+    finally:
+        set_instrumentation()
+
+    assert client.stats["hedge_won"] == 1 and client.stats["hedge_wasted"] == 1
+    assert client.stats["prompt_tokens"] == 100
+    summary = collector.summary()
+    assert summary["llm_completion"]["count"] == 1
+    assert summary["parse"]["count"] == 1
@@ -0,0 +1,47 @@
+"""
+Startup-time guard for `import llm_feat`
+"""
+
+import subprocess
+import sys
+
+# Heavy dependencies that must only be imported on first use
+HEAVY_MODULES = ["pandas", "numpy", "openai", "IPython"]
+
+# Generous budget for the cumulative import time of llm_feat itself in
+# microseconds (the heavy dependencies above take several hundred
+# milliseconds together)
+IMPORT_BUDGET_US = 100_000
+
+
+def _import_times(code: str) -> dict:
+    """Run `python -X importtime -c <code>` and return cumulative times by module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented module>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_is_lazy():
+    """import llm_feat does not import heavy dependencies"""
+    times = _import_times("import llm_feat")
+    imported = [module for module in HEAVY_MODULES if module in times]
+    assert not imported, f"import llm_feat eagerly imports {imported}"
+    assert times["llm_feat"] < IMPORT_BUDGET_US, f"import llm_feat took {times['llm_feat']}us"
+
+
+def test_public_api_loads_on_access():
+    """Public names resolve on first access"""
+    times = _import_times("import llm_feat; llm_feat.generate_features; llm_feat.FeatureSet")
+    assert "pandas" in times
+    assert "openai" not in times
@@ -0,0 +1,105 @@
+"""
+Tests for schema-diff incremental feature generation
+"""
+
+import pandas as pd
+
+import llm_feat
+from llm_feat.code_analysis import drop_dependents, feature_names, split_statements
+from llm_feat.schema import diff_schema, schema_snapshot
+
+from .conftest import fake_completion
+
+PREVIOUS_CODE = """freq = df['a'].value_counts()
+df['a_freq'] = df['a'].map(freq)
+df['a_plus_b'] = df['a'] + df['b']
+df['a_freq_x2'] = df['a_freq'] * 2"""
+
+
+def test_feature_names_and_dependents():
+    """Assigned columns are found and removed columns drop dependents"""
+    assert feature_names(PREVIOUS_CODE) == ["a_freq", "a_plus_b", "a_freq_x2"]
+    kept, dropped = drop_dependents(split_statements(PREVIOUS_CODE), {"b"})
+    assert [statement.writes for statement in dropped] == [["a_plus_b"]]
+    kept, dropped = drop_dependents(split_statements(PREVIOUS_CODE), {"a"})
+    assert kept == []
+    assert len(dropped) == 4
+
+
+def test_incremental_prompt_covers_only_changes(mock_llm, sample_data):
+    """Only new columns are described and new statements are appended"""
+    df, metadata = sample_data
+    previous_schema = schema_snapshot(df, metadata)
+
+    df = df.assign(c=[7.0, 8.0, 9.0])
+    metadata = pd.concat(
+        [
+            metadata,
+            pd.DataFrame(
+                {
+                    "column_name": ["c"],
+                    "description": ["col c"],
+                    "data_type": ["numeric"],
+                    "label_definition": [None],
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    assert diff_schema(previous_schema, schema_snapshot(df, metadata)).added == ["c"]
+
+    mock_llm.return_value = fake_completion(
+        "df['a_plus_b'] = 0\ndf['c_over_a'] = df['c'] / df['a']"
+    )
+    code = llm_feat.generate_incremental_features(
+        df, metadata, "df['a_plus_b'] = df['a'] + df['b']", previous_schema
+    )
+
+    prompt = mock_llm.call_args.kwargs["messages"][1]["content"]
+    assert "Column: c" in prompt
+    assert "Column: a" not in prompt
+    assert "a_plus_b" in prompt
+    assert "df['a_plus_b'] = df['a'] + df['b']" in code
+    assert "df['a_plus_b'] = 0" not in code
+    assert "df['c_over_a'] = df['c'] / df['a']" in code
+
+
+def test_unchanged_schema_skips_llm(mock_llm, sample_data):
+    """An unchanged schema returns the previous code without a request"""
+    df, metadata = sample_data
+    previous_schema = schema_snapshot(df, metadata)
+    result = llm_feat.generate_incremental_features(
+        df, metadata, PREVIOUS_CODE, previous_schema, mode="direct"
+    )
+    assert mock_llm.call_count == 0
+    assert list(result["a_plus_b"]) == [5, 7, 9]
+
+
+def test_changed_column_drops_its_statements(mock_llm, sample_data):
+    """Statements reading a changed column are regenerated, not kept"""
+    df, metadata = sample_data
+    previous_schema = schema_snapshot(df, metadata)
+    metadata = metadata.assign(data_type=["categorical", "numeric"])
+
+    mock_llm.return_value = fake_completion("df['a_freq'] = df['a'].map(df['a'].value_counts())")
+    code = llm_feat.generate_incremental_features(df, metadata, PREVIOUS_CODE, previous_schema)
+
+    prompt = mock_llm.call_args.kwargs["messages"][1]["content"]
+    assert "Column: a" in prompt and "Column: b" not in prompt
+    assert "df['a'] + df['b']" not in code and "a_freq_x2" not in code
+    assert "df['a_freq'] = df['a'].map(df['a'].value_counts())" in code
+
+
+def test_changed_target_regenerates_everything(mock_llm, sample_data):
+    """A new target makes the previous pipeline stale, so it is regenerated"""
+    df, metadata = sample_data
+    previous_schema = schema_snapshot(df, metadata)
+    metadata = metadata.assign(label_definition=[None, "b is the label"])
+
+    mock_llm.return_value = fake_completion("df['a_sq'] = df['a'] ** 2")
+    code = llm_feat.generate_incremental_features(df, metadata, PREVIOUS_CODE, previous_schema)
+
+    prompt = mock_llm.call_args.kwargs["messages"][1]["content"]
+    assert "Column: a" in prompt and "Column: b" in prompt
+    assert "a_freq" not in code
+    assert "df['a_sq'] = df['a'] ** 2" in code
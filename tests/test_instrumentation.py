@@ -0,0 +1,58 @@
+"""
+Tests for instrumentation hooks
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import llm_feat
+from llm_feat.instrumentation import MetricsCollector, set_instrumentation, span
+
+from .conftest import fake_completion
+
+
+@pytest.fixture
+def collector():
+    collector = MetricsCollector()
+    set_instrumentation(collector)
+    yield collector
+    set_instrumentation()
+
+
+def test_span_is_noop_without_hooks():
+    assert span("a") is span("b")
+
+
+def test_generate_features_reports_every_stage(collector, mock_llm, sample_data):
+    df, metadata = sample_data
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']", usage=usage)
+
+    for _ in range(3):
+        llm_feat.generate_features(df, metadata, mode="direct")
+
+    summary = collector.summary()
+    for stage in ["generate_features", "profile", "metadata", "prompt_build", "parse", "execute"]:
+        assert summary[stage]["count"] == 3
+    assert summary["llm_request"]["retries"] == 0
+    assert summary["llm_completion"]["prompt_tokens"] == 300
+    assert summary["llm_completion"]["completion_tokens"] == 60
+    assert 0 <= summary["execute"]["p50"] <= summary["execute"]["p99"]
+
+
+def test_spans_record_parent_and_error():
+    spans = []
+    set_instrumentation(spans.append)
+    try:
+        with span("outer"):
+            with pytest.raises(ValueError):
+                with span("inner"):
+                    raise ValueError("boom")
+    finally:
+        set_instrumentation()
+
+    inner, outer = spans
+    assert inner.parent is outer
+    assert inner.error == "ValueError: boom"
+    assert outer.error is None and outer.duration >= inner.duration
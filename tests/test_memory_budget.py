@@ -0,0 +1,106 @@
+"""
+Tests for executing generated code within a memory budget
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.execution import execute_code
+from llm_feat.memory_budget import MemoryBudget, parse_bytes
+
+from .conftest import fake_completion
+
+CODE = """
+df['ab'] = df['a'] * df['b']
+dummies = pd.get_dummies(df['city'], prefix='city')
+df = pd.concat([df, dummies], axis=1)
+df['ratio'] = df['a'] / (df['b'].abs() + 1)
+"""
+
+
+def _frame(n=50_000, cities=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "a": rng.normal(size=n),
+            "b": rng.normal(size=n),
+            "city": rng.integers(0, cities, n).astype(str),
+        }
+    )
+
+
+def test_parse_bytes():
+    assert parse_bytes(1024) == 1024
+    assert parse_bytes("512MB") == 512 * 2**20
+    assert parse_bytes("1.5 GiB") == int(1.5 * 2**30)
+    with pytest.raises(ValueError):
+        parse_bytes("lots")
+
+
+def test_large_budget_executes_everything():
+    df = _frame()
+    budget = MemoryBudget("4GB")
+    result = execute_code(CODE, df, memory_budget=budget)
+    assert [d.action for d in budget.decisions] == ["execute"] * 4
+    pd.testing.assert_frame_equal(result, execute_code(CODE, df))
+
+
+def test_high_cardinality_dummies_are_rewritten_to_top_categories():
+    df = _frame()
+    budget = MemoryBudget("20MB")
+    result = execute_code(CODE, df, memory_budget=budget)
+    actions = [d.action for d in budget.decisions]
+    assert actions == ["execute", "rewrite", "execute", "execute"]
+    assert "max_categories=" in budget.decisions[1].source
+    dummies = [col for col in result.columns if col.startswith("city_")]
+    assert "city_Other" in dummies and 1 < len(dummies) < df["city"].nunique()
+    assert result[dummies].memory_usage(index=False).sum() < 20 * 2**20
+
+
+def test_statements_depending_on_skipped_ones_are_skipped():
+    df = _frame()
+    code = "dummies = pd.get_dummies(df[['city']])\ndf = df.join(dummies)\ndf['ab'] = df['a'] * df['b']"
+    budget = MemoryBudget("5MB")
+    result = execute_code(code, df, memory_budget=budget)
+    assert [d.action for d in budget.decisions] == ["skip", "skip", "execute"]
+    assert list(result.columns) == ["a", "b", "city", "ab"]
+
+
+def test_row_local_statement_with_large_peak_is_chunked():
+    df = pd.DataFrame({"x": np.random.default_rng(0).normal(size=1_000_000)})
+    code = (
+        "df['y'] = np.sqrt(np.abs(np.sin(df['x']) * np.cos(df['x']) + np.exp(df['x'] / 10) ** 2))"
+    )
+    budget = MemoryBudget("20MB")
+    result = execute_code(code, df, memory_budget=budget)
+    assert budget.decisions[0].action == "chunk"
+    assert np.allclose(result["y"], execute_code(code, df)["y"])
+    assert result.index.equals(df.index)
+
+
+def test_memory_budget_cannot_be_combined_with_cache(tmp_path):
+    with pytest.raises(ValueError):
+        execute_code(
+            "df['x'] = 1",
+            _frame(10),
+            cache=llm_feat.FeatureCache(str(tmp_path)),
+            memory_budget=MemoryBudget("1GB"),
+        )
+
+
+def test_generate_features_warns_about_rewritten_statements(mock_llm):
+    df = _frame()
+    metadata = pd.DataFrame(
+        {
+            "column_name": ["a", "b", "city"],
+            "description": ["A", "B", "City"],
+            "data_type": ["numeric", "numeric", "categorical"],
+            "label_definition": [None, None, None],
+        }
+    )
+    mock_llm.return_value = fake_completion(CODE)
+    with pytest.warns(UserWarning, match="Memory budget: rewrite"):
+        result = llm_feat.generate_features(df, metadata, mode="direct", memory_budget="20MB")
+    assert "city_Other" in result.columns
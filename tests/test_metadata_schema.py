@@ -0,0 +1,57 @@
+"""
+Tests for the indexed metadata schema
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.schema import MetadataSchema
+
+from .conftest import fake_completion
+
+
+def _metadata():
+    return pd.DataFrame(
+        {
+            "column_name": ["age", "city", "segment", "churn"],
+            "description": ["Age in years", np.nan, "Customer segment", "Churned"],
+            "data_type": ["numeric", "Categorical", "TEXT", None],
+            "label_definition": [None, "", np.nan, "1 if the customer left"],
+        }
+    )
+
+
+def test_lookups():
+    schema = MetadataSchema.from_dataframe(_metadata())
+    assert len(schema) == 4 and "city" in schema
+    assert schema["age"].description == "Age in years"
+    assert schema["city"].description is None
+    assert schema.target == "churn"
+    assert schema.categorical_columns() == ["city", "segment"]
+    assert schema.categorical_columns(["segment", "age"]) == ["segment"]
+    assert [column.name for column in schema.subset(["churn", "age"])] == ["age", "churn"]
+    text = schema.prompt_text()
+    assert "Column: city\n    Description: N/A\n    Data Type: Categorical" in text
+    assert "Label Definition: 1 if the customer left" in text
+
+
+def test_validation():
+    with pytest.raises(ValueError, match="missing required columns"):
+        MetadataSchema.from_dataframe(_metadata().drop(columns="data_type"))
+    duplicate = _metadata().iloc[:1].assign(description="Second description")
+    with pytest.warns(UserWarning, match="Duplicate column_name.*age"):
+        schema = MetadataSchema.from_dataframe(pd.concat([_metadata(), duplicate]))
+    assert len(schema) == len(_metadata())
+    assert schema["age"].description == _metadata()["description"].iloc[0]
+
+
+def test_schema_is_reusable_across_calls(mock_llm, sample_data):
+    df, metadata = sample_data
+    schema = MetadataSchema.from_dataframe(metadata)
+    mock_llm.return_value = fake_completion("df['c'] = df['a'] * 2")
+    assert "c" in llm_feat.generate_features(df, schema, mode="direct").columns
+    prompts = [call.kwargs["messages"][1]["content"] for call in mock_llm.call_args_list]
+    llm_feat.generate_features(df, metadata, mode="direct")
+    assert mock_llm.call_args.kwargs["messages"][1]["content"] == prompts[0]
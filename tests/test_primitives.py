@@ -0,0 +1,72 @@
+"""
+Tests for the vectorized feature engineering primitives
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat import primitives as fe
+
+from .conftest import fake_completion
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "city": ["a", "a", "b", None, "a", "c"],
+            "shop": ["x", "y", "x", "x", "x", "y"],
+            "amount": [1.0, 3.0, 5.0, 7.0, np.nan, 11.0],
+        }
+    )
+
+
+def test_frequency_encode(frame):
+    assert list(fe.frequency_encode(frame["city"], normalize=False)) == [3, 3, 1, 1, 3, 1]
+    assert fe.frequency_encode(frame["city"].astype("category"))[0] == pytest.approx(0.5)
+
+
+def test_target_encode_is_out_of_fold():
+    # Every row is its own category: without out-of-fold statistics the
+    # encoding would reproduce the label
+    series = pd.Series(np.arange(100))
+    target = pd.Series(np.tile([0.0, 1.0], 50))
+    encoded = fe.target_encode(series, target, smoothing=1.0)
+    assert encoded.between(0.4, 0.6).all()
+
+    series = pd.Series(["a", "b"] * 50)
+    encoded = fe.target_encode(series, target, smoothing=0.0)
+    assert np.allclose(encoded[series == "a"], 0.0) and np.allclose(encoded[series == "b"], 1.0)
+
+
+def test_group_rare(frame):
+    grouped = fe.group_rare(frame["city"], min_count=2)
+    assert list(grouped.astype(object)) == ["a", "a", "Other", np.nan, "a", "Other"]
+    assert list(grouped.cat.categories) == ["a", "Other"]
+    top = fe.group_rare(pd.Series(list("aaabbc")), min_frequency=0, max_categories=1)
+    assert list(top.astype(object)) == ["a", "a", "a", "Other", "Other", "Other"]
+
+
+@pytest.mark.parametrize("stat", ["count", "sum", "mean", "std", "min", "max", "median"])
+def test_group_aggregate_matches_pandas(frame, stat):
+    expected = frame.groupby(["city", "shop"], dropna=False)["amount"].transform(stat)
+    result = fe.group_aggregate(frame, ["city", "shop"], "amount", stat)
+    assert np.allclose(result, expected, equal_nan=True)
+    assert result.name == f"amount_{stat}_by_city_shop"
+
+
+def test_bin_numeric(frame):
+    assert list(fe.bin_numeric(frame["amount"], bins=2)) == [0, 0, 1, 1, -1, 1]
+    assert list(fe.bin_numeric(frame["amount"], bins=2, strategy="uniform")) == [0, 0, 0, 1, -1, 1]
+
+
+def test_generated_code_can_use_primitives(mock_llm, sample_data):
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['a_freq'] = fe.frequency_encode(df['a'])")
+
+    code = llm_feat.generate_features(df, metadata)
+    assert "from llm_feat import primitives as fe" in code
+    result = llm_feat.generate_features(df, metadata, mode="direct")
+    assert list(result["a_freq"]) == pytest.approx([1 / 3] * 3)
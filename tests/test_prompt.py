@@ -0,0 +1,39 @@
+"""
+Tests for prompt layout and token usage metrics
+"""
+
+import os
+from types import SimpleNamespace
+
+import llm_feat
+from llm_feat.llm_client import FEATURE_INSTRUCTIONS, LLMClient
+
+from .conftest import fake_completion
+
+
+def test_static_instructions_form_prompt_prefix():
+    """Prompts for different datasets share the full instruction block as prefix"""
+    client = LLMClient(api_key="dummy-key-for-test")
+    first = client._build_prompt("Shape: 3 rows", "Column: a", "a", ["b"], "Churn")
+    second = client._build_prompt("Shape: 9 rows", "Column: z", None, None, None)
+    prefix = os.path.commonprefix([first, second])
+    assert FEATURE_INSTRUCTIONS in prefix
+    assert "3 rows" not in prefix and "Column: a" not in prefix
+    assert first.index("Shape: 3 rows") > first.index(FEATURE_INSTRUCTIONS)
+
+
+def test_cached_tokens_are_reported(mock_llm, sample_data):
+    """Token usage including cached prompt tokens is added to the stats"""
+    df, metadata = sample_data
+    usage = SimpleNamespace(
+        prompt_tokens=1500,
+        completion_tokens=80,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=1280),
+    )
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']", usage=usage)
+
+    llm_feat.generate_features(df, metadata)
+    stats = llm_feat.get_llm_stats()
+    assert stats["prompt_tokens"] == 1500
+    assert stats["cached_tokens"] == 1280
+    assert stats["completion_tokens"] == 80
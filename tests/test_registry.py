@@ -0,0 +1,62 @@
+"""
+Tests for the persistent feature-code registry
+"""
+
+import time
+
+import pandas as pd
+
+import llm_feat
+from llm_feat.registry import FeatureRegistry
+from llm_feat.schema import schema_signature, schema_snapshot
+
+from .conftest import fake_completion
+
+
+def test_signature_normalization(sample_data):
+    """Cosmetic metadata edits and int widths do not change the signature"""
+    df, metadata = sample_data
+    signature = schema_signature(schema_snapshot(df, metadata))
+
+    edited = metadata.copy()
+    edited["description"] = ["Col  A", "col b "]
+    assert schema_signature(schema_snapshot(df.astype("int32"), edited)) == signature
+
+    renamed = df.rename(columns={"b": "c"})
+    edited = metadata.assign(column_name=["a", "c"])
+    assert schema_signature(schema_snapshot(renamed, edited)) != signature
+
+
+def test_versions_pin_and_gc(tmp_path):
+    """Lookups return the pinned or latest version; gc keeps pinned entries"""
+    registry = FeatureRegistry(str(tmp_path / "registry.db"))
+    for i in range(3):
+        registry.save("sig", f"df['f{i}'] = 1", {"columns": {}})
+
+    assert registry.lookup("sig").version == 3
+    registry.pin("sig", 1)
+    assert registry.lookup("sig").code == "df['f0'] = 1"
+
+    assert registry.gc(keep_versions=1) == 1  # Version 2; 1 is pinned
+    assert [entry.version for entry in registry.list("sig")] == [1, 3]
+
+    registry.unpin("sig")
+    time.sleep(0.01)
+    assert registry.gc(max_age_days=0) == 2
+    assert registry.lookup("sig") is None
+
+
+def test_generate_features_reuses_registry(tmp_path, mock_llm, sample_data):
+    """A matching schema is served from the registry without an LLM call"""
+    df, metadata = sample_data
+    registry = FeatureRegistry(str(tmp_path / "registry.db"))
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+
+    first = llm_feat.generate_features(df, metadata, mode="direct", registry=registry)
+    more_rows = pd.concat([df, df], ignore_index=True)
+    second = llm_feat.generate_features(more_rows, metadata, mode="direct", registry=registry)
+
+    assert mock_llm.call_count == 1
+    assert list(first["a_plus_b"]) == [5, 7, 9]
+    assert list(second["a_plus_b"]) == [5, 7, 9, 5, 7, 9]
+    assert len(registry.list()) == 1
@@ -0,0 +1,57 @@
+"""
+Tests for the sandboxed worker pool
+"""
+
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.sandbox import SandboxPool
+
+from .conftest import fake_completion
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with SandboxPool(n_workers=1, cpu_time_limit=2, timeout=10) as pool:
+        yield pool
+
+
+def test_execute(pool):
+    """Generated code runs in a worker and the input is not modified"""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    result = pool.execute("df['a_squared'] = df['a'] ** 2", df)
+    assert list(result["a_squared"]) == [1, 4, 9]
+    assert list(df.columns) == ["a"]
+
+
+def test_error_recycles_worker(pool):
+    """Errors in generated code are reported and the pool keeps working"""
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    with pytest.raises(RuntimeError, match="KeyError"):
+        pool.execute("df['x'] = df['missing']", df)
+    assert list(pool.execute("df['b'] = df['a'] + 1", df)["b"]) == [2, 3, 4]
+
+
+def test_cpu_time_limit(pool):
+    """A runaway job is killed by the CPU-time limit"""
+    recycled = pool.stats["recycled"]
+    with pytest.raises(RuntimeError, match="CPU-time limit"):
+        pool.execute("while True:\n    pass", pd.DataFrame({"a": [1]}))
+    assert pool.stats["recycled"] == recycled + 1
+
+
+def test_wall_clock_timeout():
+    """A job blocked without using CPU is stopped by the timeout"""
+    with SandboxPool(n_workers=1, timeout=0.5) as pool:
+        with pytest.raises(TimeoutError):
+            pool.execute("import time\ntime.sleep(30)", pd.DataFrame({"a": [1]}))
+        assert pool.stats["timeouts"] == 1
+
+
+def test_generate_features_executor(pool, mock_llm, sample_data):
+    """generate_features executes direct mode through the pool"""
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+    result = llm_feat.generate_features(df, metadata, mode="direct", executor=pool)
+    assert list(result["a_plus_b"]) == [5, 7, 9]
@@ -0,0 +1,144 @@
+"""
+Tests for the local feature generation service
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from llm_feat.service import FeatureService, make_server
+
+from .conftest import fake_completion
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def server(mock_llm, tmp_path):
+    mock_llm.return_value = fake_completion("df['a_plus_b'] = df['a'] + df['b']")
+    with FeatureService(llm_concurrency=2, workers=0, data_root=str(tmp_path)) as service:
+        httpd = make_server(service, port=0, token=TOKEN)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _call(url, body=None, token=TOKEN, content_type="application/json"):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method="POST" if data else "GET")
+    if data is not None:
+        request.add_header("Content-Type", content_type)
+    if token is not None:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _wait(url, job_id):
+    for _ in range(100):
+        _, job = _call(f"{url}/jobs/{job_id}")
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job)
+
+
+def test_jobs_run_and_report_metrics(server, tmp_path, sample_data):
+    df, metadata = sample_data
+    df.to_csv(tmp_path / "data.csv", index=False)
+    rows = metadata.astype(object).where(metadata.notna(), None).to_dict("records")
+
+    status, code_job = _call(f"{server}/jobs", {"data": df.to_dict("records"), "metadata": rows})
+    assert status == 202
+    status, direct_job = _call(
+        f"{server}/jobs",
+        {
+            "data_path": "data.csv",
+            "metadata": rows,
+            "mode": "direct",
+            "output_path": "out.csv",
+        },
+    )
+    assert status == 202
+
+    code_job = _wait(server, code_job["id"])
+    assert code_job["status"] == "done"
+    assert "df['a_plus_b']" in code_job["result"]["code"]
+    direct_job = _wait(server, direct_job["id"])
+    assert direct_job["status"] == "done", direct_job["error"]
+    assert direct_job["result"]["new_columns"] == ["a_plus_b"]
+    assert (tmp_path / "out.csv").exists()
+
+    _, metrics = _call(f"{server}/metrics")
+    assert metrics["jobs"]["done"] == 2
+    assert metrics["latency"]["total"]["count"] == 2
+    assert metrics["latency"]["execution"]["count"] == 1
+    assert metrics["throughput"] > 0
+
+
+def test_invalid_and_failing_jobs(server):
+    status, body = _call(f"{server}/jobs", {"data": [{"a": 1}]})
+    assert status == 400
+    assert "metadata" in body["error"]
+    assert _call(f"{server}/jobs/unknown")[0] == 404
+
+    status, job = _call(f"{server}/jobs", {"data_path": "missing.csv", "metadata_path": "no.csv"})
+    assert status == 202
+    job = _wait(server, job["id"])
+    assert job["status"] == "failed"
+    assert "FileNotFoundError" in job["error"]
+
+
+def test_paths_outside_the_data_root_are_rejected(server, tmp_path):
+    (tmp_path / "inside").mkdir()
+    (tmp_path / "inside" / "link").symlink_to(tmp_path.parent)
+    for field, path in [
+        ("data_path", "/etc/passwd"),
+        ("data_path", "../data.csv"),
+        ("metadata_path", "inside/../../metadata.csv"),
+        ("data_path", "inside/link/data.csv"),
+        ("output_path", str(tmp_path.parent / "out.csv")),
+    ]:
+        request = {"data_path": "data.csv", "metadata_path": "metadata.csv", field: path}
+        status, body = _call(f"{server}/jobs", request)
+        assert status == 400, path
+        assert "data root" in body["error"]
+    _, metrics = _call(f"{server}/metrics")
+    assert metrics["jobs"].get("submitted", 0) == 0
+
+
+def test_content_type_and_token_are_enforced(server):
+    request = {"data": [{"a": 1}], "metadata": [{"column_name": "a"}]}
+    status, body = _call(f"{server}/jobs", request, content_type="text/plain")
+    assert status == 415
+    assert _call(f"{server}/jobs", request, token=None)[0] == 401
+    assert _call(f"{server}/jobs", request, token="wrong")[0] == 401
+    assert _call(f"{server}/metrics", token=None)[0] == 401
+    assert _call(f"{server}/health")[0] == 200
+
+
+def test_direct_jobs_are_cpu_time_limited(mock_llm, tmp_path):
+    mock_llm.return_value = fake_completion("df['x'] = sum(range(10**12))")
+    metadata = [
+        {"column_name": "a", "description": "A", "data_type": "numeric", "label_definition": None}
+    ]
+    request = {"data": [{"a": 1}], "metadata": metadata, "mode": "direct"}
+    with FeatureService(
+        llm_concurrency=1, workers=1, cpu_time_limit=1, timeout=30, data_root=str(tmp_path)
+    ) as service:
+        job = service.submit(request)
+        for _ in range(300):
+            if job.status in ("done", "failed"):
+                break
+            time.sleep(0.05)
+    assert job.status == "failed"
+    assert "CPU-time limit" in job.error
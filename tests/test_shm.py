@@ -0,0 +1,68 @@
+"""
+Tests for the shared-memory DataFrame transport
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from llm_feat.sandbox import SandboxPool, _execute_shared
+from llm_feat.shm import SharedFrame
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "num": np.arange(6, dtype="float64"),
+            "count": np.arange(6),
+            "name": list("abcdef"),
+            "group": pd.Categorical(list("xxyyzz")),
+        },
+        index=pd.RangeIndex(10, 16),
+    )
+
+
+def test_round_trip_is_zero_copy(df):
+    """Numeric columns are rebuilt as read-only views on the segment"""
+    shared = SharedFrame.from_dataframe(df)
+    try:
+        rebuilt = shared.to_dataframe()
+        pd.testing.assert_frame_equal(rebuilt, df)
+        view = shared._view(shared.columns[0])
+        assert np.shares_memory(rebuilt["num"].to_numpy(), view)
+        assert not rebuilt["num"].to_numpy().flags.writeable
+        del rebuilt, view
+    finally:
+        shared.unlink()
+
+
+def test_worker_returns_only_delta(df):
+    """Only new or changed columns are shared back"""
+    shared = SharedFrame.from_dataframe(df)
+    try:
+        delta, columns, full = _execute_shared("df['num_x2'] = df['num'] * 2", shared)
+        values = delta.to_dataframe(copy=True)
+        delta.unlink()
+    finally:
+        shared.unlink()
+    assert not full
+    assert list(values.columns) == ["num_x2"]
+    assert columns == ["num", "count", "name", "group", "num_x2"]
+
+
+def test_pool_shm_transport(df):
+    """The pool merges shared-memory results into the input frame"""
+    code = "df['count'] = df['count'] + 1\ndf['name_upper'] = df['name'].str.upper()"
+    with SandboxPool(n_workers=1, transport="shm") as pool:
+        result = pool.execute(code, df)
+        shared = SharedFrame.from_dataframe(df)
+        try:
+            shared_result = pool.execute(code, shared)
+            pd.testing.assert_frame_equal(shared_result, result)
+        finally:
+            del shared_result
+            shared.unlink()
+    assert list(result["count"]) == [1, 2, 3, 4, 5, 6]
+    assert list(result["name_upper"]) == list("ABCDEF")
+    assert list(df["count"]) == [0, 1, 2, 3, 4, 5]
@@ -0,0 +1,107 @@
+"""
+Tests for sparse one-hot features
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+from llm_feat.execution import execute_code
+from llm_feat.shm import SharedFrame
+from llm_feat.sparse import sparse_columns, sparsify_dummies
+
+from .conftest import fake_completion
+
+CODE = """# One-hot encode the city
+dummies = pd.get_dummies(df['city'], prefix='city')  # (low cardinality)
+df = pd.concat([df, dummies], axis=1)
+df = pd.get_dummies(df, columns=['shop'],
+                    prefix='shop')
+df['amount_log'] = np.log1p(df['amount'])
+"""
+
+
+def _frame(n=20_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "city": rng.integers(0, 200, n).astype(str),
+            "shop": rng.choice(["a", "b", "c"], n),
+            "amount": rng.exponential(size=n),
+        }
+    )
+
+
+def test_sparsify_dummies_only_adds_sparse_argument():
+    code = sparsify_dummies(CODE)
+    assert code.count("sparse=True") == 2
+    assert "# One-hot encode the city" in code and "# (low cardinality)" in code
+    assert code.replace(", sparse=True", "").replace(" sparse=True", "") == CODE
+    assert sparsify_dummies("x = pd.get_dummies(s, sparse=False)") == (
+        "x = pd.get_dummies(s, sparse=False)"
+    )
+    assert sparsify_dummies("x = pd.get_dummies(\n    s,\n)") == (
+        "x = pd.get_dummies(\n    s, sparse=True\n)"
+    )
+    assert sparsify_dummies("x = pd.get_dummies(df['c'],  # note\n)") == (
+        "x = pd.get_dummies(df['c'], sparse=True  # note\n)"
+    )
+    assert sparsify_dummies("x = pd.get_dummies((df['c'])  # note\n)") == (
+        "x = pd.get_dummies((df['c']), sparse=True  # note\n)"
+    )
+    assert sparsify_dummies("x = f(pd.get_dummies(s), 'é')  # é") == (
+        "x = f(pd.get_dummies(s, sparse=True), 'é')  # é"
+    )
+
+
+def test_sparse_dummies_match_dense_and_use_less_memory():
+    df = _frame()
+    dense = execute_code(CODE, df)
+    result = execute_code(sparsify_dummies(CODE), df)
+    sparse = sparse_columns(result)
+    assert len(sparse) == 203 and "amount_log" not in sparse
+    assert list(result.columns) == list(dense.columns)
+    for col in sparse:
+        assert np.array_equal(result[col].sparse.to_dense().to_numpy(), dense[col].to_numpy())
+    assert (
+        result[sparse].memory_usage(index=False).sum()
+        < dense[sparse].memory_usage(index=False).sum() / 10
+    )
+
+
+def test_generate_features_sparse(mock_llm):
+    df = _frame(100)
+    metadata = pd.DataFrame(
+        {
+            "column_name": ["city", "shop", "amount"],
+            "description": ["City", "Shop", "Amount"],
+            "data_type": ["categorical", "categorical", "numeric"],
+            "label_definition": [None, None, None],
+        }
+    )
+    mock_llm.return_value = fake_completion(CODE)
+    code = llm_feat.generate_features(df, metadata, mode="code", sparse=True)
+    assert code.count("sparse=True") == 2
+    result = llm_feat.generate_features(df, metadata, mode="direct", sparse=True)
+    assert isinstance(result["shop_a"].dtype, pd.SparseDtype)
+
+
+def test_shared_frame_keeps_sparse_columns():
+    df = execute_code(sparsify_dummies(CODE), _frame(100))
+    shared = SharedFrame.from_dataframe(df)
+    try:
+        pd.testing.assert_frame_equal(shared.to_dataframe(), df)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_split_sparse():
+    pytest.importorskip("scipy")
+    df = execute_code(sparsify_dummies(CODE), _frame(1000))
+    dense, matrix, names = llm_feat.split_sparse(df, dtype=np.float32)
+    assert list(dense.columns) == ["city", "amount", "amount_log"]
+    assert matrix.shape == (1000, len(names)) and matrix.format == "csr"
+    assert matrix.nnz == 2000
+    assert np.array_equal(matrix.toarray(), df[names].sparse.to_dense().to_numpy(np.float32))
@@ -0,0 +1,64 @@
+"""
+Tests for structured (JSON-schema) feature generation
+"""
+
+import json
+
+import pytest
+
+import llm_feat
+from llm_feat.structured import parse_feature_set
+
+from .conftest import fake_completion
+
+RESPONSE = json.dumps(
+    {
+        "domain_summary": "Two numeric measurements.",
+        "features": [
+            {
+                "name": "a_plus_b",
+                "code": "df['a_plus_b'] = df['a'] + df['b']",
+                "inputs": ["a", "b"],
+                "rationale": "Total of both measurements",
+            },
+            {
+                "name": "a_ratio_b",
+                "code": "df['a_ratio_b'] = df['a'] / df['b'].replace(0, np.nan)",
+                "inputs": ["a", "b"],
+                "rationale": "Relative size",
+            },
+        ],
+    }
+)
+
+
+def test_parse_feature_set():
+    """Structured responses parse into features with code and report"""
+    feature_set = parse_feature_set(RESPONSE)
+    assert feature_set.names == ["a_plus_b", "a_ratio_b"]
+    assert feature_set.code.splitlines()[0] == "df['a_plus_b'] = df['a'] + df['b']"
+    assert "Rationale: Relative size" in feature_set.report
+    assert feature_set.select(["a_ratio_b"]).names == ["a_ratio_b"]
+    with pytest.raises(KeyError):
+        feature_set.select(["missing"])
+
+
+def test_parse_feature_set_invalid():
+    """Malformed JSON raises ValueError"""
+    with pytest.raises(ValueError, match="Invalid structured response"):
+        parse_feature_set("df['x'] = 1")
+
+
+def test_generate_features_structured(mock_llm, sample_data):
+    """structured_output requests a JSON schema and executes the features"""
+    df, metadata = sample_data
+    mock_llm.return_value = fake_completion(RESPONSE)
+
+    result, report = llm_feat.generate_features(
+        df, metadata, mode="direct", structured_output=True, return_report=True
+    )
+
+    assert mock_llm.call_args.kwargs["response_format"]["type"] == "json_schema"
+    assert list(result["a_plus_b"]) == [5, 7, 9]
+    assert "a_ratio_b" in result.columns
+    assert "DOMAIN UNDERSTANDING" in report
@@ -0,0 +1,111 @@
+"""
+Tests for the scikit-learn compatible LLMFeatTransformer
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import llm_feat
+
+from .conftest import fake_completion
+
+pytest.importorskip("sklearn")
+
+from sklearn.base import clone  # noqa: E402
+from sklearn.exceptions import NotFittedError  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.pipeline import make_pipeline  # noqa: E402
+
+CODE = """
+df['income_z'] = (df['income'] - df['income'].mean()) / df['income'].std()
+df['city_freq'] = fe.frequency_encode(df['city'])
+df['city_te'] = fe.target_encode(df['city'], df['churn'])
+df = pd.get_dummies(df, columns=['city'], prefix='city')
+"""
+
+METADATA = pd.DataFrame(
+    {
+        "column_name": ["income", "city", "churn"],
+        "description": ["Income", "City", "Churned"],
+        "data_type": ["numeric", "categorical", "numeric"],
+        "label_definition": [None, None, "1 if the customer churned"],
+    }
+)
+
+
+def _data(n, seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({"income": rng.normal(50, 10, n), "city": rng.choice(list("abc"), n)})
+    y = pd.Series(rng.integers(0, 2, n), name="churn")
+    return X, y
+
+
+def test_fit_generates_once_and_transform_does_not_call_llm(mock_llm):
+    mock_llm.return_value = fake_completion(CODE)
+    X, y = _data(300, 0)
+    transformer = llm_feat.LLMFeatTransformer(METADATA).fit(X, y)
+    assert mock_llm.call_count == 1
+
+    X_test, _ = _data(25, 1)
+    result = transformer.transform(X_test)
+    assert mock_llm.call_count == 1
+    assert list(result.columns) == list(transformer.get_feature_names_out())
+    assert "churn" not in result.columns
+    assert np.allclose(
+        result["income_z"], (X_test["income"] - X["income"].mean()) / X["income"].std()
+    )
+    # Out-of-fold encoding during fit_transform, full fitted means afterwards
+    train_features = clone(transformer).fit_transform(X, y)
+    assert not np.allclose(train_features["city_te"], transformer.transform(X)["city_te"])
+
+
+def test_pickle_n_jobs_and_pipeline(mock_llm, tmp_path):
+    mock_llm.return_value = fake_completion(CODE)
+    X, y = _data(300, 0)
+    X_test, _ = _data(101, 1)
+    registry = llm_feat.FeatureRegistry(str(tmp_path / "registry.db"))
+    transformer = llm_feat.LLMFeatTransformer(METADATA, keep_input=False, registry=registry)
+    transformer.fit(X, y)
+    expected = transformer.transform(X_test)
+    assert "income" not in expected.columns
+
+    restored = pickle.loads(pickle.dumps(transformer))
+    restored.set_params(n_jobs=2)
+    pd.testing.assert_frame_equal(restored.transform(X_test), expected)
+    # The unpickled registry reopens the database and serves the stored code
+    clone(restored).fit(X, y)
+    assert mock_llm.call_count == 1
+
+    pipeline = make_pipeline(
+        llm_feat.LLMFeatTransformer(METADATA, code=CODE, keep_input=False),
+        LogisticRegression(),
+    )
+    pipeline.fit(X, y)
+    assert pipeline.predict(X_test).shape == (101,)
+
+
+def test_n_jobs_with_row_relative_code():
+    code = (
+        "df['income_rank'] = df['income'].rank()\n"
+        "df['income_diff'] = df.groupby('city')['income'].diff()"
+    )
+    X, _ = _data(300, 0)
+    X_test, _ = _data(101, 1)
+    transformer = llm_feat.LLMFeatTransformer(code=code).fit(X)
+    expected = transformer.transform(X_test)
+    assert expected["income_rank"].max() == 101
+    pd.testing.assert_frame_equal(transformer.set_params(n_jobs=2).transform(X_test), expected)
+
+
+def test_transform_errors():
+    transformer = llm_feat.LLMFeatTransformer(code="df['x2'] = df['x'] * 2")
+    with pytest.raises(NotFittedError):
+        transformer.transform(pd.DataFrame({"x": [1]}))
+    transformer.fit(pd.DataFrame({"x": [1.0, 2.0]}))
+    with pytest.raises(ValueError, match="missing"):
+        transformer.transform(pd.DataFrame({"y": [1]}))
+    with pytest.raises(ValueError):
+        llm_feat.LLMFeatTransformer().fit(pd.DataFrame({"x": [1]}))